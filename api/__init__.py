@@ -1,7 +1,10 @@
+import hmac
 import os
+import time
 from datetime import timedelta
+import click
 from dotenv import load_dotenv
-from flask import Flask
+from flask import Flask, Response, g, request
 from flask_jwt_extended import JWTManager
 from flask_restx import Api # type: ignore
 from flask_cors import CORS
@@ -24,7 +27,16 @@ from .leaderboard import leaderboard_ns
 from .hutang import hutang_ns
 # from .testdb import testdb_ns
 
+from .query.q_penutupan import tutup_hari_rentang
+from .query.q_peringkat import refresh_peringkat
+from .query.q_rekap_bulanan import backfill_rekap_bulanan
 from .utils.blacklist_store import is_blacklisted
+from .utils.config import get_db_stats, get_timezone, log_db_request
+from .utils.metrics import METRICS_TOKEN, REQUEST_IN_FLIGHT, REQUEST_LATENCY, render_metrics
+from .utils.face_store import build_store
+from .utils.face_detection import FACE_WARMUP
+from .utils.face_executor import warmup_pool
+from .utils.kalender import invalidate_kalender
 
 
 api = Flask(__name__)
@@ -41,6 +53,46 @@ api.config['JWT_BLACKLIST_TOKEN_CHECKS'] = ['access', 'refresh']
 
 jwt = JWTManager(api)
 
+# Jumlah query & waktu DB per request -> header X-DB-Query-Count / X-DB-Time-Ms
+@api.before_request
+def mulai_request():
+    g.db_query_count = 0
+    g.db_time_ms = 0.0
+    g.request_mulai = time.perf_counter()
+    REQUEST_IN_FLIGHT.inc()
+
+@api.after_request
+def header_statistik_db(response):
+    g.response_status = response.status_code
+    query_count, db_time_ms = get_db_stats()
+    response.headers['X-DB-Query-Count'] = str(query_count)
+    response.headers['X-DB-Time-Ms'] = f"{db_time_ms:.1f}"
+    log_db_request(request.method, request.path, response.status_code)
+    return response
+
+# teardown tetap jalan walau terjadi exception, jadi in-flight selalu turun lagi
+@api.teardown_request
+def catat_latency(exc):
+    if 'request_mulai' not in g:
+        return
+    REQUEST_IN_FLIGHT.dec()
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    REQUEST_LATENCY.observe(
+        time.perf_counter() - g.request_mulai,
+        method=request.method,
+        namespace=route.strip('/').split('/')[0] if request.url_rule else "unmatched",
+        route=route,
+        status=g.get('response_status', 500),
+    )
+
+@api.route('/metrics')
+def metrics():
+    if METRICS_TOKEN:
+        token = request.headers.get('Authorization', '').removeprefix('Bearer ')
+        if not hmac.compare_digest(token, METRICS_TOKEN):
+            return {'status': 'Unauthorized'}, 401
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
 @jwt.token_in_blocklist_loader
 def check_if_token_in_blacklist(jwt_header, jwt_payload):
     return is_blacklisted(jwt_payload['jti'])
@@ -94,4 +146,66 @@ restx_api.add_namespace(lembur_ns, path="/lembur")
 restx_api.add_namespace(libur_ns, path="/libur")
 restx_api.add_namespace(leaderboard_ns, path="/peringkat")
 restx_api.add_namespace(hutang_ns, path="/hutang")
-# restx_api.add_namespace(testdb_ns, path="/test-db")
\ No newline at end of file
+# restx_api.add_namespace(testdb_ns, path="/test-db")
+
+# Model wajah di-load lazy saat verifikasi pertama, kecuali FACE_WARMUP=1
+if FACE_WARMUP:
+    warmup_pool()
+
+
+# === CLI === #
+@api.cli.command("build-face-encodings")
+@click.option("--force", is_flag=True, help="Encode ulang semua foto referensi")
+def build_face_encodings_command(force):
+    """Bangun store encoding wajah dari foto referensi di cropped_faces/"""
+    hasil = build_store(force=force)
+    click.echo(f"Dibuat: {hasil['dibuat']}, dilewati: {hasil['dilewati']}, dihapus: {hasil['dihapus']}, gagal: {len(hasil['gagal'])}")
+    for id_karyawan in hasil['gagal']:
+        click.echo(f"  - wajah tidak terdeteksi / gagal: {id_karyawan}")
+
+
+@api.cli.command("backfill-rekap")
+@click.option("--dari", type=click.DateTime(formats=["%Y-%m"]), help="Bangun ulang dari bulan ini (YYYY-MM) s.d. absensi terakhir, default seluruh histori")
+@click.option("--bulan", type=click.DateTime(formats=["%Y-%m"]), help="Bangun ulang satu bulan saja (YYYY-MM), mis. setelah libur nasional diubah")
+def backfill_rekap_command(dari, bulan):
+    """Bangun ulang ringkasan rekap_absensi_bulanan dari tabel absensi (jalankan di luar jam absensi)"""
+    invalidate_kalender()  # libur nasional bisa baru diubah, worker lain memuat ulang lewat generasi 'libur'
+    hasil = backfill_rekap_bulanan(
+        dari=dari.date() if dari else None,
+        bulan=bulan.date() if bulan else None
+    )
+    if hasil is None:
+        raise click.ClickException("Backfill gagal, lihat log error")
+    click.echo(f"Rekap {hasil['awal']} s.d. {hasil['akhir']}: {hasil['baris']} baris")
+
+
+@api.cli.command("tutup-hari")
+@click.option("--tanggal", type=click.DateTime(formats=["%Y-%m-%d"]), help="Tanggal yang ditutup (default: kemarin)")
+@click.option("--dari", type=click.DateTime(formats=["%Y-%m-%d"]), help="Backfill: tanggal awal, s.d. --tanggal / kemarin")
+def tutup_hari_command(tanggal, dari):
+    """Catat 'Tidak Hadir' untuk karyawan tanpa absensi (jadwalkan setiap hari setelah jam kerja, idempoten)"""
+    today, _ = get_timezone()
+    akhir = tanggal.date() if tanggal else today - timedelta(days=1)
+    awal = dari.date() if dari else akhir
+    if akhir >= today:
+        raise click.BadParameter("Hanya hari yang sudah selesai yang bisa ditutup", param_hint="--tanggal")
+
+    gagal = 0
+    for hasil in tutup_hari_rentang(awal, akhir):
+        if hasil is None:
+            gagal += 1
+        elif not hasil['libur']:
+            click.echo(f"{hasil['tanggal']}: {hasil['tidak_hadir']} tidak hadir")
+    if gagal:
+        raise click.ClickException(f"{gagal} hari gagal ditutup, lihat log error")
+
+
+@api.cli.command("refresh-peringkat")
+@click.option("--bulan", type=click.DateTime(formats=["%Y-%m"]), help="Bulan yang dihitung (YYYY-MM), default bulan berjalan (month-to-date)")
+def refresh_peringkat_command(bulan):
+    """Hitung ulang peringkat tersimpan /peringkat (jadwalkan tiap beberapa menit, < PERINGKAT_MAX_UMUR)"""
+    hasil = refresh_peringkat(bulan.date() if bulan else None)
+    if hasil is None:
+        raise click.ClickException("Refresh peringkat gagal, lihat log error")
+    for jenis, item in hasil.items():
+        click.echo(f"{jenis}: {len(item['data'])} karyawan, as of {item['as_of']:%Y-%m-%d %H:%M:%S}")
@@ -8,9 +8,11 @@ from werkzeug.datastructures import FileStorage
 from sqlalchemy.exc import SQLAlchemyError
 
 from .utils.config import get_timezone
-from .utils.decorator import role_required
-from .utils.face_detection import verifikasi_wajah
+from .utils.decorator import role_required, idempotent
+from .utils.etag import header_versi
+from .utils.face_executor import submit_verifikasi
 from .utils.filter_radius import get_valid_office_name
+from .utils.kalender import is_hari_libur
 from .utils.helpers import hitung_waktu_kerja, hitung_keterlambatan, hitung_jam_kurang
 
 from .query.q_absensi import *
@@ -22,6 +24,17 @@ upload_parser = absensi_ns.parser()
 upload_parser.add_argument('file', location='files', type=FileStorage, required=True, help='Foto wajah saat check-out')
 upload_parser.add_argument('latitude', type=str, required=True, help='Latitude lokasi saat check-out')
 upload_parser.add_argument('longitude', type=str, required=True, help='Longitude lokasi saat check-out')
+# Bounding box wajah dari client (pixel foto setelah koreksi orientasi), opsional -> lewati deteksi wajah penuh
+FACE_BOX_FIELDS = ('face_top', 'face_right', 'face_bottom', 'face_left')
+for sisi in FACE_BOX_FIELDS:
+    upload_parser.add_argument(sisi, type=int, required=False, location='form', help='Bounding box wajah (opsional)')
+
+def lokasi_wajah_dari_form(args):
+    lokasi = tuple(args.get(sisi) for sisi in FACE_BOX_FIELDS)
+    return None if None in lokasi else lokasi
+
+# Retry dari aplikasi mobile memakai key yang sama -> hasil awal dikembalikan tanpa verifikasi wajah ulang
+IDEMPOTENCY_HEADER = {'Idempotency-Key': {'description': 'Key unik per percobaan absensi (opsional)', 'in': 'header'}}
 
 edit_absensi_model = absensi_ns.model('EditAbsensi', {
     'jam_masuk': fields.String(required=True, description='Jam masuk (HH:MM)'),
@@ -92,7 +105,7 @@ class AddAbsensiResource(Resource):
         if result is None:
             return {'status': 'Terjadi kesalahan saat menambahkan absensi'}, 500
         if result == 0:
-            return {'status': 'Data tidak ditemukan atau tidak berhasil ditambahkan'}, 404
+            return {'status': 'Karyawan sudah memiliki absensi pada tanggal tersebut'}, 409
 
         return {'status': 'Data absensi berhasil ditambahkan'}, 201
 
@@ -101,9 +114,14 @@ class AddAbsensiResource(Resource):
 class AbsensiCheckInResource(Resource):
     @role_required('karyawan')
     @absensi_ns.expect(upload_parser)
+    @absensi_ns.doc(params=IDEMPOTENCY_HEADER)
     @absensi_ns.response(200, 'Check-in berhasil')
     @absensi_ns.response(400, 'Data tidak lengkap atau tidak valid')
     @absensi_ns.response(403, 'Diluar lokasi kerja atau wajah tidak cocok')
+    @absensi_ns.response(409, 'Sudah ada presensi izin/sakit hari ini')
+    @absensi_ns.response(422, 'Idempotency-Key sudah dipakai dengan data berbeda')
+    @absensi_ns.response(503, 'Antrian verifikasi wajah penuh')
+    @idempotent
     def post(self, id_karyawan):
         """Akses: (karyawan), Check-in karyawan berdasarkan lokasi dan foto"""
         try:
@@ -121,31 +139,42 @@ class AbsensiCheckInResource(Resource):
             except ValueError:
                 return {'error': 'Format koordinat salah!'}, 400
 
-            id_jenis = get_jenis_karyawan(id_karyawan)
-            if id_jenis is None:
+            # Status karyawan & izin WFH dalam satu query (di-cache)
+            profil = get_profil_karyawan(id_karyawan)
+            if profil is None:
                 return {'status': 'error', 'message': 'Karyawan tidak ditemukan'}, 404
 
             lokasi_absensi = get_valid_office_name(user_lat, user_lon, id_karyawan)
 
             if lokasi_absensi is None:
-                if is_wfh_allowed(id_karyawan):
+                if profil['wfh']:
                     lokasi_absensi = "WFH"
                 else:
                     return {'status': 'error', 'message': 'Anda berada diluar lokasi kerja'}, 403
 
             # Verifikasi wajah
-            face = verifikasi_wajah(id_karyawan, image)
+            face = submit_verifikasi(id_karyawan, image, lokasi_wajah=lokasi_wajah_dari_form(args))
             if face == "not_detected":
                 return {'status': 'error', 'message': 'Wajah tidak terdeteksi!'}, 400
             elif face == "error":
                 return {'status': 'error', 'message': 'Gagal memverifikasi wajah.'}, 500
+            elif face == "busy":
+                return {'status': 'error', 'message': 'Server sedang sibuk, silakan coba lagi.'}, 503, {'Retry-After': '2'}
+            elif face == "timeout":
+                return {'status': 'error', 'message': 'Verifikasi wajah terlalu lama, silakan coba lagi.'}, 504
             elif not face:
                 return {'status': 'error', 'message': 'Wajah tidak cocok!'}, 403
 
             tanggal, jam_masuk = get_timezone()
             jam_terlambat = hitung_keterlambatan(jam_masuk)
 
-            add_checkin(id_karyawan, tanggal, jam_masuk, lokasi_absensi, jam_terlambat)
+            result = add_checkin(id_karyawan, tanggal, jam_masuk, lokasi_absensi, jam_terlambat, is_libur=is_hari_libur(tanggal))
+            if result is None:
+                return {'status': 'error', 'message': 'Gagal mencatat check-in'}, 500
+            if not result['baru']:
+                if result['id_status'] != 1:
+                    return {'status': 'error', 'message': 'Anda sudah tercatat izin/sakit hari ini'}, 409
+                return {'status': 'Anda sudah check-in hari ini', 'lokasi': result['lokasi_masuk']}, 200
 
             return {'status': 'Check-in berhasil', 'lokasi': lokasi_absensi}, 200
         except SQLAlchemyError as e:
@@ -155,7 +184,9 @@ class AbsensiCheckInResource(Resource):
 @absensi_ns.route('/check-out/<int:id_karyawan>')
 class AbsensiCheckOutResource(Resource):
     @absensi_ns.expect(upload_parser)
+    @absensi_ns.doc(params=IDEMPOTENCY_HEADER)
     @role_required('karyawan')
+    @idempotent
     def put(self, id_karyawan):
         """Akses: (karyawan), Check-out karyawan berdasarkan lokasi dan foto"""
         try:
@@ -173,39 +204,55 @@ class AbsensiCheckOutResource(Resource):
             except ValueError:
                 return {'status': 'error', 'message': f'Format lokasi salah. Latitude: {user_lat}, Longitude: {user_lon}'}, 400
 
-            id_jenis = get_jenis_karyawan(id_karyawan)
-            if id_jenis is None:
+            # Status karyawan & izin WFH dalam satu query (di-cache)
+            profil = get_profil_karyawan(id_karyawan)
+            if profil is None:
                 return {'status': 'error', 'message': 'Karyawan tidak ditemukan'}, 404
 
             lokasi_absensi = get_valid_office_name(user_lat, user_lon, id_karyawan)
 
             if lokasi_absensi is None:
-                if is_wfh_allowed(id_karyawan):
+                if profil['wfh']:
                     lokasi_absensi = "WFH"
                 else:
                     return {'status': 'error', 'message': 'Anda berada di luar lokasi kerja yang diizinkan!'}, 403
 
-            face = verifikasi_wajah(id_karyawan, image)
-            if face == "not_detected":
-                return {'status': 'error', 'message': 'Wajah tidak terdeteksi. Pastikan wajah terlihat jelas!'}, 400
-            elif face == "error":
-                return {'status': 'error', 'message': 'Terjadi kesalahan saat memverifikasi wajah.'}, 500
-            elif not face:
-                return {'status': 'error', 'message': 'Wajah tidak sesuai dengan akun!'}, 403
-
-            tanggal, jam_keluar = get_timezone()
+            # Cek presensi sebelum verifikasi wajah, retry check-out tidak perlu verifikasi ulang.
+            # Cache bisa basi (check-in/check-out lewat worker lain) -> dicek ulang ke DB sebelum menolak
             presensi = get_check_presensi(id_karyawan)
+            if not presensi or not presensi.get("jam_masuk") or presensi.get("jam_keluar"):
+                presensi = get_check_presensi(id_karyawan, segar=True)
             if not presensi:
                 return {'status': 'info', 'message': 'Belum ada presensi hari ini'}, 200
 
             jam_masuk = presensi.get("jam_masuk")
             if not jam_masuk:
                 return {'status': 'info', 'message': 'Anda belum melakukan check-in'}, 200
+            if presensi.get("jam_keluar"):
+                return {'status': 'Anda sudah check-out hari ini', 'lokasi': presensi.get("lokasi_keluar")}, 200
 
+            face = submit_verifikasi(id_karyawan, image, lokasi_wajah=lokasi_wajah_dari_form(args))
+            if face == "not_detected":
+                return {'status': 'error', 'message': 'Wajah tidak terdeteksi. Pastikan wajah terlihat jelas!'}, 400
+            elif face == "error":
+                return {'status': 'error', 'message': 'Terjadi kesalahan saat memverifikasi wajah.'}, 500
+            elif face == "busy":
+                return {'status': 'error', 'message': 'Server sedang sibuk, silakan coba lagi.'}, 503, {'Retry-After': '2'}
+            elif face == "timeout":
+                return {'status': 'error', 'message': 'Verifikasi wajah terlalu lama, silakan coba lagi.'}, 504
+            elif not face:
+                return {'status': 'error', 'message': 'Wajah tidak sesuai dengan akun!'}, 403
+
+            tanggal, jam_keluar = get_timezone()
             jam_kurang = hitung_jam_kurang(jam_keluar)
             total_jam_kerja = hitung_waktu_kerja(jam_masuk, jam_keluar)
 
             result = update_checkout(id_karyawan, tanggal, jam_keluar, lokasi_absensi, jam_kurang, total_jam_kerja)
+            if result == 0:
+                # Sudah check-out lewat worker lain (presensi dari cache basi)
+                presensi = get_check_presensi(id_karyawan, segar=True)
+                if presensi and presensi.get("jam_keluar"):
+                    return {'status': 'Anda sudah check-out hari ini', 'lokasi': presensi.get("lokasi_keluar")}, 200
             if result is None or result == 0:
                 return {'status': 'error', 'message': 'Gagal mencatat check-out atau tidak ditemukan check-in sebelumnya'}, 500
 
@@ -287,8 +334,12 @@ class AbsensiHarianAdmin(Resource):
         except ValueError:
             return {'status': 'Format tanggal tidak valid. Gunakan DD-MM-YYYY'}, 400
 
+        headers, tidak_berubah = header_versi(versi_absensi_harian_admin(tanggal_filter), tanggal_filter)
+        if tidak_berubah:
+            return None, 304, headers
+
         data = query_absensi_harian_admin(tanggal_filter)
-        return {'absensi': data}, 200
+        return {'absensi': data}, 200, headers
 
 
 @absensi_ns.route('/tidak-hadir')
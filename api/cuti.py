@@ -1,12 +1,28 @@
+from datetime import date
 from flask_jwt_extended import jwt_required
 from flask_restx import Namespace, Resource
 
-from .utils.decorator import role_required
+from .utils.config import get_timezone
+from .utils.decorator import cache_periode, role_required
 from .query.q_cuti import get_kuota_cuti_pegawai, get_kuota_cuti_semua
 
 
 cuti_ns = Namespace('cuti', description='Manajemen Cuti')
 
+
+@cache_periode('cuti/kuota-cuti', sumber=('izin', 'karyawan'))
+def _kuota_cuti(start, end, id_karyawan=None):
+    """Kuota cuti tahun berjalan (periode = 1 Januari s.d. 31 Desember), id_karyawan None = semua karyawan"""
+    data = get_kuota_cuti_pegawai(id_karyawan) if id_karyawan else get_kuota_cuti_semua()
+    if data is None:
+        return {'status': 'error', 'message': 'Gagal mengambil data'}, 500
+    return {'status': 'success', 'data': data}, 200
+
+def _tahun_ini():
+    tahun = get_timezone()[0].year
+    return date(tahun, 1, 1), date(tahun, 12, 31)
+
+
 @cuti_ns.route('/kuota-cuti/<int:id_karyawan>')
 class KuotaCutiResource(Resource):
     @cuti_ns.doc('get_kuota_cuti', params={'id_karyawan': 'ID Karyawan'})
@@ -16,8 +32,7 @@ class KuotaCutiResource(Resource):
         Mendapatkan sisa kuota cuti tahunan pegawai.
         """
         try:
-            data = get_kuota_cuti_pegawai(id_karyawan)
-            return {'status': 'success', 'data': data}, 200
+            return _kuota_cuti(*_tahun_ini(), id_karyawan)
         except Exception as e:
             return {"status": "error", "message": str(e)}, 500
         
@@ -31,10 +46,6 @@ class KuotaCutiSemuaResource(Resource):
         Mendapatkan sisa kuota cuti tahunan untuk semua karyawan.
         """
         try:
-            data = get_kuota_cuti_semua()
-            if data is None:
-                return {'status': 'error', 'message': 'Gagal mengambil data'}, 500
-            
-            return {'status': 'success', 'data': data}, 200
+            return _kuota_cuti(*_tahun_ini())
         except Exception as e:
             return {"status": "error", "message": str(e)}, 500
@@ -3,6 +3,7 @@ from flask_restx import Namespace, Resource, reqparse, fields
 
 from .query.q_hutang import *
 from .utils.decorator import role_required
+from .utils.etag import header_versi
 
 
 hutang_ns = Namespace("hutang", description="Manajemen hutang karyawan")
@@ -38,8 +39,12 @@ class HutangListAdmin(Resource):
         try:
             args = request.args
             status_hutang = args.get("status_hutang")
+            headers, tidak_berubah = header_versi(versi_hutang(status_hutang), status_hutang)
+            if tidak_berubah:
+                return None, 304, headers
+
             data = get_all_hutang(status_hutang=status_hutang)
-            return {"status": "success", "data": data}, 200
+            return {"status": "success", "data": data}, 200, headers
         except Exception as e:
                 return {'status': 'Error', 'message': str(e)}, 400
         
@@ -9,6 +9,7 @@ from flask_jwt_extended import get_jwt_identity, jwt_required
 
 from .utils.helpers import compress_image, hitung_jam_kurang, hitung_keterlambatan, hitung_waktu_kerja, is_image
 from .utils.decorator import role_required
+from .utils.etag import header_versi
 from .query.q_izin_sakit import *
 
 izin_ns = Namespace('perizinan', description='Manajemen Pengajuan Izin/Sakit')
@@ -80,12 +81,17 @@ class PengajuanIzinResource(Resource):
             else:
                 return {'status': 'error', 'message': 'Untuk rentang tanggal, `start_date` dan `end_date` harus diisi lengkap'}, 400
 
-            hasil = get_daftar_izin(status_izin, id_karyawan, start_date, end_date, tanggal)
+            filter_izin = (status_izin, id_karyawan, start_date, end_date, tanggal)
+            headers, tidak_berubah = header_versi(versi_daftar_izin(*filter_izin), *filter_izin)
+            if tidak_berubah:
+                return None, 304, headers
+
+            hasil = get_daftar_izin(*filter_izin)
 
             if hasil is None:
                 return {'status': 'Gagal mengambil data izin'}, 500
 
-            return {'data': hasil}, 200
+            return {'data': hasil}, 200, headers
 
         except ValueError:
             return {'status': 'error', 'message': 'Format tanggal harus YYYY-MM-DD'}, 400
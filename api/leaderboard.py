@@ -2,7 +2,9 @@ from datetime import timedelta
 from flask_restx import Namespace, Resource, reqparse
 
 from .query.q_leaderboard import *
-from .utils.decorator import role_required
+from .query.q_peringkat import *
+from .utils.config import get_timezone
+from .utils.decorator import cache_periode, role_required
 
 
 leaderboard_ns = Namespace('leaderboard', description='Leaderboard untuk melihat peringkat')
@@ -12,6 +14,30 @@ leaderboard_parser = reqparse.RequestParser()
 leaderboard_parser.add_argument('start_date', type=str, required=False, help='Format: YYYY-MM-DD')
 leaderboard_parser.add_argument('end_date', type=str, required=False, help='Format: YYYY-MM-DD')
 
+
+def _respons_peringkat(jenis, pesan_gagal, start_date, end_date):
+    # Month-to-date dari peringkat tersimpan, rentang lain dihitung langsung
+    hasil = get_peringkat(jenis, start_date, end_date)
+
+    if hasil is None:
+        return {'status': pesan_gagal}, 500
+
+    return {
+        'start_date': str(start_date),
+        'end_date': str(end_date),
+        'as_of': hasil['as_of'].strftime('%Y-%m-%d %H:%M:%S'),
+        'data': hasil['data']
+    }, 200
+
+@cache_periode('peringkat/paling-disiplin', sumber=('absensi', 'karyawan'))
+def _peringkat_kerajinan(start_date, end_date, id_karyawan=None):
+    return _respons_peringkat('kerajinan', 'Gagal mengambil data peringkat paling rajin', start_date, end_date)
+
+@cache_periode('peringkat/kurang-disiplin', sumber=('absensi', 'karyawan'))
+def _peringkat_kurang_disiplin(start_date, end_date, id_karyawan=None):
+    return _respons_peringkat('kurang_disiplin', 'Gagal mengambil data leaderboard kurang disiplin', start_date, end_date)
+
+
 @leaderboard_ns.route('/paling-disiplin')
 class LeaderboardResource(Resource):
     @role_required('admin')
@@ -19,7 +45,7 @@ class LeaderboardResource(Resource):
     def get(self):
         """Akses: (admin), Menampilkan urutan peringkat pegawai paling rajin"""
         args = leaderboard_parser.parse_args()
-        today = datetime.today().date()
+        today, _ = get_timezone()
 
         # Ambil nilai awal dari parameter
         raw_start_date = args.get('start_date')
@@ -47,16 +73,7 @@ class LeaderboardResource(Resource):
         elif end_date is not None and start_date is None:
             start_date = end_date.replace(day=1)
 
-        hasil = get_leaderboard_kerajinan(start_date, end_date)
-
-        if hasil is None:
-            return {'status': 'Gagal mengambil data peringkat paling rajin'}, 500
-
-        return {
-            'start_date': str(start_date),
-            'end_date': str(end_date),
-            'data': hasil
-        }, 200
+        return _peringkat_kerajinan(start_date, end_date)
     
 
 @leaderboard_ns.route('/kurang-disiplin')
@@ -66,7 +83,7 @@ class LeaderboardKurangDisiplin(Resource):
     def get(self):
         """Akses: (admin), Menampilkan urutan pegawai kurang disiplin berdasarkan jam terlambat"""
         args = leaderboard_parser.parse_args()
-        today = datetime.today().date()
+        today, _ = get_timezone()
 
         raw_start_date = args.get('start_date')
         raw_end_date = args.get('end_date')
@@ -90,13 +107,4 @@ class LeaderboardKurangDisiplin(Resource):
         elif end_date is not None and start_date is None:
             start_date = end_date.replace(day=1)
 
-        hasil = get_leaderboard_kurang_disiplin(start_date, end_date)
-
-        if hasil is None:
-            return {'status': 'Gagal mengambil data leaderboard kurang disiplin'}, 500
-
-        return {
-            'start_date': str(start_date),
-            'end_date': str(end_date),
-            'data': hasil
-        }, 200
+        return _peringkat_kurang_disiplin(start_date, end_date)
@@ -8,6 +8,7 @@ from werkzeug.datastructures import FileStorage
 from flask_jwt_extended import get_jwt, get_jwt_identity, jwt_required
 
 from .utils.decorator import role_required
+from .utils.etag import header_versi
 from .query.q_lembur import *
 
 
@@ -149,12 +150,17 @@ class DaftarLemburResource(Resource):
         except ValueError:
             return {'status': 'error', 'message': 'Format tanggal tidak valid. Gunakan YYYY-MM-DD'}, 400
 
-        hasil = get_daftar_lembur(status_lembur, id_karyawan, start_date, end_date, tanggal)
+        filter_lembur = (status_lembur, id_karyawan, start_date, end_date, tanggal)
+        headers, tidak_berubah = header_versi(versi_daftar_lembur(*filter_lembur), *filter_lembur)
+        if tidak_berubah:
+            return None, 304, headers
+
+        hasil = get_daftar_lembur(*filter_lembur)
 
         if hasil is None:
             return {'status': 'Gagal mengambil data lembur'}, 500
 
-        return {'data': hasil}, 200
+        return {'data': hasil}, 200, headers
 
 
 @lembur_ns.route('/preview/<path:relative_path>')
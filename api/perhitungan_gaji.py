@@ -4,7 +4,7 @@ from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
 from datetime import datetime, date
 import calendar
 
-from .utils.decorator import role_required
+from .utils.decorator import cache_periode, role_required
 from .query.q_perhitungan_gaji import *
 
 
@@ -19,6 +19,12 @@ detail_gaji_parser.add_argument('id_karyawan', type=int, required=True, help='ID
 detail_gaji_parser.add_argument('start_date', type=str, required=False, help='Tanggal awal (DD-MM-YYYY)')
 detail_gaji_parser.add_argument('end_date', type=str, required=False, help='Tanggal akhir (DD-MM-YYYY)')
 
+@cache_periode('perhitungan-gaji/rekapan', sumber=('absensi', 'karyawan', 'lembur', 'hutang'))
+def _rekap_gaji(start, end, id_karyawan=None):
+    hasil = get_rekap_gaji(start, end, id_karyawan=id_karyawan)
+    return {'data': hasil}, 200
+
+
 @perhitungan_gaji_ns.route('/rekapan')
 class RekapGajiResource(Resource):
     @jwt_required()
@@ -68,8 +74,7 @@ class RekapGajiResource(Resource):
         except ValueError:
             return {'status': 'Format tanggal tidak valid. Gunakan format DD-MM-YYYY'}, 400
 
-        hasil = get_rekap_gaji(start, end, id_karyawan=id_karyawan)
-        return {'data': hasil}, 200
+        return _rekap_gaji(start, end, id_karyawan)
     
 
 @perhitungan_gaji_ns.route('/harian')
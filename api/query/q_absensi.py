@@ -1,7 +1,11 @@
 from datetime import datetime
 from sqlalchemy import text
 from sqlalchemy.exc import SQLAlchemyError
+from ..utils.cache import PRESENSI_KOSONG_TTL, profil_cache, presensi_cache, key_presensi, invalidate_presensi, invalidate_bulan_absensi
 from ..utils.config import get_connection, get_wita, get_timezone
+from ..utils.kalender import is_hari_libur
+from .q_penutupan import get_id_tidak_hadir, is_hari_ditutup
+from .q_rekap_bulanan import REKAP_LOCK_KEY, refresh_rekap_bulanan
 
 
 def is_wfh_allowed(id_karyawan):
@@ -26,39 +30,90 @@ def get_jenis_karyawan(id_karyawan):
         ).fetchone()
         return result[0] if result else None
     
-def add_checkin(id_karyawan, tanggal, jam_masuk, lokasi_absensi, jam_terlambat_input):
+def get_profil_karyawan(id_karyawan):
+    """{'id_jenis', 'wfh'} karyawan aktif dalam satu query, di-cache (PROFIL_CACHE_TTL). None jika tidak ditemukan"""
+    key = int(id_karyawan)
+    profil = profil_cache.get(key)
+    if profil is not None:
+        return profil
+
+    engine = get_connection()
+    with engine.connect() as connection:
+        result = connection.execute(
+            text("""
+                SELECT k.id_jenis,
+                       EXISTS (
+                           SELECT 1 FROM wfh_karyawan w
+                           WHERE w.id_karyawan = k.id_karyawan AND w.status = 1
+                       ) AS wfh
+                FROM karyawan k
+                WHERE k.id_karyawan = :id_karyawan AND k.status = 1
+            """),
+            {"id_karyawan": key}
+        ).mappings().fetchone()
+
+    if result is None:
+        return None
+    profil = dict(result)
+    profil_cache.set(key, profil)
+    return profil
+
+# Kolom presensi hari ini (get_check_presensi & presensi_cache)
+KOLOM_PRESENSI = "id_absensi, tanggal, jam_masuk, jam_keluar, lokasi_masuk, lokasi_keluar, jam_terlambat, id_status"
+
+def add_checkin(id_karyawan, tanggal, jam_masuk, lokasi_absensi, jam_terlambat_input, is_libur=None):
+    """
+    Baris presensi (KOLOM_PRESENSI) + 'baru'. Jika sudah ada absensi aktif di tanggal tsb
+    (retry check-in / izin), baris lama dikembalikan dengan baru = False. None jika gagal
+    """
     engine = get_connection()
     try:
-        with engine.begin() as connection:
-            # Cek apakah hari libur nasional
-            result_libur = connection.execute(
-                text("""
-                    SELECT 1 FROM liburnasional 
-                    WHERE tanggal = :tanggal AND status = 1
-                    LIMIT 1
-                """),
-                {'tanggal': tanggal}
-            ).scalar()
-
-            # Cek apakah hari minggu atau tanggal libur
-            is_libur = tanggal.weekday() == 6 or result_libur is not None
+        # Satu statement -> autocommit, tanpa round trip BEGIN/COMMIT terpisah
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+            # Cek apakah hari minggu atau tanggal libur (dari cache kalender)
+            if is_libur is None:
+                is_libur = is_hari_libur(tanggal)
 
             jam_terlambat = None if is_libur else jam_terlambat_input
 
-            # Masukkan absensi
+            # Masukkan absensi, unique index (id_karyawan, tanggal) WHERE status = 1 (sql/002).
+            # Ringkasan bulanan (sql/003) ditambah di statement yang sama: +1 hadir & jam terlambat,
+            # hanya jika baris benar-benar baru dan bukan hari libur (sama dengan aturan rekap).
+            # Advisory lock sama dengan kunci_rekap: refresh ringkasan menunggu statement ini commit
             result = connection.execute(
-                text("""
-                    INSERT INTO Absensi (
-                        id_karyawan, tanggal, jam_masuk, jam_keluar, 
-                        lokasi_masuk, lokasi_keluar, jam_terlambat, 
-                        created_at, updated_at, status, id_status
-                    ) 
-                    VALUES (
-                        :id_karyawan, :tanggal, :jam_masuk, NULL, 
-                        :lokasi_masuk, NULL, :jam_terlambat, 
-                        :timestamp_wita, :timestamp_wita, 1, 1
+                text(f"""
+                    WITH baru AS (
+                        INSERT INTO Absensi (
+                            id_karyawan, tanggal, jam_masuk, jam_keluar, 
+                            lokasi_masuk, lokasi_keluar, jam_terlambat, 
+                            created_at, updated_at, status, id_status
+                        ) 
+                        VALUES (
+                            :id_karyawan, :tanggal, :jam_masuk, NULL, 
+                            :lokasi_masuk, NULL, :jam_terlambat, 
+                            :timestamp_wita, :timestamp_wita, 1, 1
+                        )
+                        ON CONFLICT (id_karyawan, tanggal) WHERE status = 1 DO NOTHING
+                        RETURNING {KOLOM_PRESENSI}
+                    ), kunci AS (
+                        SELECT pg_advisory_xact_lock_shared(:kunci, 0), pg_advisory_xact_lock(:kunci, :id_karyawan)
+                    ), rekap AS (
+                        INSERT INTO rekap_absensi_bulanan AS r (
+                            id_karyawan, bulan, jumlah_hadir, total_jam_terlambat, tanggal_terakhir, updated_at
+                        )
+                        SELECT :id_karyawan, date_trunc('month', tanggal)::date, 1, jam_terlambat, tanggal, :timestamp_wita
+                        FROM baru, kunci
+                        WHERE NOT :is_libur
+                        ON CONFLICT (id_karyawan, bulan) DO UPDATE SET
+                            jumlah_hadir = r.jumlah_hadir + 1,
+                            total_jam_terlambat = CASE
+                                WHEN EXCLUDED.total_jam_terlambat IS NULL THEN r.total_jam_terlambat
+                                ELSE COALESCE(r.total_jam_terlambat, 0) + EXCLUDED.total_jam_terlambat
+                            END,
+                            tanggal_terakhir = GREATEST(r.tanggal_terakhir, EXCLUDED.tanggal_terakhir),
+                            updated_at = EXCLUDED.updated_at
                     )
-                    RETURNING id_absensi
+                    SELECT * FROM baru
                 """),
                 {
                     "id_karyawan": id_karyawan,
@@ -66,10 +121,32 @@ def add_checkin(id_karyawan, tanggal, jam_masuk, lokasi_absensi, jam_terlambat_i
                     "jam_masuk": jam_masuk,
                     "lokasi_masuk": lokasi_absensi,
                     "jam_terlambat": jam_terlambat,
+                    "is_libur": bool(is_libur),
+                    "kunci": REKAP_LOCK_KEY,
                     "timestamp_wita": get_wita()
                 }
-            )
-            return result.scalar()
+            ).mappings().fetchone()
+            baru = result is not None
+
+            if not baru:
+                # Konflik: ambil baris yang sudah ada (hanya terjadi saat retry)
+                result = connection.execute(
+                    text(f"""
+                        SELECT {KOLOM_PRESENSI}
+                        FROM Absensi
+                        WHERE id_karyawan = :id_karyawan AND tanggal = :tanggal AND status = 1
+                    """),
+                    {"id_karyawan": id_karyawan, "tanggal": tanggal}
+                ).mappings().fetchone()
+                if result is None:
+                    return None
+
+        # Autocommit -> baris sudah tersimpan, langsung isi cache presensi
+        presensi = dict(result)
+        presensi_cache.set(key_presensi(id_karyawan, tanggal), presensi)
+        if baru:
+            invalidate_bulan_absensi(tanggal)
+        return {**presensi, 'baru': baru}
     except SQLAlchemyError as e:
         print(f"Error occurred: {str(e)}")
         return None
@@ -78,24 +155,14 @@ def update_checkout(id_karyawan, tanggal, jam_keluar, lokasi_absensi, jam_kurang
     engine = get_connection()
     try:
         with engine.begin() as connection:
-            # Cek apakah hari libur nasional
-            result_libur = connection.execute(
-                text("""
-                    SELECT 1 FROM liburnasional 
-                    WHERE tanggal = :tanggal AND status = 1
-                    LIMIT 1
-                """),
-                {'tanggal': tanggal}
-            ).scalar()
-
             # Cek apakah hari minggu atau tanggal libur
-            is_libur = tanggal.weekday() == 6 or result_libur is not None
+            is_libur = is_hari_libur(tanggal)
 
             jam_kurang = None if is_libur else jam_kurang_input
 
             # Masukkan absensi
-            result = connection.execute(
-                text("""
+            rows = connection.execute(
+                text(f"""
                     UPDATE Absensi 
                     SET jam_keluar = :jam_keluar, 
                         lokasi_keluar = :lokasi_keluar, 
@@ -105,6 +172,8 @@ def update_checkout(id_karyawan, tanggal, jam_keluar, lokasi_absensi, jam_kurang
                     WHERE id_karyawan = :id_karyawan 
                         AND tanggal = :tanggal 
                         AND jam_keluar IS NULL
+                        AND status = 1
+                    RETURNING {KOLOM_PRESENSI}
                 """),
                 {
                     "jam_keluar": jam_keluar,
@@ -115,8 +184,14 @@ def update_checkout(id_karyawan, tanggal, jam_keluar, lokasi_absensi, jam_kurang
                     "id_karyawan": id_karyawan,
                     "tanggal": tanggal
                 }
-            )
-            return result.rowcount  # jumlah baris yang ter-update
+            ).mappings().fetchall()
+            if rows:
+                refresh_rekap_bulanan(connection, id_karyawan, tanggal)
+
+        for row in rows:
+            presensi_cache.set(key_presensi(id_karyawan, row['tanggal']), dict(row))
+            invalidate_bulan_absensi(row['tanggal'])
+        return len(rows)  # jumlah baris yang ter-update
     except SQLAlchemyError as e:
         print(f"Error occurred: {str(e)}")
         return None
@@ -125,26 +200,16 @@ def add_absensi(id_karyawan, tanggal, jam_masuk, jam_keluar, lokasi_masuk, lokas
     engine = get_connection()
     try:
         with engine.begin() as connection:
-            # Cek apakah hari libur nasional
-            result_libur = connection.execute(
-                text("""
-                    SELECT 1 FROM liburnasional 
-                    WHERE tanggal = :tanggal AND status = 1
-                    LIMIT 1
-                """),
-                {'tanggal': tanggal}
-            ).scalar()
-
             # Cek apakah hari minggu atau tanggal libur
-            is_libur = datetime.strptime(tanggal, "%Y-%m-%d").weekday() == 6 or result_libur is not None
+            is_libur = is_hari_libur(tanggal)
 
             jam_terlambat = None if is_libur else jam_terlambat
             jam_kurang = None if is_libur else jam_kurang
 
-            # Masukkan absensi
-            connection.execute(
+            # Masukkan absensi, baris 'Tidak Hadir' dari penutupan harian ditimpa
+            result = connection.execute(
                 text("""
-                    INSERT INTO Absensi (
+                    INSERT INTO Absensi AS a (
                         id_karyawan, tanggal, jam_masuk, jam_keluar, 
                         lokasi_masuk, lokasi_keluar, jam_terlambat,
                         jam_kurang, total_jam_kerja,
@@ -156,10 +221,22 @@ def add_absensi(id_karyawan, tanggal, jam_masuk, jam_keluar, lokasi_masuk, lokas
                         :jam_kurang, :total_jam_kerja,
                         :timestamp_wita, :timestamp_wita, 1, 1
                     )
+                    ON CONFLICT (id_karyawan, tanggal) WHERE status = 1 DO UPDATE SET
+                        jam_masuk = EXCLUDED.jam_masuk,
+                        jam_keluar = EXCLUDED.jam_keluar,
+                        lokasi_masuk = EXCLUDED.lokasi_masuk,
+                        lokasi_keluar = EXCLUDED.lokasi_keluar,
+                        jam_terlambat = EXCLUDED.jam_terlambat,
+                        jam_kurang = EXCLUDED.jam_kurang,
+                        total_jam_kerja = EXCLUDED.total_jam_kerja,
+                        id_status = EXCLUDED.id_status,
+                        updated_at = EXCLUDED.updated_at
+                    WHERE a.id_status = :id_tidak_hadir
                 """),
                 {
                     "id_karyawan": id_karyawan,
                     "tanggal": tanggal,
+                    "id_tidak_hadir": get_id_tidak_hadir(connection),
                     "jam_masuk": jam_masuk,
                     "jam_keluar": jam_keluar,
                     "lokasi_masuk": lokasi_masuk,
@@ -170,7 +247,13 @@ def add_absensi(id_karyawan, tanggal, jam_masuk, jam_keluar, lokasi_masuk, lokas
                     "timestamp_wita": get_wita()
                 }
             )
-            return 1
+            if result.rowcount:
+                refresh_rekap_bulanan(connection, id_karyawan, tanggal)
+
+        if result.rowcount:
+            invalidate_presensi(id_karyawan, tanggal)
+            invalidate_bulan_absensi(tanggal)
+        return result.rowcount  # 0 jika sudah ada absensi di tanggal tsb
     except SQLAlchemyError as e:
         print(f"Error occurred: {str(e)}")
         return None
@@ -186,29 +269,39 @@ def delete_checkout(id_absensi):
                     WHERE id_absensi = :id_absensi
                     AND jam_keluar IS NOT NULL
                     AND status = 1
+                    RETURNING id_karyawan, tanggal
                 """),
                 {'id_absensi': id_absensi, 'timestamp_wita': get_wita()}
-            )
-            return result.rowcount > 0  # True jika ada baris yang diupdate
+            ).fetchone()
+            if result is not None:
+                refresh_rekap_bulanan(connection, *result)
+
+        if result is not None:
+            invalidate_presensi(*result)
+            invalidate_bulan_absensi(result.tanggal)
+        return result is not None  # True jika ada baris yang diupdate
     except SQLAlchemyError as e:
         print(f"Error occurred: {str(e)}")
         return None
 
-def get_check_presensi(id_karyawan):
-    engine = get_connection()
+def get_check_presensi(id_karyawan, segar=False):
+    """Presensi hari ini (dict) atau None. segar=True -> baca langsung dari DB, lewati cache"""
     today, _ = get_timezone()  # Mendapatkan tanggal hari ini
-    # print(today)
+    key = key_presensi(id_karyawan, today)
+    presensi = None if segar else presensi_cache.get(key)
+    if presensi is not None:
+        return presensi or None  # False = sudah dicek, belum ada presensi
+
+    engine = get_connection()
     try:
         with engine.connect() as connection:
             result = connection.execute(
-                text("""
-                    SELECT id_absensi, tanggal, jam_masuk, jam_keluar, lokasi_masuk, lokasi_keluar, jam_terlambat
+                text(f"""
+                    SELECT {KOLOM_PRESENSI}
                     FROM Absensi 
                     WHERE id_karyawan = :id_karyawan
                     AND tanggal = :today
-                    AND status = 1
-                    ORDER BY jam_masuk DESC
-                    LIMIT 1;
+                    AND status = 1;
                 """),
                 {
                     "id_karyawan": id_karyawan,
@@ -216,10 +309,12 @@ def get_check_presensi(id_karyawan):
                 }
             ).mappings().fetchone()  # Mengambil satu record sebagai dictionary
 
-            if result is None:
-                return None
-
-            return dict(result)
+            presensi = dict(result) if result is not None else None
+            if presensi:
+                presensi_cache.set(key, presensi)
+            else:
+                presensi_cache.set(key, False, ttl=PRESENSI_KOSONG_TTL)
+            return presensi
 
     except SQLAlchemyError as e:
         print(f"Error occurred: {str(e)}")  # Log kesalahan (atau gunakan logging)
@@ -239,9 +334,10 @@ def get_history_absensi_harian(id_karyawan, tanggal):
                     INNER JOIN Karyawan k ON k.id_karyawan = a.id_karyawan 
                     INNER JOIN StatusPresensi s ON a.id_status = s.id_status 
                     INNER JOIN TipeKaryawan t ON k.id_tipe = t.id_tipe 
-                    WHERE a.id_karyawan = :id_karyawan AND a.status = 1 AND k.status = 1 AND a.tanggal = :tanggal;
+                    WHERE a.id_karyawan = :id_karyawan AND a.status = 1 AND k.status = 1 AND a.tanggal = :tanggal
+                      AND a.id_status IS DISTINCT FROM :id_tidak_hadir;
                 """),
-                {"tanggal": tanggal, "id_karyawan": id_karyawan}
+                {"tanggal": tanggal, "id_karyawan": id_karyawan, "id_tidak_hadir": get_id_tidak_hadir(connection)}
             )
 
             data = [dict(row) for row in query_result.mappings()]
@@ -272,6 +368,26 @@ def get_history_absensi_harian(id_karyawan, tanggal):
         print(f"[ERROR] Gagal ambil absensi harian: {str(e)}")
         return []
 
+def versi_absensi_harian_admin(tanggal):
+    """Versi daftar hadir harian (jumlah, updated_at terakhir absensi, karyawan, jenis) untuk ETag, None jika gagal"""
+    engine = get_connection()
+    try:
+        with engine.connect() as connection:
+            return tuple(connection.execute(
+                text("""
+                    SELECT COUNT(*), MAX(a.updated_at), MAX(k.updated_at), MAX(j.updated_at)
+                    FROM Absensi a 
+                    INNER JOIN Karyawan k ON k.id_karyawan = a.id_karyawan 
+                    INNER JOIN Jeniskaryawan j ON k.id_jenis = j.id_jenis 
+                    INNER JOIN StatusPresensi s ON a.id_status = s.id_status 
+                    WHERE a.status = 1  AND k.status = 1 AND a.id_status = 1 AND a.tanggal = :tanggal;
+                """),
+                {"tanggal": tanggal}
+            ).fetchone())
+    except SQLAlchemyError as e:
+        print(f"Error occurred: {str(e)}")
+        return None
+
 def query_absensi_harian_admin(tanggal):
     engine = get_connection()
     try:
@@ -319,19 +435,29 @@ def query_absensi_harian_admin(tanggal):
         return []
     
 def query_absensi_tidak_hadir(tanggal):
+    # Hari yang sudah ditutup (tutup-hari): baris 'Tidak Hadir' sudah ada di absensi
+    ditutup = is_hari_ditutup(tanggal)
     engine = get_connection()
     try:
         with engine.connect() as connection:
-            result = connection.execute(
-                text("""
+            if ditutup:
+                query = """
+                    SELECT k.id_karyawan, k.nama, k.nama_panggilan, k.id_jenis, j.jenis, a.tanggal
+                    FROM Absensi a
+                    JOIN Karyawan k ON k.id_karyawan = a.id_karyawan
+                    JOIN JenisKaryawan j ON k.id_jenis = j.id_jenis
+                    WHERE a.tanggal = :tanggal AND a.status = 1 AND a.id_status = :id_tidak_hadir
+                      AND k.status = 1 AND j.status = 1
+                """
+            else:
+                query = """
                     SELECT k.id_karyawan, k.nama, k.nama_panggilan, k.id_jenis, j.jenis, :tanggal AS tanggal
                     FROM Karyawan k
                     JOIN JenisKaryawan j ON k.id_jenis = j.id_jenis
                     LEFT JOIN Absensi a ON k.id_karyawan = a.id_karyawan AND a.tanggal = :tanggal
                     WHERE k.status = 1 AND a.id_absensi IS NULL AND j.status = 1
-                """),
-                {"tanggal": tanggal}
-            )
+                """
+            result = connection.execute(text(query), {"tanggal": tanggal, "id_tidak_hadir": get_id_tidak_hadir(connection)})
 
             absensi_list = [dict(row) for row in result.mappings()]
 
@@ -408,18 +534,8 @@ def update_absensi_by_id(id_absensi, jam_masuk, jam_keluar, jam_terlambat, jam_k
 
             tanggal = absensi_data['tanggal']
 
-            # Cek apakah hari libur nasional
-            result_libur = connection.execute(
-                text("""
-                    SELECT 1 FROM liburnasional 
-                    WHERE tanggal = :tanggal AND status = 1
-                    LIMIT 1
-                """),
-                {'tanggal': tanggal}
-            ).scalar()
-
             # Cek apakah hari Minggu atau libur nasional
-            is_libur = tanggal.weekday() == 6 or result_libur is not None
+            is_libur = is_hari_libur(tanggal)
 
             # Jika hari libur, tidak dihitung jam terlambat
             jam_terlambat = None if is_libur else jam_terlambat
@@ -429,6 +545,7 @@ def update_absensi_by_id(id_absensi, jam_masuk, jam_keluar, jam_terlambat, jam_k
                     UPDATE absensi
                     SET jam_masuk = :jam_masuk,
                         jam_keluar = :jam_keluar,
+                        id_status = CASE WHEN id_status = :id_tidak_hadir THEN 1 ELSE id_status END,
                         jam_terlambat = :jam_terlambat,
                         total_jam_kerja = :total_jam_kerja,
                         jam_kurang = :jam_kurang,
@@ -436,9 +553,11 @@ def update_absensi_by_id(id_absensi, jam_masuk, jam_keluar, jam_terlambat, jam_k
                         lokasi_keluar = :lokasi_keluar,
                         updated_at = :timestamp_wita
                     WHERE id_absensi = :id_absensi AND status = 1
+                    RETURNING id_karyawan, tanggal
                 """)
                 params = {
                     'id_absensi': id_absensi,
+                    'id_tidak_hadir': get_id_tidak_hadir(connection),
                     'jam_masuk': jam_masuk,
                     'jam_keluar': jam_keluar,
                     'jam_terlambat': jam_terlambat,
@@ -453,6 +572,7 @@ def update_absensi_by_id(id_absensi, jam_masuk, jam_keluar, jam_terlambat, jam_k
                     UPDATE absensi
                     SET jam_masuk = :jam_masuk,
                         jam_terlambat = :jam_terlambat,
+                        id_status = CASE WHEN id_status = :id_tidak_hadir THEN 1 ELSE id_status END,
                         jam_keluar = NULL,
                         jam_kurang = NULL,
                         total_jam_kerja = NULL,
@@ -460,17 +580,25 @@ def update_absensi_by_id(id_absensi, jam_masuk, jam_keluar, jam_terlambat, jam_k
                         lokasi_masuk = :lokasi_masuk,
                         updated_at = :timestamp_wita
                     WHERE id_absensi = :id_absensi AND status = 1
+                    RETURNING id_karyawan, tanggal
                 """)
                 params = {
                     'id_absensi': id_absensi,
+                    'id_tidak_hadir': get_id_tidak_hadir(connection),
                     'jam_masuk': jam_masuk,
                     'jam_terlambat': jam_terlambat,
                     'lokasi_masuk': lokasi_masuk,
                     'timestamp_wita': get_wita()
                 }
 
-            result = connection.execute(query, params)
-            return result.rowcount
+            rows = connection.execute(query, params).fetchall()
+            for row in rows:
+                refresh_rekap_bulanan(connection, *row)
+
+        for row in rows:
+            invalidate_presensi(*row)
+            invalidate_bulan_absensi(row.tanggal)
+        return len(rows)
     except SQLAlchemyError as e:
         print(f"Update Absensi Error: {str(e)}")
         return None
@@ -480,10 +608,20 @@ def remove_absensi(id_absensi):
     try:
         with engine.begin() as connection:
             result = connection.execute(
-                text("UPDATE Absensi SET status = 0, updated_at = :timestamp_wita WHERE id_absensi = :id_absensi AND status = 1"),
+                text("""
+                    UPDATE Absensi SET status = 0, updated_at = :timestamp_wita
+                    WHERE id_absensi = :id_absensi AND status = 1
+                    RETURNING id_karyawan, tanggal
+                """),
                 {"id_absensi": id_absensi, "timestamp_wita": get_wita()}
-            )
-            return result.rowcount
+            ).fetchall()
+            for row in result:
+                refresh_rekap_bulanan(connection, *row)
+
+        for row in result:
+            invalidate_presensi(*row)
+            invalidate_bulan_absensi(row.tanggal)
+        return len(result)
     except SQLAlchemyError as e:
         print(f"Error occurred: {str(e)}")
         return None
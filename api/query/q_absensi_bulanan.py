@@ -0,0 +1,155 @@
+from contextvars import ContextVar
+from datetime import timedelta
+from functools import wraps
+import numpy as np
+from sqlalchemy import text
+
+from ..utils.cache import bulan_absensi_cache, get_generasi, nama_bulan_absensi
+from ..utils.config import baca_primer, get_connection
+from .q_rekap_bulanan import _awal_bulan, _akhir_bulan
+
+
+# Blok absensi satu bulan untuk semua karyawan: baris = karyawan (urut id), kolom = tanggal 1..31.
+# Hanya absensi aktif (status = 1), unique index sql/002 -> paling banyak satu baris per hari.
+# Nilai kosong: status 0 (tidak ada absensi), jam -1, menit KOSONG, lokasi None
+HARI_BLOK = 31
+KOSONG = np.iinfo(np.int32).min
+
+# kolom -> (dtype, nilai kosong)
+KOLOM_BLOK = {
+    'status': (np.int16, 0),              # id_status
+    'jam_masuk': (np.int64, -1),          # mikrodetik sejak 00:00
+    'jam_keluar': (np.int64, -1),
+    'jam_terlambat': (np.int32, KOSONG),  # menit
+    'jam_kurang': (np.int32, KOSONG),
+    'total_jam_kerja': (np.int32, KOSONG),
+    'lokasi_masuk': (object, None),
+    'lokasi_keluar': (object, None),
+}
+
+# Di dalam fungsi @blok_segar: bulan yang sudah dibangun ulang di pemanggilan ini
+_blok_segar = ContextVar("blok_segar", default=None)
+
+
+def _ke_mikrodetik(jam):
+    if jam is None:
+        return -1
+    return ((jam.hour * 60 + jam.minute) * 60 + jam.second) * 1_000_000 + jam.microsecond
+
+def _ke_menit(nilai):
+    return KOSONG if nilai is None else int(nilai)
+
+def jam_ke_str(mikrodetik):
+    """Kebalikan _ke_mikrodetik, format '%H:%M:%S' (None jika kosong)"""
+    if mikrodetik < 0:
+        return None
+    detik = int(mikrodetik) // 1_000_000
+    return f"{detik // 3600:02d}:{detik // 60 % 60:02d}:{detik % 60:02d}"
+
+def nilai_menit(menit):
+    """Array menit dengan kosong -> 0 (COALESCE(kolom, 0))"""
+    return np.where(menit == KOSONG, 0, menit)
+
+
+@baca_primer
+def _bangun_blok(bulan):
+    engine = get_connection()
+    with engine.connect() as connection:
+        status_presensi = connection.execute(text("""
+            SELECT id_status, nama_status FROM statuspresensi
+        """)).fetchall()
+        rows = connection.execute(text("""
+            SELECT id_karyawan, EXTRACT(DAY FROM tanggal)::int AS hari, id_status,
+                   jam_masuk, jam_keluar, jam_terlambat, jam_kurang, total_jam_kerja,
+                   lokasi_masuk, lokasi_keluar
+            FROM absensi
+            WHERE tanggal BETWEEN :awal AND :akhir AND status = 1
+        """), {'awal': bulan, 'akhir': _akhir_bulan(bulan)}).fetchall()
+
+    nama_status = {row.id_status: row.nama_status for row in status_presensi}
+    id_tidak_hadir = next((id_status for id_status, nama in nama_status.items() if nama == 'Tidak Hadir'), None)
+
+    karyawan, baris = np.unique(np.array([row.id_karyawan for row in rows], dtype=np.int64), return_inverse=True)
+    hari = np.array([row.hari - 1 for row in rows], dtype=np.intp)
+
+    blok = {
+        'bulan': bulan,
+        'karyawan': karyawan,
+        'nama_status': nama_status,
+        'id_tidak_hadir': id_tidak_hadir,
+    }
+    for kolom, (dtype, kosong) in KOLOM_BLOK.items():
+        blok[kolom] = np.full((len(karyawan), HARI_BLOK), kosong, dtype=dtype)
+
+    if rows:
+        blok['status'][baris, hari] = [row.id_status or 0 for row in rows]
+        for kolom in ('jam_masuk', 'jam_keluar'):
+            blok[kolom][baris, hari] = [_ke_mikrodetik(getattr(row, kolom)) for row in rows]
+        for kolom in ('jam_terlambat', 'jam_kurang', 'total_jam_kerja'):
+            blok[kolom][baris, hari] = [_ke_menit(getattr(row, kolom)) for row in rows]
+        for kolom in ('lokasi_masuk', 'lokasi_keluar'):
+            blok[kolom][baris, hari] = [getattr(row, kolom) for row in rows]
+    return blok
+
+def blok_segar(fungsi):
+    """
+    Decorator: blok bulanan yang dipakai fungsi dibangun ulang dari primary (sekali per bulan per pemanggilan)
+    tanpa menaikkan generasi, cache milik pembaca lain tetap terpakai
+    """
+    @wraps(fungsi)
+    def wrapper(*args, **kwargs):
+        token = _blok_segar.set(set())
+        try:
+            return fungsi(*args, **kwargs)
+        finally:
+            _blok_segar.reset(token)
+    return wrapper
+
+def get_blok_bulan(bulan):
+    """
+    Blok absensi bulan yang memuat tanggal `bulan`, dari cache atau dibangun dengan satu range scan di primary.
+    Generasi dibaca sebelum membangun: tulis yang commit di tengah jalan menaikkan generasi, blok ini tidak terpakai.
+    Dengan CACHE_BACKEND=memory generasi per worker, tulis di worker lain terlihat setelah CACHE_TTL_PER_PROSES
+    """
+    bulan = _awal_bulan(bulan)
+    key = (bulan.isoformat(), get_generasi(nama_bulan_absensi(bulan)))
+    segar = _blok_segar.get()
+    blok = None if segar is not None and bulan not in segar else bulan_absensi_cache.get(key)
+    if blok is None:
+        blok = _bangun_blok(bulan)
+        # Blok baru dari primary tidak lebih lama dari isi cache dengan generasi yang sama -> boleh menimpa
+        bulan_absensi_cache.set(key, blok)
+        if segar is not None:
+            segar.add(bulan)
+    return blok
+
+
+def get_matriks_absensi(start_date, end_date, karyawan):
+    """
+    Matriks [karyawan x hari] untuk [start_date, end_date] (start_date <= end_date) dari blok bulanan.
+    karyawan: daftar id_karyawan, urutan baris hasil. Return dict kolom KOLOM_BLOK -> array,
+    + 'nama_status' dan 'id_tidak_hadir'. SQLAlchemyError diteruskan ke pemanggil
+    """
+    karyawan = np.asarray(karyawan, dtype=np.int64)
+    bagian = {kolom: [] for kolom in KOLOM_BLOK}
+    bulan = _awal_bulan(start_date)
+    while bulan <= end_date:
+        blok = get_blok_bulan(bulan)
+        awal = (max(start_date, bulan) - bulan).days
+        akhir = (min(end_date, _akhir_bulan(bulan)) - bulan).days + 1
+
+        # Posisi tiap karyawan di blok, karyawan tanpa absensi bulan ini tetap kosong
+        posisi = np.searchsorted(blok['karyawan'], karyawan)
+        ada = posisi < len(blok['karyawan'])
+        ada[ada] = blok['karyawan'][posisi[ada]] == karyawan[ada]
+
+        for kolom, (dtype, kosong) in KOLOM_BLOK.items():
+            matriks = np.full((len(karyawan), akhir - awal), kosong, dtype=dtype)
+            matriks[ada] = blok[kolom][posisi[ada], awal:akhir]
+            bagian[kolom].append(matriks)
+        bulan = _akhir_bulan(bulan) + timedelta(days=1)
+
+    hasil = {kolom: np.concatenate(daftar, axis=1) for kolom, daftar in bagian.items()}
+    hasil['nama_status'] = blok['nama_status']
+    hasil['id_tidak_hadir'] = blok['id_tidak_hadir']
+    return hasil
@@ -3,9 +3,37 @@ from sqlalchemy import text
 from sqlalchemy.exc import SQLAlchemyError
 
 from ..utils.helpers import serialize_row
+from ..utils.cache import naikkan_generasi
 from ..utils.config import get_connection, get_wita, get_timezone
 
 # query/q_hutang.py
+def versi_hutang(status_hutang=None):
+    """Versi daftar hutang (jumlah & updated_at terakhir hutang, karyawan, pembayaran) untuk ETag, None jika gagal"""
+    engine = get_connection()
+    try:
+        with engine.connect() as conn:
+            query = """
+                SELECT COUNT(DISTINCT h.id_hutang), MAX(h.updated_at), MAX(k.updated_at),
+                       COUNT(ph.id_hutang), MAX(ph.updated_at)
+                FROM hutang h
+                JOIN karyawan k ON k.id_karyawan = h.id_karyawan
+                LEFT JOIN pembayaran_hutang ph 
+                    ON ph.id_hutang = h.id_hutang AND ph.status = 1
+                WHERE h.status = 1 
+                  AND k.status = 1
+            """
+            params = {}
+
+            if status_hutang:
+                query += " AND h.status_hutang = :status_hutang"
+                params["status_hutang"] = status_hutang
+
+            return tuple(conn.execute(text(query), params).fetchone())
+
+    except SQLAlchemyError as e:
+        print(f"[error GET versi hutang] {e}")
+        return None
+
 def get_all_hutang(status_hutang=None):
     engine = get_connection()
     try:
@@ -138,7 +166,8 @@ def soft_delete_hutang_by_id(id_hutang):
                 "id_hutang": id_hutang,
                 "timestamp_wita": get_wita()
             })
-            return True
+        naikkan_generasi('hutang')
+        return True
     except SQLAlchemyError as e:
         print(f"[error SOFT DELETE hutang] {e}")
         return None
@@ -297,7 +326,8 @@ def create_pembayaran_hutang_by_karyawan(id_karyawan, nominal, metode, keteranga
                         "timestamp_wita": get_wita()
                     })
 
-            return {"message": f"Pembayaran berhasil dicatat sebanyak {nominal - sisa_nominal}."}, 200
+        naikkan_generasi('hutang')
+        return {"message": f"Pembayaran berhasil dicatat sebanyak {nominal - sisa_nominal}."}, 200
     except Exception as e:
         return {"message": str(e)}, 500
 
@@ -2,7 +2,10 @@ from datetime import date, datetime, timedelta
 from sqlalchemy.sql import text
 from sqlalchemy.exc import SQLAlchemyError
 
+from ..utils.cache import invalidate_presensi, invalidate_bulan_absensi, naikkan_generasi
 from ..utils.config import get_connection, get_wita
+from .q_penutupan import get_id_tidak_hadir
+from .q_rekap_bulanan import refresh_rekap_bulanan
 
 
 def daterange(start_date, end_date):
@@ -10,6 +13,44 @@ def daterange(start_date, end_date):
     for n in range(int((end_date - start_date).days) + 1):
         yield start_date + timedelta(n)
 
+def _filter_izin(status_izin=None, id_karyawan=None, start_date=None, end_date=None, tanggal=None):
+    """Filter daftar izin (alias i), dipakai bersama oleh get_daftar_izin & versi_daftar_izin"""
+    query = ""
+    params = {}
+
+    if status_izin:
+        query += " AND i.status_izin = :status_izin"
+        params['status_izin'] = status_izin
+    if id_karyawan:
+        query += " AND i.id_karyawan = :id_karyawan"
+        params['id_karyawan'] = int(id_karyawan)
+
+    if tanggal:
+        query += " AND :tanggal BETWEEN i.tgl_mulai AND i.tgl_selesai"
+        params['tanggal'] = tanggal
+    elif start_date and end_date:
+        query += " AND i.tgl_mulai BETWEEN :start_date AND :end_date"
+        params['start_date'] = start_date
+        params['end_date'] = end_date
+    return query, params
+
+def versi_daftar_izin(status_izin=None, id_karyawan=None, start_date=None, end_date=None, tanggal=None):
+    """Versi daftar izin (jumlah, updated_at terakhir izin & karyawan) untuk ETag, None jika gagal"""
+    engine = get_connection()
+    try:
+        with engine.connect() as connection:
+            filter_sql, params = _filter_izin(status_izin, id_karyawan, start_date, end_date, tanggal)
+            return tuple(connection.execute(text(f"""
+                SELECT COUNT(*), MAX(i.updated_at), MAX(k.updated_at)
+                FROM izin i
+                JOIN karyawan k ON i.id_karyawan = k.id_karyawan
+                JOIN statuspresensi j ON i.id_jenis = j.id_status
+                WHERE i.status = 1 {filter_sql}
+            """), params).fetchone())
+    except SQLAlchemyError as e:
+        print(f"DB Error: {str(e)}")
+        return None
+
 def get_daftar_izin(status_izin=None, id_karyawan=None, start_date=None, end_date=None, tanggal=None):
     engine = get_connection()
     try:
@@ -24,24 +65,8 @@ def get_daftar_izin(status_izin=None, id_karyawan=None, start_date=None, end_dat
                 JOIN statuspresensi j ON i.id_jenis = j.id_status
                 WHERE i.status = 1
             """
-            params = {}
-
-            if status_izin:
-                query += " AND i.status_izin = :status_izin"
-                params['status_izin'] = status_izin
-            if id_karyawan:
-                query += " AND i.id_karyawan = :id_karyawan"
-                params['id_karyawan'] = int(id_karyawan)
-
-            if tanggal:
-                query += " AND :tanggal BETWEEN i.tgl_mulai AND i.tgl_selesai"
-                params['tanggal'] = tanggal
-            elif start_date and end_date:
-                query += " AND i.tgl_mulai BETWEEN :start_date AND :end_date"
-                params['start_date'] = start_date
-                params['end_date'] = end_date
-
-            query += " ORDER BY i.created_at DESC"
+            filter_sql, params = _filter_izin(status_izin, id_karyawan, start_date, end_date, tanggal)
+            query += filter_sql + " ORDER BY i.created_at DESC"
 
             result = connection.execute(text(query), params).mappings().fetchall()
 
@@ -165,20 +190,31 @@ def setujui_izin_dan_insert_absensi(id_izin):
 
             for tanggal in daterange(tgl_mulai, tgl_selesai):
                 connection.execute(text("""
-                    INSERT INTO absensi (
+                    INSERT INTO absensi AS a (
                         id_karyawan, tanggal, id_status, status,
                         created_at, updated_at
                     ) VALUES (
                         :id_karyawan, :tanggal, :id_status, 1,
                         :timestamp_wita, :timestamp_wita
                     )
+                    ON CONFLICT (id_karyawan, tanggal) WHERE status = 1 DO UPDATE SET
+                        id_status = EXCLUDED.id_status,
+                        updated_at = EXCLUDED.updated_at
+                    WHERE a.id_status = :id_tidak_hadir
                 """), {
                     "id_karyawan": id_karyawan,
                     "tanggal": tanggal,
                     "id_status": id_status,
+                    "id_tidak_hadir": get_id_tidak_hadir(connection),
                     "timestamp_wita": get_wita()
                 })
-            return 1
+            refresh_rekap_bulanan(connection, id_karyawan, tgl_mulai, tgl_selesai)
+
+        for tanggal in daterange(tgl_mulai, tgl_selesai):
+            invalidate_presensi(id_karyawan, tanggal)
+        invalidate_bulan_absensi(tgl_mulai, tgl_selesai)
+        naikkan_generasi('izin')
+        return 1
     except SQLAlchemyError as e:
         print(f"DB Error: {str(e)}")
         return None
@@ -221,21 +257,31 @@ def setujui_izin_potong_cuti(id_izin):
             # Tambahkan Data untuk absensi
             for tanggal in daterange(tgl_mulai, tgl_selesai):
                 connection.execute(text("""
-                    INSERT INTO absensi (
+                    INSERT INTO absensi AS a (
                         id_karyawan, tanggal, id_status, status,
                         created_at, updated_at
                     ) VALUES (
                         :id_karyawan, :tanggal, :id_status, 1,
                         :timestamp_wita, :timestamp_wita
                     )
+                    ON CONFLICT (id_karyawan, tanggal) WHERE status = 1 DO UPDATE SET
+                        id_status = EXCLUDED.id_status,
+                        updated_at = EXCLUDED.updated_at
+                    WHERE a.id_status = :id_tidak_hadir
                 """), {
                     "id_karyawan": id_karyawan,
                     "tanggal": tanggal,
                     "id_status": id_status,
+                    "id_tidak_hadir": get_id_tidak_hadir(connection),
                     "timestamp_wita": get_wita()
                 })
+            refresh_rekap_bulanan(connection, id_karyawan, tgl_mulai, tgl_selesai)
 
-            return 1
+        for tanggal in daterange(tgl_mulai, tgl_selesai):
+            invalidate_presensi(id_karyawan, tanggal)
+        invalidate_bulan_absensi(tgl_mulai, tgl_selesai)
+        naikkan_generasi('izin')
+        return 1
     except SQLAlchemyError as e:
         print(f"[ERROR] setujui_izin_potong_cuti: {e}")
         return None
@@ -260,7 +306,8 @@ def tolak_izin(id_izin, alasan_penolakan):
                 "alasan": alasan_penolakan,
                 "timestamp_wita": get_wita()
             })
-            return 1
+        naikkan_generasi('izin')
+        return 1
     except SQLAlchemyError as e:
         print(f"DB Error: {str(e)}")
         return None
@@ -280,7 +327,8 @@ def hapus_izin(id_izin):
                     "updated_at": get_wita()
                 }
             )
-            return True
+        naikkan_generasi('izin')
+        return True
     except SQLAlchemyError as e:
         print(f"DB Error (hapus_izin): {str(e)}")
         return False
@@ -329,7 +377,11 @@ def update_absensi_izin_setengah_hari(id_karyawan, tanggal, jam_keluar, lokasi_k
                 "id_karyawan": id_karyawan,
                 "tanggal": tanggal
             })
-            return 1
+            refresh_rekap_bulanan(connection, id_karyawan, tanggal)
+
+        invalidate_presensi(id_karyawan, tanggal)
+        invalidate_bulan_absensi(tanggal)
+        return 1
     except SQLAlchemyError as e:
         print(f"DB Error: {str(e)}")
         return None
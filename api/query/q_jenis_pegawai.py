@@ -1,5 +1,6 @@
 from sqlalchemy import text
 from sqlalchemy.exc import SQLAlchemyError
+from ..utils.cache import naikkan_generasi
 from ..utils.config import get_connection, get_wita
 
 
@@ -26,7 +27,8 @@ def insert_jenis_pegawai(payload):
                 VALUES (:jenis, 1, :timestamp_wita, timestamp_wita)
                 RETURNING jenis
             """), {**payload, "timestamp_wita": get_wita()}).mappings().fetchone()
-            return dict(result)
+        naikkan_generasi('karyawan')
+        return dict(result)
     except SQLAlchemyError as e:
         print(f"Error occurred: {str(e)}")
         return None
@@ -58,7 +60,8 @@ def update_jenis(id_jenis, payload):
                     ),
                 {**payload, "id_jenis": id_jenis, "timestamp_wita": get_wita()}
             ).fetchone()
-            return result
+        naikkan_generasi('karyawan')
+        return result
     except SQLAlchemyError as e:
         print(f"Error: {e}")
         return None
@@ -72,7 +75,8 @@ def delete_jenis(id_jenis):
                     WHERE status = 1 AND id_jenis = :id_jenis RETURNING jenis;"""),
                 {"id_jenis": id_jenis, "timestamp_wita": get_wita()}
             ).fetchone()
-            return result
+        naikkan_generasi('karyawan')
+        return result
     except SQLAlchemyError as e:
         print(f"Error: {e}")
         return None
\ No newline at end of file
@@ -1,201 +1,136 @@
-from datetime import datetime
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal, ROUND_HALF_UP
+import numpy as np
 from sqlalchemy import text
-from sqlalchemy.exc import SQLAlchemyError
-from calendar import monthrange
 
 from ..utils.config import get_connection
-from ..utils.helpers import decimal_to_float, serialize_time
+from ..utils.helpers import serialize_time
+from .q_absensi_bulanan import KOSONG, get_matriks_absensi, nilai_menit
 
 
-def get_leaderboard_kerajinan(start_date=None, end_date=None):
+# Batas poin kerajinan 07:45, dalam mikrodetik (satuan jam_masuk di blok absensi)
+BATAS_POIN = (7 * 60 + 45) * 60 * 1_000_000
+
+
+def _get_karyawan_aktif():
     engine = get_connection()
-    today = datetime.today().date()
-
-    # Fallback dan konversi tanggal
-    if isinstance(start_date, str):
-        start_date = datetime.strptime(start_date, "%Y-%m-%d").date()
-    if isinstance(end_date, str):
-        end_date = datetime.strptime(end_date, "%Y-%m-%d").date()
-
-    if start_date is None and end_date is None:
-        start_date = today.replace(day=1)
-        end_date = today
-    elif start_date is not None and end_date is None:
-        end_date = today
-    elif end_date is not None and start_date is None:
-        start_date = end_date.replace(day=1)
-
-    try:
-        with engine.connect() as connection:
-            query = text("""
-                WITH tanggal_kerja AS (
-                    SELECT generate_series(:start_date, :end_date, interval '1 day')::date AS tanggal
-                ),
-                semua_karyawan AS (
-                    SELECT id_karyawan, nama, jk.jenis
-                    FROM karyawan k
-                    LEFT JOIN jeniskaryawan jk ON k.id_jenis = jk.id_jenis
-                    WHERE k.status = 1
-                ),
-                presensi AS (
-                    SELECT
-                        a.id_karyawan,
-                        a.tanggal,
-                        a.id_status,
-                        a.jam_masuk,
-                        a.jam_terlambat,
-                        a.jam_kurang,
-                        a.total_jam_kerja,
-                        CASE 
-                            WHEN a.id_status = 1 AND a.jam_masuk < TIME '07:45'
-                            THEN GREATEST(0, EXTRACT(MINUTE FROM (TIME '07:45' - a.jam_masuk)))
-                            ELSE 0
-                        END AS poin_hari_ini
-                    FROM absensi a
-                    WHERE a.tanggal BETWEEN :start_date AND :end_date
-                ),
-                rekap AS (
-                    SELECT
-                        s.id_karyawan,
-                        s.nama,
-                        s.jenis,
-                        t.tanggal,
-                        COALESCE(p.id_status, 0) AS id_status,
-                        COALESCE(p.total_jam_kerja, 0) AS total_jam_kerja,
-                        COALESCE(p.jam_terlambat, 0) AS jam_terlambat,
-                        COALESCE(p.jam_kurang, 0) AS jam_kurang,
-                        COALESCE(p.poin_hari_ini, 0) AS poin_hari_ini
-                    FROM semua_karyawan s
-                    CROSS JOIN tanggal_kerja t
-                    LEFT JOIN presensi p ON s.id_karyawan = p.id_karyawan AND t.tanggal = p.tanggal
-                )
-                SELECT
-                    id_karyawan,
-                    nama,
-                    jenis,
-                    COUNT(*) FILTER (WHERE id_status = 1) AS jumlah_hadir,
-                    COUNT(*) FILTER (WHERE id_status = 3) AS jumlah_izin,
-                    COUNT(*) FILTER (WHERE id_status = 4) AS jumlah_sakit,
-                    COUNT(*) FILTER (WHERE id_status = 0) AS jumlah_alpha,
-                    208 AS jam_kerja_normal,
-                    SUM(total_jam_kerja/60) AS total_jam_kerja,
-                    SUM(jam_terlambat) AS jam_terlambat,
-                    SUM(jam_kurang) AS jam_kurang,
-                    SUM(poin_hari_ini) AS waktu_lebih,
-                    ROUND(
-                        CASE 
-                            WHEN COUNT(*) FILTER (WHERE id_status = 1) > 0 
-                            THEN SUM(poin_hari_ini)::numeric / 26
-                            ELSE 0 
-                        END, 2
-                    ) AS poin,
-                    (
-                        TIME '07:45' - make_interval(mins => 
-                                ROUND(
-                                    CASE 
-                                        WHEN COUNT(*) FILTER (WHERE id_status = 1) > 0 
-                                        THEN SUM(poin_hari_ini)::numeric / COUNT(*) FILTER (WHERE id_status = 1) 
-                                        ELSE 0 
-                                    END
-                                )::int
-                            )
-                        ) AS rata_rata_checkin
-                FROM rekap
-                GROUP BY id_karyawan, nama, jenis
-                ORDER BY poin DESC;
-            """)
-            result = connection.execute(query, {
-                'start_date': start_date,
-                'end_date': end_date
-            })
-            return [{k: serialize_time(v) for k, v in dict(row).items()} for row in result.mappings()]
-    except SQLAlchemyError as e:
-        print(f"Error occurred: {str(e)}")
+    with engine.connect() as connection:
+        return connection.execute(text("""
+            SELECT k.id_karyawan, k.nama, jk.jenis
+            FROM karyawan k
+            LEFT JOIN jeniskaryawan jk ON k.id_jenis = jk.id_jenis
+            WHERE k.status = 1
+            ORDER BY k.id_karyawan
+        """)).fetchall()
+
+def _status_leaderboard(m):
+    """
+    id_status per hari. Baris 'Tidak Hadir' hasil penutupan harian diperlakukan seperti tidak ada absensi:
+    dihitung alpha (0) dan kolom menit/jam dikosongkan (matriks m diubah di tempat)
+    """
+    status = m['status'].astype(np.int32)
+    if m['id_tidak_hadir'] is not None:
+        tidak_hadir = status == m['id_tidak_hadir']
+        status[tidak_hadir] = 0
+        m['jam_masuk'][tidak_hadir] = -1
+        for kolom in ('jam_terlambat', 'jam_kurang', 'total_jam_kerja'):
+            m[kolom][tidak_hadir] = KOSONG
+    return status
+
+def _bagi_int(a, b):
+    """Pembagian integer Postgres (dibulatkan ke arah nol)"""
+    return np.sign(a) * (np.abs(a) // b)
+
+def _round(nilai, digit):
+    """ROUND(numeric, digit) Postgres: half away from zero"""
+    return Decimal(nilai).quantize(Decimal(1).scaleb(-digit), rounding=ROUND_HALF_UP)
+
+
+def hitung_kerajinan(start_date, end_date):
+    """Peringkat paling rajin [start_date, end_date] dari blok absensi bulanan. SQLAlchemyError diteruskan"""
+    if start_date > end_date:
+        return []
+    karyawan = _get_karyawan_aktif()
+    if not karyawan:
         return []
+    m = get_matriks_absensi(start_date, end_date, [row.id_karyawan for row in karyawan])
 
-def get_leaderboard_kurang_disiplin(start_date=None, end_date=None):
-    engine = get_connection()
-    today = datetime.today().date()
-
-    # Konversi dari string ke date
-    if isinstance(start_date, str):
-        start_date = datetime.strptime(start_date, "%Y-%m-%d").date()
-    if isinstance(end_date, str):
-        end_date = datetime.strptime(end_date, "%Y-%m-%d").date()
-
-    # Fallback logika tanggal
-    if start_date is None and end_date is None:
-        start_date = today.replace(day=1)
-        end_date = today
-    elif start_date is not None and end_date is None:
-        end_date = today
-    elif end_date is not None and start_date is None:
-        start_date = end_date.replace(day=1)
-
-    try:
-        with engine.connect() as connection:
-            query = text("""
-                WITH tanggal_kerja AS (
-                    SELECT generate_series(:start_date, :end_date, interval '1 day')::date AS tanggal
-                ),
-                semua_karyawan AS (
-                    SELECT id_karyawan, nama, jk.jenis
-                    FROM karyawan k
-                    LEFT JOIN jeniskaryawan jk ON k.id_jenis = jk.id_jenis
-                    WHERE k.status = 1
-                ),
-                presensi AS (
-                    SELECT
-                        a.id_karyawan,
-                        a.tanggal,
-                        a.id_status,
-                        a.total_jam_kerja,
-                        CASE 
-                            WHEN a.id_status = 1 AND a.jam_terlambat < 240 THEN a.jam_terlambat
-                            ELSE 0
-                        END AS jam_terlambat_valid
-                    FROM absensi a
-                    WHERE a.tanggal BETWEEN :start_date AND :end_date
-                ),
-                rekap AS (
-                    SELECT
-                        s.id_karyawan,
-                        s.nama,
-                        s.jenis,
-                        t.tanggal,
-                        COALESCE(p.id_status, 0) AS id_status,
-                        COALESCE(p.total_jam_kerja, 0) AS total_jam_kerja,
-                        COALESCE(p.jam_terlambat_valid, 0) AS jam_terlambat
-                    FROM semua_karyawan s
-                    CROSS JOIN tanggal_kerja t
-                    LEFT JOIN presensi p ON s.id_karyawan = p.id_karyawan AND t.tanggal = p.tanggal
-                )
-                SELECT
-                    id_karyawan,
-                    nama,
-                    jenis,
-                    COUNT(*) FILTER (WHERE id_status = 1) AS jumlah_hadir,
-                    COUNT(*) FILTER (WHERE id_status = 3) AS jumlah_izin,
-                    COUNT(*) FILTER (WHERE id_status = 4) AS jumlah_sakit,
-                    COUNT(*) FILTER (WHERE id_status = 0) AS jumlah_alpha,
-                    SUM(total_jam_kerja / 60) AS total_jam_kerja,
-                    SUM(jam_terlambat) AS total_jam_terlambat,
-                    ROUND(
-                        CASE 
-                            WHEN COUNT(*) FILTER (WHERE id_status = 1) > 0 
-                            THEN SUM(jam_terlambat) / COUNT(*) FILTER (WHERE id_status = 1)
-                            ELSE 0 
-                        END, 2
-                    ) AS rata_rata_terlambat
-                FROM rekap
-                GROUP BY id_karyawan, nama, jenis
-                ORDER BY total_jam_terlambat DESC;
-            """)
-            result = connection.execute(query, {
-                'start_date': start_date,
-                'end_date': end_date
-            })
-            return [decimal_to_float(dict(row)) for row in result.mappings()]
-    except SQLAlchemyError as e:
-        print(f"Error occurred: {str(e)}")
+    status = _status_leaderboard(m)
+    hadir = status == 1
+
+    # Poin: menit sebelum 07:45 saat hadir, komponen menit saja (EXTRACT(MINUTE FROM interval) di SQL lama)
+    jam_masuk = m['jam_masuk']
+    poin_hari = np.where(
+        hadir & (jam_masuk >= 0) & (jam_masuk < BATAS_POIN),
+        (BATAS_POIN - jam_masuk) // 60_000_000 % 60,
+        0
+    )
+
+    jumlah_hadir = hadir.sum(axis=1)
+    total_jam_kerja = _bagi_int(nilai_menit(m['total_jam_kerja']), 60).sum(axis=1)
+    jam_terlambat = nilai_menit(m['jam_terlambat']).sum(axis=1)
+    jam_kurang = nilai_menit(m['jam_kurang']).sum(axis=1)
+    waktu_lebih = poin_hari.sum(axis=1)
+
+    hasil = []
+    for i, row in enumerate(karyawan):
+        hadir_i, poin_i = int(jumlah_hadir[i]), int(waktu_lebih[i])
+        rata_menit = _round(Decimal(poin_i) / hadir_i, 0) if hadir_i > 0 else 0
+        hasil.append({
+            'id_karyawan': row.id_karyawan,
+            'nama': row.nama,
+            'jenis': row.jenis,
+            'jumlah_hadir': hadir_i,
+            'jumlah_izin': int((status[i] == 3).sum()),
+            'jumlah_sakit': int((status[i] == 4).sum()),
+            'jumlah_alpha': int((status[i] == 0).sum()),
+            'jam_kerja_normal': 208,
+            'total_jam_kerja': int(total_jam_kerja[i]),
+            'jam_terlambat': int(jam_terlambat[i]),
+            'jam_kurang': int(jam_kurang[i]),
+            'waktu_lebih': float(poin_i),
+            'poin': float(_round(Decimal(poin_i) / 26, 2)) if hadir_i > 0 else 0.0,
+            'rata_rata_checkin': serialize_time(
+                (datetime.combine(date.min, time(7, 45)) - timedelta(minutes=int(rata_menit))).time()
+            ),
+        })
+    return sorted(hasil, key=lambda item: item['poin'], reverse=True)
+
+def hitung_kurang_disiplin(start_date, end_date):
+    """Peringkat kurang disiplin [start_date, end_date] dari blok absensi bulanan. SQLAlchemyError diteruskan"""
+    if start_date > end_date:
         return []
+    karyawan = _get_karyawan_aktif()
+    if not karyawan:
+        return []
+    m = get_matriks_absensi(start_date, end_date, [row.id_karyawan for row in karyawan])
+
+    status = _status_leaderboard(m)
+    hadir = status == 1
+
+    # Terlambat dihitung hanya saat hadir dan < 4 jam
+    jam_terlambat = m['jam_terlambat']
+    terlambat_valid = np.where(hadir & (jam_terlambat != KOSONG) & (jam_terlambat < 240), jam_terlambat, 0)
+
+    jumlah_hadir = hadir.sum(axis=1)
+    total_jam_kerja = _bagi_int(nilai_menit(m['total_jam_kerja']), 60).sum(axis=1)
+    total_jam_terlambat = terlambat_valid.sum(axis=1)
+
+    hasil = []
+    for i, row in enumerate(karyawan):
+        hadir_i, terlambat_i = int(jumlah_hadir[i]), int(total_jam_terlambat[i])
+        hasil.append({
+            'id_karyawan': row.id_karyawan,
+            'nama': row.nama,
+            'jenis': row.jenis,
+            'jumlah_hadir': hadir_i,
+            'jumlah_izin': int((status[i] == 3).sum()),
+            'jumlah_sakit': int((status[i] == 4).sum()),
+            'jumlah_alpha': int((status[i] == 0).sum()),
+            'total_jam_kerja': int(total_jam_kerja[i]),
+            'total_jam_terlambat': terlambat_i,
+            # Pembagian integer seperti SUM(int) / COUNT(*) di SQL lama
+            'rata_rata_terlambat': float(_bagi_int(terlambat_i, hadir_i)) if hadir_i > 0 else 0.0,
+        })
+    return sorted(hasil, key=lambda item: item['total_jam_terlambat'], reverse=True)
+
@@ -2,7 +2,9 @@ from datetime import date, datetime, time, timedelta
 from sqlalchemy.sql import text
 from sqlalchemy.exc import SQLAlchemyError
 
+from ..utils.cache import naikkan_generasi
 from ..utils.config import get_connection, get_wita
+from ..utils.kalender import is_hari_libur
 
 
 def hitung_bayaran_lembur(id_karyawan, tanggal, jam_mulai, jam_selesai):
@@ -22,16 +24,8 @@ def hitung_bayaran_lembur(id_karyawan, tanggal, jam_mulai, jam_selesai):
         id_jenis = result.id_jenis
         id_tipe = result.id_tipe
 
-        # Cek hari libur nasional
-        libur_query = text("""
-            SELECT 1 FROM liburnasional
-            WHERE status = 1 AND tanggal = :tanggal
-            LIMIT 1
-        """)
-        libur_result = conn.execute(libur_query, {"tanggal": tanggal}).scalar()
-
-        is_minggu = tanggal.weekday() == 6
-        is_libur = is_minggu or libur_result is not None
+        # Cek hari Minggu / libur nasional
+        is_libur = is_hari_libur(tanggal)
 
         # Gaji per hari langsung jika pegawai tidak tetap
         if id_tipe == 2:
@@ -111,6 +105,43 @@ def insert_pengajuan_lembur(data):
         print("DB Error:", str(e))
         return None
     
+def _filter_lembur(status_lembur=None, id_karyawan=None, start_date=None, end_date=None, tanggal=None):
+    """Filter daftar lembur (alias l), dipakai bersama oleh get_daftar_lembur & versi_daftar_lembur"""
+    query = ""
+    params = {}
+
+    if status_lembur:
+        query += " AND l.status_lembur = :status_lembur"
+        params['status_lembur'] = status_lembur
+    if id_karyawan:
+        query += " AND l.id_karyawan = :id_karyawan"
+        params['id_karyawan'] = int(id_karyawan)
+
+    if tanggal:
+        query += " AND l.tanggal = :tanggal"
+        params['tanggal'] = tanggal
+    elif start_date and end_date:
+        query += " AND l.tanggal BETWEEN :start_date AND :end_date"
+        params['start_date'] = start_date
+        params['end_date'] = end_date
+    return query, params
+
+def versi_daftar_lembur(status_lembur=None, id_karyawan=None, start_date=None, end_date=None, tanggal=None):
+    """Versi daftar lembur (jumlah, updated_at terakhir lembur & karyawan) untuk ETag, None jika gagal"""
+    engine = get_connection()
+    try:
+        with engine.connect() as connection:
+            filter_sql, params = _filter_lembur(status_lembur, id_karyawan, start_date, end_date, tanggal)
+            return tuple(connection.execute(text(f"""
+                SELECT COUNT(*), MAX(l.updated_at), MAX(k.updated_at)
+                FROM lembur l
+                JOIN karyawan k ON l.id_karyawan = k.id_karyawan
+                WHERE l.status = 1 {filter_sql}
+            """), params).fetchone())
+    except SQLAlchemyError as e:
+        print(f"DB Error: {str(e)}")
+        return None
+
 def get_daftar_lembur(status_lembur=None, id_karyawan=None, start_date=None, end_date=None, tanggal=None):
     engine = get_connection()
     try:
@@ -125,24 +156,8 @@ def get_daftar_lembur(status_lembur=None, id_karyawan=None, start_date=None, end
                 JOIN karyawan k ON l.id_karyawan = k.id_karyawan
                 WHERE l.status = 1
             """
-            params = {}
-
-            if status_lembur:
-                query += " AND l.status_lembur = :status_lembur"
-                params['status_lembur'] = status_lembur
-            if id_karyawan:
-                query += " AND l.id_karyawan = :id_karyawan"
-                params['id_karyawan'] = int(id_karyawan)
-
-            if tanggal:
-                query += " AND l.tanggal = :tanggal"
-                params['tanggal'] = tanggal
-            elif start_date and end_date:
-                query += " AND l.tanggal BETWEEN :start_date AND :end_date"
-                params['start_date'] = start_date
-                params['end_date'] = end_date
-
-            query += " ORDER BY l.created_at DESC"
+            filter_sql, params = _filter_lembur(status_lembur, id_karyawan, start_date, end_date, tanggal)
+            query += filter_sql + " ORDER BY l.created_at DESC"
 
             result = connection.execute(text(query), params).mappings().fetchall()
 
@@ -230,7 +245,8 @@ def setujui_lembur(id_lembur):
                 "timestamp_wita": get_wita()
             })
 
-            return 1  # Berhasil
+        naikkan_generasi('lembur')
+        return 1  # Berhasil
     except SQLAlchemyError as e:
         print(f"[DB Error] Gagal setujui lembur: {e}")
         return None
@@ -249,7 +265,8 @@ def tolak_lembur(id_lembur):
                 "timestamp_wita": get_wita()
             })
 
-            return 1  # Berhasil
+        naikkan_generasi('lembur')
+        return 1  # Berhasil
     except SQLAlchemyError as e:
         print(f"[DB Error] Gagal tolak lembur: {e}")
         return None
@@ -279,7 +296,8 @@ def update_lembur_by_id(data):
                 "updated_at": get_wita(),
                 "id_lembur": data['id_lembur']
             })
-            return 1
+        naikkan_generasi('lembur')
+        return 1
     except SQLAlchemyError as e:
         print(f"Update Lembur Error: {str(e)}")
         return None
@@ -299,7 +317,8 @@ def hapus_lembur(id_lembur):
                     "updated_at": get_wita()
                 }
             )
-            return True
+        naikkan_generasi('lembur')
+        return True
     except SQLAlchemyError as e:
         print(f"DB Error (hapus_lembur): {str(e)}")
         return False
@@ -3,6 +3,7 @@ from sqlalchemy.exc import SQLAlchemyError
 from datetime import date, datetime, timedelta
 
 from ..utils.config import get_connection
+from ..utils.kalender import is_hari_libur
 
 
 def get_hari_libur():
@@ -41,23 +42,6 @@ def get_hari_libur():
 
 def is_libur(tanggal: str) -> bool:
     try:
-        cek_tanggal = datetime.strptime(tanggal, '%Y-%m-%d').date()
-
-        # Cek hari minggu
-        if cek_tanggal.weekday() == 6:
-            return True
-
-        engine = get_connection()
-        with engine.connect() as connection:
-            result = connection.execute(text("""
-                SELECT 1 FROM liburnasional
-                WHERE tanggal = :tanggal AND status = 1
-                LIMIT 1
-            """), {"tanggal": cek_tanggal}).scalar()
-
-            return bool(result)
+        return is_hari_libur(datetime.strptime(tanggal, '%Y-%m-%d').date())
     except ValueError:
         return False
-    except SQLAlchemyError as e:
-        print(f"DB Error: {str(e)}")
-        return False
@@ -0,0 +1,43 @@
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from ..utils.config import get_connection
+
+
+def get_lokasi_absensi_aktif():
+    """Semua lokasi aktif beserta grupnya. None jika gagal (tabel belum ada / DB error)"""
+    engine = get_connection()
+    try:
+        with engine.connect() as connection:
+            result = connection.execute(text("""
+                SELECT l.id_lokasi, l.nama, l.latitude, l.longitude, l.radius, g.grup
+                FROM lokasi_absensi l
+                JOIN lokasi_grup g ON g.id_lokasi = l.id_lokasi
+                WHERE l.status = 1
+                ORDER BY l.id_lokasi
+            """)).mappings().fetchall()
+
+            lokasi = {}
+            for row in result:
+                item = lokasi.setdefault(row['id_lokasi'], {
+                    'name': row['nama'],
+                    'lat': float(row['latitude']),
+                    'lon': float(row['longitude']),
+                    'radius': float(row['radius']),
+                    'grup': [],
+                })
+                item['grup'].append(row['grup'])
+            return list(lokasi.values())
+    except SQLAlchemyError as e:
+        print(f"Error occurred: {str(e)}")
+        return None
+
+def get_grup_lokasi_karyawan():
+    """{id_karyawan: grup}. None jika gagal"""
+    engine = get_connection()
+    try:
+        with engine.connect() as connection:
+            result = connection.execute(text("SELECT id_karyawan, grup FROM karyawan_lokasi")).fetchall()
+            return {row[0]: row[1] for row in result}
+    except SQLAlchemyError as e:
+        print(f"Error occurred: {str(e)}")
+        return None
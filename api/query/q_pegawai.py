@@ -1,6 +1,7 @@
 from sqlalchemy import text
 from werkzeug.security import generate_password_hash
 from sqlalchemy.exc import SQLAlchemyError
+from ..utils.cache import profil_cache, naikkan_generasi
 from ..utils.config import get_connection, get_wita
 
 
@@ -40,7 +41,8 @@ def insert_pegawai(payload):
                 VALUES (:nip, :id_jenis, :id_tipe, :nama, :gaji_pokok, :username, :kode_pemulihan, :bank, :no_rekening, 1, :timestamp_wita, :timestamp_wita)
                 RETURNING nama
             """), {**payload, "timestamp_wita": get_wita()}).mappings().fetchone()
-            return dict(result)
+        naikkan_generasi('karyawan')
+        return dict(result)
     except SQLAlchemyError as e:
         print(f"Error occurred: {str(e)}")
         return None
@@ -106,7 +108,9 @@ def update_pegawai(id_karyawan, payload):
                     "no_rekening": payload.get("no_rekening")
                 }
             ).fetchone()
-            return result
+        profil_cache.pop(int(id_karyawan))  # setelah commit: id_jenis / status berubah
+        naikkan_generasi('karyawan')
+        return result
     except SQLAlchemyError as e:
         print(f"Error: {e}")
         return None
@@ -120,7 +124,9 @@ def delete_pegawai(id_karyawan):
                     WHERE status = 1 AND id_karyawan = :id_karyawan RETURNING nama;"""),
                 {"id_karyawan": id_karyawan, "timestamp_wita": get_wita()}
             ).fetchone()
-            return result
+        profil_cache.pop(int(id_karyawan))  # setelah commit: id_jenis / status berubah
+        naikkan_generasi('karyawan')
+        return result
     except SQLAlchemyError as e:
         print(f"Error: {e}")
         return None
@@ -0,0 +1,112 @@
+from datetime import timedelta
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+from ..utils.cache import invalidate_bulan_absensi
+from ..utils.config import get_connection, get_timezone, get_wita
+from ..utils.kalender import hitung_hari_kerja, is_hari_libur
+from .q_rekap_bulanan import refresh_rekap_bulanan
+
+
+# id_status 'Tidak Hadir' (baris hasil penutupan harian), lihat get_id_tidak_hadir
+_id_tidak_hadir = None
+
+
+def get_id_tidak_hadir(connection):
+    """id_status 'Tidak Hadir' untuk parameter query, dibaca sekali per proses. None jika belum ada di statuspresensi"""
+    global _id_tidak_hadir
+    if _id_tidak_hadir is None:
+        _id_tidak_hadir = connection.execute(text(
+            "SELECT id_status FROM statuspresensi WHERE nama_status = 'Tidak Hadir' ORDER BY id_status LIMIT 1"
+        )).scalar()
+    return _id_tidak_hadir
+
+
+def tutup_hari(tanggal):
+    """
+    Catat 'Tidak Hadir' untuk karyawan aktif tanpa absensi pada tanggal (hari kerja yang sudah lewat).
+    Idempoten, aman dijalankan ulang / untuk backfill.
+    Return {'tanggal', 'libur', 'tidak_hadir'} atau None jika gagal
+    """
+    today, _ = get_timezone()
+    if tanggal >= today:
+        raise ValueError("Hanya hari yang sudah selesai yang bisa ditutup")
+
+    # Minggu & libur nasional tidak dihitung alpha, tidak ditutup
+    if is_hari_libur(tanggal):
+        return {'tanggal': tanggal, 'libur': True, 'tidak_hadir': 0}
+
+    engine = get_connection()
+    try:
+        with engine.begin() as connection:
+            id_tidak_hadir = get_id_tidak_hadir(connection)
+            if id_tidak_hadir is None:
+                print("Error occurred: status presensi 'Tidak Hadir' tidak ditemukan")
+                return None
+
+            rows = connection.execute(text("""
+                INSERT INTO absensi (id_karyawan, tanggal, id_status, status, created_at, updated_at)
+                SELECT k.id_karyawan, :tanggal, :id_tidak_hadir, 1, :timestamp_wita, :timestamp_wita
+                FROM karyawan k
+                JOIN jeniskaryawan j ON k.id_jenis = j.id_jenis
+                WHERE k.status = 1 AND j.status = 1
+                  AND k.created_at::date <= :tanggal
+                ON CONFLICT (id_karyawan, tanggal) WHERE status = 1 DO NOTHING
+                RETURNING id_karyawan
+            """), {'tanggal': tanggal, 'id_tidak_hadir': id_tidak_hadir, 'timestamp_wita': get_wita()}).fetchall()
+
+            if rows:
+                refresh_rekap_bulanan(connection, None, tanggal)
+
+            jumlah = connection.execute(text("""
+                INSERT INTO penutupan_harian (tanggal, jumlah_tidak_hadir, ditutup_at)
+                SELECT :tanggal, COUNT(*), :timestamp_wita
+                FROM absensi
+                WHERE tanggal = :tanggal AND status = 1 AND id_status = :id_tidak_hadir
+                ON CONFLICT (tanggal) DO UPDATE SET
+                    jumlah_tidak_hadir = EXCLUDED.jumlah_tidak_hadir,
+                    ditutup_at = EXCLUDED.ditutup_at
+                RETURNING jumlah_tidak_hadir
+            """), {'tanggal': tanggal, 'id_tidak_hadir': id_tidak_hadir, 'timestamp_wita': get_wita()}).scalar()
+
+        # Selalu: hari yang tercatat ditutup mengubah is_periode_ditutup (rekap alpha) walau tanpa baris baru
+        invalidate_bulan_absensi(tanggal)
+        return {'tanggal': tanggal, 'libur': False, 'tidak_hadir': jumlah}
+    except SQLAlchemyError as e:
+        print(f"Error occurred: {str(e)}")
+        return None
+
+def tutup_hari_rentang(start_date, end_date):
+    """Backfill penutupan harian [start_date, end_date], satu transaksi per hari"""
+    tanggal = start_date
+    while tanggal <= end_date:
+        yield tutup_hari(tanggal)
+        tanggal += timedelta(days=1)
+
+
+def is_hari_ditutup(tanggal):
+    engine = get_connection()
+    try:
+        with engine.connect() as connection:
+            return connection.execute(
+                text("SELECT 1 FROM penutupan_harian WHERE tanggal = :tanggal"),
+                {'tanggal': tanggal}
+            ).fetchone() is not None
+    except SQLAlchemyError as e:
+        print(f"Error occurred: {str(e)}")
+        return False
+
+def is_periode_ditutup(start_date, end_date):
+    """True jika semua hari kerja di [start_date, end_date] sudah ditutup -> alpha = jumlah baris 'Tidak Hadir'"""
+    hari_kerja = hitung_hari_kerja(start_date, end_date)
+    engine = get_connection()
+    try:
+        with engine.connect() as connection:
+            jumlah = connection.execute(
+                text("SELECT COUNT(*) FROM penutupan_harian WHERE tanggal BETWEEN :start_date AND :end_date"),
+                {'start_date': start_date, 'end_date': end_date}
+            ).scalar()
+            return jumlah >= hari_kerja
+    except SQLAlchemyError as e:
+        print(f"Error occurred: {str(e)}")
+        return False
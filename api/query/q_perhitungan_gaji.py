@@ -1,51 +1,18 @@
+import calendar
 from datetime import date, time, timedelta
 from sqlalchemy import text
 from sqlalchemy.exc import SQLAlchemyError
 
-from ..utils.config import get_connection
+from ..utils.config import baca_replika, get_connection
+from ..utils.kalender import get_hari_kerja_bulan, hitung_hari_kerja
+from .q_penutupan import get_id_tidak_hadir, is_periode_ditutup
+from .q_rekap_bulanan import get_sumber_rekap
 
 
-def get_libur_nasional(start_date: date, end_date: date):
-    engine = get_connection()
-    try:
-        with engine.connect() as connection:
-            query = text("""
-                SELECT tanggal FROM liburnasional
-                WHERE status = 1 AND tanggal BETWEEN :start_date AND :end_date
-            """)
-            result = connection.execute(query, {'start_date': start_date, 'end_date': end_date}).mappings()
-            return set(row['tanggal'] for row in result)
-    except SQLAlchemyError as e:
-        print(f"Error: {str(e)}")
-        return set()
-    
 def get_hari_kerja_optimal(bulan, tahun):
-    from calendar import monthrange
-
-    start_date = date(tahun, bulan, 1)
-    end_date = date(tahun, bulan, monthrange(tahun, bulan)[1])
-
-    # Ambil semua libur nasional dari DB
-    engine = get_connection()
-    try:
-        with engine.connect() as connection:
-            query = text("""
-                SELECT tanggal FROM liburnasional
-                WHERE status = 1 AND tanggal BETWEEN :start AND :end
-            """)
-            libur_rows = connection.execute(query, {'start': start_date, 'end': end_date}).fetchall()
-            libur_set = {row[0] for row in libur_rows}
-    except SQLAlchemyError as e:
-        print(f"Error: {str(e)}")
-        return set()
-    
-    hari_kerja = 0
-    for i in range((end_date - start_date).days + 1):
-        current_day = start_date + timedelta(days=i)
-        if current_day.weekday() != 6 and current_day not in libur_set:
-            hari_kerja += 1
-    return hari_kerja
+    return get_hari_kerja_bulan(bulan, tahun)
 
+@baca_replika
 def get_rekap_gaji(start_date: date = None, end_date: date = None, tanggal: date = None, id_karyawan=None):
     engine = get_connection()
     try:
@@ -62,50 +29,41 @@ def get_rekap_gaji(start_date: date = None, end_date: date = None, tanggal: date
                 start_date = date(today.year, today.month, 1)
                 end_date = date(today.year, today.month, calendar.monthrange(today.year, today.month)[1])
 
-            libur_set = get_libur_nasional(start_date, end_date)
-
-            # hitung sisa hari kerja optimal dari hari ini s.d. akhir bulan
-            sisa_hari_kerja = 0
-            for i in range((end_date - today).days + 1):
-                current_day = today + timedelta(days=i)
-                if current_day.weekday() != 6 and current_day not in libur_set:  # exclude minggu + libur nasional
-                    sisa_hari_kerja += 1
+            # hitung sisa hari kerja optimal dari hari ini s.d. akhir bulan (exclude minggu + libur nasional)
+            sisa_hari_kerja = hitung_hari_kerja(today, end_date)
 
             # Hitung hari kerja optimal
-            hari_optimal = sum(
-                1 for i in range((end_date - start_date).days + 1)
-                if (d := start_date + timedelta(days=i)).weekday() != 6 and d not in libur_set
-            )
+            hari_optimal = hitung_hari_kerja(start_date, end_date)
+
+            # Periode sudah ditutup (tutup-hari) -> alpha dibaca dari baris 'Tidak Hadir'
+            ditutup = is_periode_ditutup(start_date, end_date)
 
-            query = """
+            # Ringkasan bulanan (rekap_absensi_bulanan) jika periode bisa dijawab dari sana
+            r = get_sumber_rekap(start_date, end_date, id_karyawan)
+            query = f"""
                 SELECT 
                     k.id_karyawan, k.nip, k.nama, k.nama_panggilan, k.gaji_pokok, 
                     k.bank, k.no_rekening, k.an_rekening,
                     jk.id_jenis, jk.jenis, 
                     tk.id_tipe, tk.tipe,
-                    SUM(a.jam_terlambat) AS total_jam_terlambat,
-                    SUM(a.jam_kurang) AS total_jam_kurang,
-                    SUM(a.total_jam_kerja) AS total_jam_kerja,
-                    COUNT(sp.nama_status) FILTER (WHERE sp.nama_status = 'Hadir') AS jumlah_hadir,
-                    COUNT(sp.nama_status) FILTER (WHERE sp.nama_status = 'Izin') AS jumlah_izin,
-                    COUNT(sp.nama_status) FILTER (WHERE sp.nama_status = 'Izin (-cuti)') AS jumlah_izin_cuti,
-                    COUNT(sp.nama_status) FILTER (WHERE sp.nama_status = 'Sakit') AS jumlah_sakit
-                FROM absensi a
-                JOIN karyawan k ON a.id_karyawan = k.id_karyawan
-                LEFT JOIN statuspresensi sp ON a.id_status = sp.id_status
+                    {r['total_jam_terlambat']} AS total_jam_terlambat,
+                    {r['total_jam_kurang']} AS total_jam_kurang,
+                    {r['total_jam_kerja']} AS total_jam_kerja,
+                    {r['jumlah_hadir']} AS jumlah_hadir,
+                    {r['jumlah_alpha']} AS jumlah_alpha,
+                    {r['jumlah_izin']} AS jumlah_izin,
+                    {r['jumlah_izin_cuti']} AS jumlah_izin_cuti,
+                    {r['jumlah_sakit']} AS jumlah_sakit
+                FROM {r['sumber']}
                 LEFT JOIN jeniskaryawan jk ON k.id_jenis = jk.id_jenis
                 LEFT JOIN tipekaryawan tk ON k.id_tipe = tk.id_tipe
-                LEFT JOIN liburnasional ln ON a.tanggal = ln.tanggal
-                WHERE a.tanggal BETWEEN :start_date AND :end_date 
-                  AND a.status = 1 
-                  AND k.status = 1 
-                  AND EXTRACT(DOW FROM a.tanggal) != 0 
-                  AND ln.tanggal IS NULL
+                WHERE {r['filter']}
+                  AND k.status = 1
             """
             params = {'start_date': start_date, 'end_date': end_date}
 
             if id_karyawan:
-                query += " AND a.id_karyawan = :id_karyawan"
+                query += " AND k.id_karyawan = :id_karyawan"
                 params['id_karyawan'] = id_karyawan
 
             query += """
@@ -227,7 +185,7 @@ def get_rekap_gaji(start_date: date = None, end_date: date = None, tanggal: date
                     'jumlah_hadir': hadir,
                     'jumlah_izin': izin,
                     'jumlah_sakit': sakit,
-                    'jumlah_alpha': max(0, hari_optimal - (sisa_hari_kerja + hadir + izin + sakit)),
+                    'jumlah_alpha': row['jumlah_alpha'] if ditutup else max(0, hari_optimal - (sisa_hari_kerja + hadir + izin + sakit)),
                     'hari_optimal': hari_optimal,
                     'total_jam_kerja': total_jam_kerja,
                     'jam_normal': hari_optimal * 480,
@@ -267,8 +225,11 @@ def get_gaji_harian(tanggal: date, id_karyawan: int):
                 JOIN karyawan k ON a.id_karyawan = k.id_karyawan
                 LEFT JOIN tipekaryawan tk ON k.id_tipe = tk.id_tipe
                 WHERE a.tanggal = :tanggal AND a.status = 1 AND a.id_karyawan = :id_karyawan
+                  AND a.id_status IS DISTINCT FROM :id_tidak_hadir
                 LIMIT 1
-            """), {'tanggal': tanggal, 'id_karyawan': id_karyawan}).mappings().fetchone()
+            """), {
+                'tanggal': tanggal, 'id_karyawan': id_karyawan, 'id_tidak_hadir': get_id_tidak_hadir(conn)
+            }).mappings().fetchone()
 
             if not result:
                 return None  # Tidak ada data
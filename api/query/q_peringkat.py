@@ -0,0 +1,141 @@
+import json
+import os
+from datetime import timedelta
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+from ..utils.config import baca_replika, get_connection, get_wita
+from .q_absensi_bulanan import blok_segar
+from .q_leaderboard import hitung_kerajinan, hitung_kurang_disiplin
+from .q_rekap_bulanan import _awal_bulan, _akhir_bulan
+
+
+# === Konfigurasi Peringkat === #
+# detik, batas umur peringkat tersimpan
+PERINGKAT_MAX_UMUR = int(os.getenv("PERINGKAT_MAX_UMUR", "300"))
+
+# jenis -> fungsi hitung (start_date, end_date)
+PERINGKAT = {
+    'kerajinan': hitung_kerajinan,
+    'kurang_disiplin': hitung_kurang_disiplin,
+}
+
+
+def _bulan_peringkat(start_date, end_date, today):
+    """Tanggal 1 jika [start_date, end_date] = periode month-to-date (atau bulan penuh yang sudah lewat), selain itu None"""
+    if start_date.day != 1 or start_date > today:
+        return None
+    if end_date != min(today, _akhir_bulan(start_date)):
+        return None
+    return start_date
+
+@baca_replika
+def _hitung(jenis, start_date, end_date):
+    return PERINGKAT[jenis](start_date, end_date)
+
+@blok_segar
+def _hitung_semua(daftar_jenis, start_date, end_date):
+    # Blok absensi bulanan di cache proses ini bisa lebih lama dari versi (tulis di worker lain) -> bangun ulang
+    return {jenis: _hitung(jenis, start_date, end_date) for jenis in daftar_jenis}
+
+def _versi_bulan(connection, bulan):
+    """
+    Versi data peringkat bulan dari DB, sama di semua proses: jumlah & updated_at terakhir absensi bulan tsb
+    (termasuk baris yang di-soft delete) + updated_at terakhir karyawan & jenis
+    """
+    row = connection.execute(text("""
+        SELECT COUNT(*), MAX(updated_at),
+               (SELECT MAX(updated_at) FROM karyawan),
+               (SELECT MAX(updated_at) FROM jeniskaryawan)
+        FROM absensi
+        WHERE tanggal BETWEEN :awal AND :akhir
+    """), {'awal': bulan, 'akhir': _akhir_bulan(bulan)}).fetchone()
+    return ":".join("" if nilai is None else str(nilai) for nilai in row)
+
+def _simpan_peringkat(connection, jenis, bulan, sampai, versi, data, as_of):
+    connection.execute(text("""
+        INSERT INTO peringkat_bulanan (jenis, bulan, sampai, versi, data, as_of)
+        VALUES (:jenis, :bulan, :sampai, :versi, CAST(:data AS JSON), :as_of)
+        ON CONFLICT (jenis, bulan) DO UPDATE SET
+            sampai = EXCLUDED.sampai,
+            versi = EXCLUDED.versi,
+            data = EXCLUDED.data,
+            as_of = EXCLUDED.as_of
+        WHERE peringkat_bulanan.as_of <= EXCLUDED.as_of
+    """), {
+        'jenis': jenis,
+        'bulan': bulan,
+        'sampai': sampai,
+        'versi': versi,
+        'data': json.dumps(data),
+        'as_of': as_of
+    })
+
+
+def refresh_peringkat(bulan=None, jenis=None):
+    """
+    Hitung ulang dan simpan peringkat bulan (default bulan berjalan, month-to-date).
+    jenis None = semua jenis. Return {jenis: {'data', 'as_of'}} atau None jika gagal
+    """
+    today = get_wita().date()
+    bulan = _awal_bulan(bulan or today)
+    sampai = min(today, _akhir_bulan(bulan))
+    daftar_jenis = [jenis] if jenis else list(PERINGKAT)
+
+    engine = get_connection()
+    try:
+        # Versi dibaca (primary) sebelum menghitung: absensi yang berubah selama hitung -> baris tersimpan dianggap basi
+        with engine.connect() as connection:
+            versi = _versi_bulan(connection, bulan)
+        as_of = get_wita()
+        hasil = {j: {'data': data, 'as_of': as_of} for j, data in _hitung_semua(daftar_jenis, bulan, sampai).items()}
+    except SQLAlchemyError as e:
+        print(f"Error occurred: {str(e)}")
+        return None
+
+    # Gagal menyimpan tidak menggagalkan hasil, dicoba lagi pada pembacaan berikutnya
+    try:
+        with engine.begin() as connection:
+            for j, item in hasil.items():
+                _simpan_peringkat(connection, j, bulan, sampai, versi, item['data'], as_of)
+    except SQLAlchemyError as e:
+        print(f"Error occurred: {str(e)}")
+    return hasil
+
+def get_peringkat(jenis, start_date, end_date):
+    """
+    Peringkat [start_date, end_date] + as_of (WITA). Periode month-to-date dibaca dari peringkat_bulanan
+    (dihitung ulang jika basi), rentang lain dihitung langsung. None jika gagal
+    """
+    today = get_wita().date()
+    bulan = _bulan_peringkat(start_date, end_date, today)
+    if bulan is None:
+        try:
+            return {'data': _hitung(jenis, start_date, end_date), 'as_of': get_wita()}
+        except SQLAlchemyError as e:
+            print(f"Error occurred: {str(e)}")
+            return None
+
+    engine = get_connection()
+    try:
+        with engine.connect() as connection:
+            row = connection.execute(text("""
+                SELECT data, sampai, versi, as_of
+                FROM peringkat_bulanan
+                WHERE jenis = :jenis AND bulan = :bulan
+            """), {'jenis': jenis, 'bulan': bulan}).fetchone()
+            versi = _versi_bulan(connection, bulan) if row is not None else None
+    except SQLAlchemyError as e:
+        print(f"Error occurred: {str(e)}")
+        row = None
+
+    if (
+        row is not None
+        and row.sampai == end_date
+        and row.versi == versi
+        and get_wita() - row.as_of < timedelta(seconds=PERINGKAT_MAX_UMUR)
+    ):
+        return {'data': row.data, 'as_of': row.as_of}
+
+    hasil = refresh_peringkat(bulan, jenis)
+    return hasil[jenis] if hasil else None
@@ -2,6 +2,7 @@ from datetime import date, time, timedelta, datetime
 from sqlalchemy import text
 from sqlalchemy.exc import SQLAlchemyError
 
+from ..utils.cache import naikkan_generasi
 from ..utils.config import get_connection, get_wita
 
 
@@ -154,7 +155,8 @@ def approve_izin(id_izin):
                 "updated_at": get_wita()
             })
 
-            return result.rowcount  # 1 jika berhasil, 0 jika tidak ada record
+        naikkan_generasi('izin')
+        return result.rowcount  # 1 jika berhasil, 0 jika tidak ada record
 
     except SQLAlchemyError as e:
         print("DB ERROR (approve_izin):", e)
@@ -183,7 +185,8 @@ def reject_izin(id_izin, alasan_penolakan):
                 "updated_at": get_wita()
             })
 
-            return result.rowcount  # 1 = success, 0 = not found
+        naikkan_generasi('izin')
+        return result.rowcount  # 1 = success, 0 = not found
 
     except SQLAlchemyError as e:
         print("DB ERROR (reject_izin):", e)
@@ -229,7 +232,8 @@ def soft_delete_izin(id_izin):
                 "updated_at": get_wita()
             })
 
-            return result.rowcount  # 1 jika berhasil, 0 jika tidak ada record
+        naikkan_generasi('izin')
+        return result.rowcount  # 1 jika berhasil, 0 jika tidak ada record
 
     except SQLAlchemyError as e:
         print("DB ERROR (soft_delete_izin):", e)
@@ -0,0 +1,199 @@
+import calendar
+from datetime import date, datetime
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+from ..utils.config import get_connection, get_wita
+
+
+# Kunci advisory lock ringkasan, lihat kunci_rekap. (REKAP_LOCK_KEY, id_karyawan) = satu karyawan,
+# (REKAP_LOCK_KEY, 0) = semua karyawan: shared oleh penulis per karyawan, exclusive oleh refresh semua karyawan
+REKAP_LOCK_KEY = 2020
+
+# Agregat rekap dari tabel absensi mentah (alias a, statuspresensi sp)
+AGREGAT_ABSENSI = {
+    'total_jam_terlambat': "SUM(a.jam_terlambat)",
+    'total_jam_kurang': "SUM(a.jam_kurang)",
+    'total_jam_kerja': "SUM(a.total_jam_kerja)",
+    'jumlah_hadir': "COUNT(sp.nama_status) FILTER (WHERE sp.nama_status = 'Hadir')",
+    'jumlah_alpha': "COUNT(sp.nama_status) FILTER (WHERE sp.nama_status = 'Tidak Hadir')",
+    'jumlah_setengah_hari': "COUNT(sp.nama_status) FILTER (WHERE sp.nama_status = 'Setengah Hari')",
+    'jumlah_izin': "COUNT(sp.nama_status) FILTER (WHERE sp.nama_status = 'Izin')",
+    'jumlah_izin_cuti': "COUNT(sp.nama_status) FILTER (WHERE sp.nama_status = 'Izin (-cuti)')",
+    'jumlah_sakit': "COUNT(sp.nama_status) FILTER (WHERE sp.nama_status = 'Sakit')",
+    'dinas_luar': "COUNT(sp.nama_status) FILTER (WHERE sp.nama_status = 'Dinas Luar')",
+}
+
+# Fragment query rekap: pemanggil memakai alias k (karyawan) + kolom agregat di atas.
+# sumber/filter memakai parameter :start_date & :end_date
+REKAP_ABSENSI = {
+    **AGREGAT_ABSENSI,
+    'sumber': """
+        absensi a
+        JOIN karyawan k ON a.id_karyawan = k.id_karyawan
+        LEFT JOIN statuspresensi sp ON a.id_status = sp.id_status
+        LEFT JOIN liburnasional ln ON a.tanggal = ln.tanggal AND ln.status = 1
+    """,
+    'filter': "a.tanggal BETWEEN :start_date AND :end_date AND a.status = 1 AND EXTRACT(DOW FROM a.tanggal) != 0 AND ln.tanggal IS NULL",
+}
+REKAP_BULANAN = {
+    **{kolom: f"SUM(r.{kolom})" for kolom in AGREGAT_ABSENSI},
+    'sumber': """
+        rekap_absensi_bulanan r
+        JOIN karyawan k ON r.id_karyawan = k.id_karyawan
+    """,
+    'filter': "r.bulan BETWEEN :start_date AND :end_date",
+}
+
+_KOLOM = ", ".join(AGREGAT_ABSENSI)
+
+# Hitung ulang ringkasan untuk bulan-bulan di [:awal, :akhir], satu karyawan atau semua (:id_karyawan NULL)
+_REFRESH_SQL = text(f"""
+    WITH sumber AS (
+        SELECT a.id_karyawan,
+               date_trunc('month', a.tanggal)::date AS bulan,
+               {", ".join(f"{ekspresi} AS {kolom}" for kolom, ekspresi in AGREGAT_ABSENSI.items())},
+               MAX(a.tanggal) AS tanggal_terakhir
+        FROM absensi a
+        LEFT JOIN statuspresensi sp ON a.id_status = sp.id_status
+        LEFT JOIN liburnasional ln ON a.tanggal = ln.tanggal AND ln.status = 1
+        WHERE a.tanggal BETWEEN :awal AND :akhir
+          AND a.status = 1
+          AND EXTRACT(DOW FROM a.tanggal) != 0
+          AND ln.tanggal IS NULL
+          AND (CAST(:id_karyawan AS INTEGER) IS NULL OR a.id_karyawan = :id_karyawan)
+        GROUP BY a.id_karyawan, bulan
+    ), hapus AS (
+        DELETE FROM rekap_absensi_bulanan r
+        WHERE r.bulan BETWEEN :awal AND :akhir
+          AND (CAST(:id_karyawan AS INTEGER) IS NULL OR r.id_karyawan = :id_karyawan)
+          AND NOT EXISTS (SELECT 1 FROM sumber s WHERE s.id_karyawan = r.id_karyawan AND s.bulan = r.bulan)
+    )
+    INSERT INTO rekap_absensi_bulanan (id_karyawan, bulan, {_KOLOM}, tanggal_terakhir, updated_at)
+    SELECT id_karyawan, bulan, {_KOLOM}, tanggal_terakhir, :timestamp_wita
+    FROM sumber
+    ON CONFLICT (id_karyawan, bulan) DO UPDATE SET
+        {", ".join(f"{kolom} = EXCLUDED.{kolom}" for kolom in AGREGAT_ABSENSI)},
+        tanggal_terakhir = EXCLUDED.tanggal_terakhir,
+        updated_at = EXCLUDED.updated_at
+""")
+
+
+def _ke_date(tanggal):
+    if isinstance(tanggal, str):
+        return datetime.strptime(tanggal, "%Y-%m-%d").date()
+    return tanggal
+
+def _awal_bulan(tanggal):
+    tanggal = _ke_date(tanggal)
+    return date(tanggal.year, tanggal.month, 1)
+
+def _akhir_bulan(tanggal):
+    tanggal = _ke_date(tanggal)
+    return date(tanggal.year, tanggal.month, calendar.monthrange(tanggal.year, tanggal.month)[1])
+
+
+def kunci_rekap(connection, id_karyawan):
+    """
+    Advisory lock ringkasan sampai akhir transaksi, diambil sebelum snapshot hitung ulang agar tulis yang belum
+    commit (mis. +1 hadir di add_checkin, kunci yang sama) tidak tertimpa. id_karyawan None = semua karyawan
+    """
+    if id_karyawan is None:
+        connection.execute(text("SELECT pg_advisory_xact_lock(:kunci, 0)"), {'kunci': REKAP_LOCK_KEY})
+    else:
+        connection.execute(
+            text("SELECT pg_advisory_xact_lock_shared(:kunci, 0), pg_advisory_xact_lock(:kunci, :id_karyawan)"),
+            {'kunci': REKAP_LOCK_KEY, 'id_karyawan': int(id_karyawan)}
+        )
+
+def refresh_rekap_bulanan(connection, id_karyawan, start_date, end_date=None):
+    """
+    Hitung ulang ringkasan bulan yang mencakup [start_date, end_date] di transaksi pemanggil.
+    id_karyawan None = semua karyawan (job penutupan harian)
+    """
+    end_date = end_date or start_date
+    if id_karyawan is not None:
+        id_karyawan = int(id_karyawan)
+    kunci_rekap(connection, id_karyawan)
+    connection.execute(_REFRESH_SQL, {
+        'awal': _awal_bulan(start_date),
+        'akhir': _akhir_bulan(end_date),
+        'id_karyawan': id_karyawan,
+        'timestamp_wita': get_wita()
+    })
+
+def backfill_rekap_bulanan(dari=None, bulan=None):
+    """
+    Bangun ulang rekap_absensi_bulanan untuk semua karyawan.
+    bulan: hanya bulan tsb (mis. setelah libur nasional diubah).
+    dari: dari bulan tsb s.d. absensi terakhir (default seluruh histori), lalu ditandai valid.
+    Return {'awal', 'akhir', 'baris'} atau None jika gagal
+    """
+    engine = get_connection()
+    try:
+        with engine.begin() as connection:
+            if bulan:
+                awal, akhir = _awal_bulan(bulan), _akhir_bulan(bulan)
+            else:
+                pertama, terakhir = connection.execute(
+                    text("SELECT MIN(tanggal), MAX(tanggal) FROM absensi WHERE status = 1")
+                ).fetchone()
+                hari_ini = get_wita().date()
+                awal = _awal_bulan(dari or pertama or hari_ini)
+                akhir = _akhir_bulan(max(terakhir or hari_ini, hari_ini))
+
+            kunci_rekap(connection, None)
+            result = connection.execute(_REFRESH_SQL, {
+                'awal': awal, 'akhir': akhir, 'id_karyawan': None, 'timestamp_wita': get_wita()
+            })
+
+            if not bulan:
+                # Bulan >= mulai selanjutnya dipelihara oleh fungsi tulis absensi
+                connection.execute(text("""
+                    INSERT INTO rekap_absensi_status (id, mulai, dibangun_at)
+                    VALUES (1, :mulai, :timestamp_wita)
+                    ON CONFLICT (id) DO UPDATE SET
+                        mulai = LEAST(rekap_absensi_status.mulai, EXCLUDED.mulai),
+                        dibangun_at = EXCLUDED.dibangun_at
+                """), {'mulai': awal, 'timestamp_wita': get_wita()})
+
+            return {'awal': awal, 'akhir': akhir, 'baris': result.rowcount}
+    except SQLAlchemyError as e:
+        print(f"Error occurred: {str(e)}")
+        return None
+
+
+def rekap_bulanan_tersedia(start_date, end_date, id_karyawan=None):
+    """
+    True jika rekap [start_date, end_date] bisa dibaca dari rekap_absensi_bulanan:
+    mulai tanggal 1, bulan sudah di-backfill, dan bulan terakhir penuh atau tidak ada absensi setelah end_date
+    """
+    if start_date.day != 1 or end_date < start_date:
+        return False
+
+    engine = get_connection()
+    try:
+        with engine.connect() as connection:
+            row = connection.execute(text("""
+                SELECT
+                    (SELECT mulai FROM rekap_absensi_status WHERE id = 1) AS mulai,
+                    (SELECT MAX(tanggal_terakhir) FROM rekap_absensi_bulanan
+                     WHERE bulan = :bulan_akhir
+                       AND (CAST(:id_karyawan AS INTEGER) IS NULL OR id_karyawan = :id_karyawan)) AS terakhir
+            """), {
+                'bulan_akhir': _awal_bulan(end_date),
+                'id_karyawan': int(id_karyawan) if id_karyawan else None
+            }).mappings().fetchone()
+    except SQLAlchemyError as e:
+        print(f"Error occurred: {str(e)}")
+        return False
+
+    if row['mulai'] is None or start_date < row['mulai']:
+        return False
+    return end_date >= _akhir_bulan(end_date) or row['terakhir'] is None or row['terakhir'] <= end_date
+
+def get_sumber_rekap(start_date, end_date, id_karyawan=None):
+    """Fragment query rekap: REKAP_BULANAN jika tersedia, selain itu REKAP_ABSENSI"""
+    if rekap_bulanan_tersedia(start_date, end_date, id_karyawan):
+        return REKAP_BULANAN
+    return REKAP_ABSENSI
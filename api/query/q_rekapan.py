@@ -2,30 +2,22 @@ from datetime import time, date
 from sqlalchemy import text
 from sqlalchemy.exc import SQLAlchemyError
 
-from ..utils.config import get_connection
-from ..utils.helpers import daterange, time_to_str, format_jam_menit
+from ..utils.config import baca_replika, get_connection
+from ..utils.helpers import daterange, format_jam_menit
+from ..utils.kalender import get_libur_nasional, hitung_hari_kerja
+from .q_absensi_bulanan import get_matriks_absensi, jam_ke_str
+from .q_rekap_bulanan import get_sumber_rekap
 
 
-def get_libur_nasional(start_date: date, end_date: date):
-    engine = get_connection()
-    try:
-        with engine.connect() as connection:
-            query = text("""
-                SELECT tanggal FROM liburnasional
-                WHERE tanggal BETWEEN :start_date AND :end_date
-            """)
-            result = connection.execute(query, {'start_date': start_date, 'end_date': end_date}).mappings()
-            return set(row['tanggal'] for row in result)
-    except SQLAlchemyError as e:
-        print(f"Error: {str(e)}")
-        return set()
-
+@baca_replika
 def get_rekap_absensi(start_date, end_date, libur_nasional):
+    # Ringkasan bulanan (rekap_absensi_bulanan) jika periode bisa dijawab dari sana
+    r = get_sumber_rekap(start_date, end_date)
     engine = get_connection()
     try:
         with engine.connect() as connection:
             # Query utama rekap
-            query = text("""
+            query = text(f"""
                 SELECT 
                     k.id_karyawan,
                     k.nama,
@@ -36,24 +28,21 @@ def get_rekap_absensi(start_date, end_date, libur_nasional):
                     jk.jenis,
                     k.id_tipe,
                     tk.tipe,
-                    SUM(a.jam_terlambat) AS total_jam_terlambat,
-                    SUM(a.jam_kurang) AS total_jam_kurang,
+                    {r['total_jam_terlambat']} AS total_jam_terlambat,
+                    {r['total_jam_kurang']} AS total_jam_kurang,
                     12480 AS total_jam_kerja_normal,
-                    SUM(a.total_jam_kerja) AS total_jam_kerja,
-                    COUNT(sp.nama_status) FILTER (WHERE sp.nama_status = 'Hadir') AS jumlah_hadir,
-                    COUNT(sp.nama_status) FILTER (WHERE sp.nama_status = 'Tidak Hadir') AS jumlah_alpha,
-                    COUNT(sp.nama_status) FILTER (WHERE sp.nama_status = 'Setengah Hari') AS jumlah_setengah_hari,
-                    COUNT(sp.nama_status) FILTER (WHERE sp.nama_status = 'Izin') AS jumlah_izin,
-                    COUNT(sp.nama_status) FILTER (WHERE sp.nama_status = 'Izin (-cuti)') AS jumlah_izin_cuti,
-                    COUNT(sp.nama_status) FILTER (WHERE sp.nama_status = 'Sakit') AS jumlah_sakit,
-                    COUNT(sp.nama_status) FILTER (WHERE sp.nama_status = 'Dinas Luar') AS dinas_luar
-                FROM absensi a
-                JOIN karyawan k ON a.id_karyawan = k.id_karyawan
-                LEFT JOIN statuspresensi sp ON a.id_status = sp.id_status
+                    {r['total_jam_kerja']} AS total_jam_kerja,
+                    {r['jumlah_hadir']} AS jumlah_hadir,
+                    {r['jumlah_alpha']} AS jumlah_alpha,
+                    {r['jumlah_setengah_hari']} AS jumlah_setengah_hari,
+                    {r['jumlah_izin']} AS jumlah_izin,
+                    {r['jumlah_izin_cuti']} AS jumlah_izin_cuti,
+                    {r['jumlah_sakit']} AS jumlah_sakit,
+                    {r['dinas_luar']} AS dinas_luar
+                FROM {r['sumber']}
                 LEFT JOIN jeniskaryawan jk ON k.id_jenis = jk.id_jenis
                 LEFT JOIN tipekaryawan tk ON k.id_tipe = tk.id_tipe
-                LEFT JOIN liburnasional ln ON a.tanggal = ln.tanggal
-                WHERE a.tanggal BETWEEN :start_date AND :end_date AND a.status = 1 AND k.status = 1 AND EXTRACT(DOW FROM a.tanggal) != 0 AND ln.tanggal IS NULL
+                WHERE {r['filter']} AND k.status = 1
                 GROUP BY 
                     k.id_karyawan, k.nama, k.gaji_pokok, 
                     k.id_jenis, jk.jenis, 
@@ -96,60 +85,11 @@ def get_rekap_absensi(start_date, end_date, libur_nasional):
         print(f"Error occurred: {str(e)}")
         return []
 
+@baca_replika
 def get_detail_absensi_by_karyawan(id_karyawan, start, end):
     engine = get_connection()
     try:
         with engine.connect() as connection:
-            # Ambil data absensi
-            query = text("""
-                SELECT 
-                    a.tanggal, a.jam_masuk, a.jam_keluar, a.jam_terlambat, a.jam_kurang,
-                    a.total_jam_kerja AS total_jam_masuk, a.lokasi_masuk, a.lokasi_keluar,
-                    s.id_status, s.nama_status,
-                    k.nama AS nama_karyawan,
-                    k.nama_panggilan,
-                    k.nip,
-                    j.jenis AS jenis_pegawai,
-                    t.tipe AS tipe_pegawai
-                FROM absensi a
-                JOIN karyawan k ON k.id_karyawan = a.id_karyawan
-                JOIN statuspresensi s ON s.id_status = a.id_status
-                JOIN jeniskaryawan j ON j.id_jenis = k.id_jenis
-                JOIN tipekaryawan t ON t.id_tipe = k.id_tipe
-                WHERE a.id_karyawan = :id_karyawan
-                AND a.tanggal BETWEEN :start AND :end AND a.status = 1
-            """)
-            absensi_result = connection.execute(query, {
-                'id_karyawan': id_karyawan,
-                'start': start,
-                'end': end
-            }).fetchall()
-
-            absensi_dict = {}
-            for row in absensi_result:
-                data = dict(row._mapping)
-                absensi_dict[row.tanggal] = {
-                    'tanggal': row.tanggal.strftime('%Y-%m-%d'),
-                    'jam_masuk': time_to_str(data.get('jam_masuk')),
-                    'jam_keluar': time_to_str(data.get('jam_keluar')),
-                    'jam_terlambat': time_to_str(data.get('jam_terlambat')),
-                    'jam_kurang': time_to_str(data.get('jam_kurang')),
-                    'total_jam_masuk': time_to_str(data.get('total_jam_masuk')),
-                    'lokasi_masuk': data.get('lokasi_masuk'),
-                    'lokasi_keluar': data.get('lokasi_keluar'),
-                    'id_status': data.get('id_status'),
-                    'nama_status': data.get('nama_status'),
-                    'nama_karyawan': data.get('nama_karyawan'),
-                    'nama_panggilan': data.get('nama_panggilan'),
-                    'jenis_pegawai': data.get('jenis_pegawai'),
-                    'tipe_pegawai': data.get('tipe_pegawai'),
-                }
-            # Ambil hari libur
-            libur_result = connection.execute(text("""
-                SELECT tanggal FROM liburnasional WHERE tanggal BETWEEN :start AND :end AND status = 1
-            """), {'start': start, 'end': end}).fetchall()
-            libur_set = {r.tanggal for r in libur_result}
-
             # Ambil info karyawan
             karyawan_result = connection.execute(text("""
                 SELECT k.nama, k.nama_panggilan, j.jenis AS jenis_pegawai, t.tipe AS tipe_pegawai
@@ -159,61 +99,81 @@ def get_detail_absensi_by_karyawan(id_karyawan, start, end):
                 WHERE k.id_karyawan = :id_karyawan AND k.status = 1
             """), {'id_karyawan': id_karyawan}).fetchone()
 
-            if not karyawan_result:
-                return []
-
-            nama_karyawan = karyawan_result.nama
-            nama_panggilan = karyawan_result.nama_panggilan
-            jenis_pegawai = karyawan_result.jenis_pegawai
-            tipe_pegawai = karyawan_result.tipe_pegawai
+        if not karyawan_result:
+            return []
 
-            hasil = []
-            for tanggal in daterange(start, end):
-                tanggal_str = tanggal.strftime('%Y-%m-%d')
-
-                if tanggal in libur_set:
-                    status_hari = 'libur nasional'
-                elif tanggal.weekday() == 6:
-                    status_hari = 'minggu'
-                else:
-                    status_hari = 'regular'
-
-                if tanggal in absensi_dict:
-                    item = absensi_dict[tanggal]
-                    item['status_hari'] = status_hari
-                    hasil.append(item)
-                else:
-                    hasil.append({
-                        'nama_karyawan': nama_karyawan,
-                        'nama_panggilan': nama_panggilan,
-                        'tanggal': tanggal_str,
-                        'status_hari': status_hari,
-                        'id_status': 0,
-                        'nama_status': 'Tidak Hadir',
-                        'jenis_pegawai': jenis_pegawai,
-                        'tipe_pegawai': tipe_pegawai,
-                        'jam_masuk': None,
-                        'jam_keluar': None,
-                        'jam_terlambat': None,
-                        'jam_kurang': None,
-                        'total_jam_masuk': None,
-                        'lokasi_masuk': None,
-                        'lokasi_keluar': None,
-                    })
-            return {
-                'start_date': start.strftime('%Y-%m-%d'),
-                'end_date': end.strftime('%Y-%m-%d'),
-                'data': hasil
-            }
+        # Absensi per hari dari blok bulanan (cache), satu baris matriks untuk karyawan ini
+        m = get_matriks_absensi(start, end, [int(id_karyawan)]) if start <= end else None
     except SQLAlchemyError as e:
         print(f"Error occurred: {str(e)}")
         return []
+
+    # Ambil hari libur
+    libur_set = get_libur_nasional(start, end)
+
+    karyawan = {
+        'nama_karyawan': karyawan_result.nama,
+        'nama_panggilan': karyawan_result.nama_panggilan,
+        'jenis_pegawai': karyawan_result.jenis_pegawai,
+        'tipe_pegawai': karyawan_result.tipe_pegawai,
+    }
+
+    hasil = []
+    for i, tanggal in enumerate(daterange(start, end)):
+        tanggal_str = tanggal.strftime('%Y-%m-%d')
+
+        if tanggal in libur_set:
+            status_hari = 'libur nasional'
+        elif tanggal.weekday() == 6:
+            status_hari = 'minggu'
+        else:
+            status_hari = 'regular'
+
+        id_status = int(m['status'][0, i])
+        nama_status = m['nama_status'].get(id_status) if id_status else None
+        if nama_status is not None:
+            hasil.append({
+                'tanggal': tanggal_str,
+                'jam_masuk': jam_ke_str(m['jam_masuk'][0, i]),
+                'jam_keluar': jam_ke_str(m['jam_keluar'][0, i]),
+                # Kolom menit (bukan time), tetap None seperti respons sebelumnya
+                'jam_terlambat': None,
+                'jam_kurang': None,
+                'total_jam_masuk': None,
+                'lokasi_masuk': m['lokasi_masuk'][0, i],
+                'lokasi_keluar': m['lokasi_keluar'][0, i],
+                'id_status': id_status,
+                'nama_status': nama_status,
+                **karyawan,
+                'status_hari': status_hari,
+            })
+        else:
+            hasil.append({
+                **karyawan,
+                'tanggal': tanggal_str,
+                'status_hari': status_hari,
+                'id_status': 0,
+                'nama_status': 'Tidak Hadir',
+                'jam_masuk': None,
+                'jam_keluar': None,
+                'jam_terlambat': None,
+                'jam_kurang': None,
+                'total_jam_masuk': None,
+                'lokasi_masuk': None,
+                'lokasi_keluar': None,
+            })
+    return {
+        'start_date': start.strftime('%Y-%m-%d'),
+        'end_date': end.strftime('%Y-%m-%d'),
+        'data': hasil
+    }
     
 def get_rekap_person(start_date, end_date, id_karyawan):
+    r = get_sumber_rekap(start_date, end_date, id_karyawan)
     engine = get_connection()
     try:
         with engine.connect() as connection:
-            query = text("""
+            query = text(f"""
                 SELECT 
                     k.id_karyawan,
                     k.nama,
@@ -223,24 +183,21 @@ def get_rekap_person(start_date, end_date, id_karyawan):
                     jk.jenis,
                     k.id_tipe,
                     tk.tipe,
-                    SUM(a.jam_terlambat) AS total_jam_terlambat,
-                    SUM(a.jam_kurang) AS total_jam_kurang,
+                    {r['total_jam_terlambat']} AS total_jam_terlambat,
+                    {r['total_jam_kurang']} AS total_jam_kurang,
                     12480 AS total_jam_kerja_normal,
-                    SUM(a.total_jam_kerja) AS total_jam_kerja,
-                    COUNT(sp.nama_status) FILTER (WHERE sp.nama_status = 'Hadir') AS jumlah_hadir,
-                    COUNT(sp.nama_status) FILTER (WHERE sp.nama_status = 'Tidak Hadir') AS jumlah_alpha,
-                    COUNT(sp.nama_status) FILTER (WHERE sp.nama_status = 'Setengah Hari') AS jumlah_setengah_hari,
-                    COUNT(sp.nama_status) FILTER (WHERE sp.nama_status = 'Izin') AS jumlah_izin,
-                    COUNT(sp.nama_status) FILTER (WHERE sp.nama_status = 'Sakit') AS jumlah_sakit,
-                    COUNT(sp.nama_status) FILTER (WHERE sp.nama_status = 'Dinas Luar') AS dinas_luar
-                FROM absensi a
-                JOIN karyawan k ON a.id_karyawan = k.id_karyawan
-                LEFT JOIN statuspresensi sp ON a.id_status = sp.id_status
+                    {r['total_jam_kerja']} AS total_jam_kerja,
+                    {r['jumlah_hadir']} AS jumlah_hadir,
+                    {r['jumlah_alpha']} AS jumlah_alpha,
+                    {r['jumlah_setengah_hari']} AS jumlah_setengah_hari,
+                    {r['jumlah_izin']} AS jumlah_izin,
+                    {r['jumlah_sakit']} AS jumlah_sakit,
+                    {r['dinas_luar']} AS dinas_luar
+                FROM {r['sumber']}
                 LEFT JOIN jeniskaryawan jk ON k.id_jenis = jk.id_jenis
                 LEFT JOIN tipekaryawan tk ON k.id_tipe = tk.id_tipe
-                LEFT JOIN liburnasional ln ON a.tanggal = ln.tanggal
-                WHERE a.tanggal BETWEEN :start_date AND :end_date AND a.status = 1 AND EXTRACT(DOW FROM a.tanggal) != 0 AND ln.tanggal IS NULL
-                AND a.id_karyawan = :id_karyawan
+                WHERE {r['filter']}
+                AND k.id_karyawan = :id_karyawan
                 GROUP BY 
                     k.id_karyawan, k.nama, k.gaji_pokok, 
                     k.id_jenis, jk.jenis, 
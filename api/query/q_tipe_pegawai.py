@@ -1,5 +1,6 @@
 from sqlalchemy import text
 from sqlalchemy.exc import SQLAlchemyError
+from ..utils.cache import naikkan_generasi
 from ..utils.config import get_connection, get_wita
 
 
@@ -26,7 +27,8 @@ def insert_tipe_pegawai(payload):
                 VALUES (:tipe, 1, :timestamp_wita, timestamp_wita)
                 RETURNING tipe
             """), {**payload, "timestamp_wita": get_wita()}).mappings().fetchone()
-            return dict(result)
+        naikkan_generasi('karyawan')
+        return dict(result)
     except SQLAlchemyError as e:
         print(f"Error occurred: {str(e)}")
         return None
@@ -58,7 +60,8 @@ def update_tipe(id_tipe, payload):
                     ),
                 {**payload, "id_tipe": id_tipe, "timestamp_wita": get_wita()}
             ).fetchone()
-            return result
+        naikkan_generasi('karyawan')
+        return result
     except SQLAlchemyError as e:
         print(f"Error: {e}")
         return None
@@ -72,7 +75,8 @@ def delete_tipe(id_tipe):
                     WHERE status = 1 AND id_tipe = :id_tipe RETURNING tipe;"""),
                 {"id_tipe": id_tipe, "timestamp_wita": get_wita()}
             ).fetchone()
-            return result
+        naikkan_generasi('karyawan')
+        return result
     except SQLAlchemyError as e:
         print(f"Error: {e}")
         return None
\ No newline at end of file
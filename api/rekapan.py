@@ -2,9 +2,11 @@ from flask_restx import Namespace, Resource, reqparse
 from flask_jwt_extended import get_jwt, jwt_required, get_jwt_identity
 from datetime import datetime, date, timedelta
 import calendar
-from .utils.decorator import role_required
+from .utils.decorator import cache_periode, role_required
 from .utils.helpers import format_jam_menit
 from .query.q_rekapan import *
+from .query.q_penutupan import is_periode_ditutup
+from .utils.kalender import hitung_hari_minggu
 
 
 rekapan_ns = Namespace('rekapan', description='Rekap Absensi')
@@ -19,6 +21,36 @@ detail_absensi_parser.add_argument('start_date', type=str, required=False, help=
 detail_absensi_parser.add_argument('end_date', type=str, required=False, help='Tanggal akhir (DD-MM-YYYY)')
 
 
+@cache_periode('rekapan/absensi', sumber=('absensi', 'karyawan'), data='rekap')
+def _rekap_absensi(start, end, id_karyawan=None):
+    libur_nasional = get_libur_nasional(start, end)
+    data = get_rekap_absensi(start, end, libur_nasional)
+
+    hari_valid = hitung_hari_kerja(start, end)
+    # Semua hari kerja sudah ditutup -> alpha = baris 'Tidak Hadir' (jumlah_alpha dari query)
+    ditutup = is_periode_ditutup(start, end)
+
+    for row in data:
+        jumlah_status_valid = (
+            row.get('jumlah_hadir', 0) +
+            row.get('jumlah_sakit', 0) +
+            row.get('jumlah_izin', 0) +
+            row.get('jumlah_izin_cuti', 0) +
+            row.get('jumlah_setengah_hari', 0) +
+            row.get('dinas_luar', 0)
+        )
+        row['jumlah_izin'] = max(row.get('jumlah_izin', 0) + row.get('jumlah_izin_cuti', 0), 0) # gabungkan izin dan cuti
+        if not ditutup:
+            jumlah_alpha = hari_valid - jumlah_status_valid
+            row['jumlah_alpha'] = max(jumlah_alpha, 0)
+
+    return {
+        'tanggal_start': start.strftime("%d-%m-%Y"),
+        'tanggal_end': end.strftime("%d-%m-%Y"),
+        'rekap': data
+    }, 200
+
+
 @rekapan_ns.route('/absensi')
 class RekapAbsensi(Resource):
     @rekapan_ns.expect(rekap_absensi_parser)
@@ -43,34 +75,7 @@ class RekapAbsensi(Resource):
         today = date.today()
         end = min(end_input, today)
 
-        libur_nasional = get_libur_nasional(start, end)
-        data = get_rekap_absensi(start, end, libur_nasional)
-
-        current_date = start
-        hari_valid = 0
-        while current_date <= end:
-            if current_date.weekday() != 6 and current_date not in libur_nasional:
-                hari_valid += 1
-            current_date += timedelta(days=1)
-
-        for row in data:
-            jumlah_status_valid = (
-                row.get('jumlah_hadir', 0) +
-                row.get('jumlah_sakit', 0) +
-                row.get('jumlah_izin', 0) +
-                row.get('jumlah_izin_cuti', 0) +
-                row.get('jumlah_setengah_hari', 0) +
-                row.get('dinas_luar', 0)
-            )
-            row['jumlah_izin'] = max(row.get('jumlah_izin', 0) + row.get('jumlah_izin_cuti', 0), 0) # gabungkan izin dan cuti
-            jumlah_alpha = hari_valid - jumlah_status_valid
-            row['jumlah_alpha'] = max(jumlah_alpha, 0)
-
-        return {
-            'tanggal_start': start.strftime("%d-%m-%Y"),
-            'tanggal_end': end.strftime("%d-%m-%Y"),
-            'rekap': data
-        }, 200
+        return _rekap_absensi(start, end)
 
 
 @rekapan_ns.route('/absensi/detail')
@@ -136,8 +141,7 @@ class RekapBulananPerson(Resource):
         data = get_rekap_person(start, end, id_karyawan)
 
         # Hitung hari kerja valid (Senin - Sabtu)
-        hari_valid = sum(1 for i in range((end - start).days + 1)
-                         if (start + timedelta(days=i)).weekday() != 6)  # exclude Sunday
+        hari_valid = (end - start).days + 1 - hitung_hari_minggu(start, end)
 
         # Ambil hanya 1 data (untuk 1 karyawan)
         if data:
@@ -150,8 +154,9 @@ class RekapBulananPerson(Resource):
                 row.get('jumlah_setengah_hari', 0) +
                 row.get('dinas_luar', 0)
             )
-            jumlah_alpha = hari_valid - jumlah_status_valid
-            row['jumlah_alpha'] = max(jumlah_alpha, 0)
+            if not is_periode_ditutup(start, end):
+                jumlah_alpha = hari_valid - jumlah_status_valid
+                row['jumlah_alpha'] = max(jumlah_alpha, 0)
 
             return {
                 'tanggal_start': start.strftime("%d-%m-%Y"),
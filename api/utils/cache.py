@@ -0,0 +1,244 @@
+import os
+import pickle
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+
+# === Konfigurasi Cache === #
+# memory = per proses (default), sqlite = file bersama antar worker gunicorn di host yang sama
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory").lower()
+# Isi cache di-unpickle -> file & direktorinya harus milik user proses ini dan tidak bisa ditulis user lain
+CACHE_SQLITE_PATH = os.getenv(
+    "CACHE_SQLITE_PATH", os.path.join(tempfile.gettempdir(), f"absensi-cache-{os.getuid()}", "cache.sqlite3")
+)
+PROFIL_CACHE_TTL = int(os.getenv("PROFIL_CACHE_TTL", "300"))  # detik, profil absensi karyawan (jenis & izin WFH)
+IDEMPOTENCY_TTL = int(os.getenv("IDEMPOTENCY_TTL", "86400"))  # detik, hasil request dengan header Idempotency-Key
+IDEMPOTENCY_WAIT = float(os.getenv("IDEMPOTENCY_WAIT", "30"))  # detik, retry menunggu request awal yang masih berjalan
+PRESENSI_CACHE_TTL = int(os.getenv("PRESENSI_CACHE_TTL", "3600"))  # detik, presensi hari ini per karyawan
+PRESENSI_KOSONG_TTL = int(os.getenv("PRESENSI_KOSONG_TTL", "5"))  # detik, jawaban "belum ada presensi" (check-in bisa masuk di worker lain)
+BULAN_ABSENSI_TTL = int(os.getenv("BULAN_ABSENSI_TTL", "21600"))  # detik, blok absensi bulanan (q_absensi_bulanan)
+RESPONS_CACHE_TTL = int(os.getenv("RESPONS_CACHE_TTL", "60"))  # detik, respons laporan periode berjalan
+RESPONS_CACHE_TTL_LAMA = int(os.getenv("RESPONS_CACHE_TTL_LAMA", "86400"))  # detik, respons laporan periode yang sudah lewat
+# detik, batas TTL cache berbasis generasi dengan CACHE_BACKEND=memory: generasi hanya naik di worker yang
+# menulis, worker lain baru melihat perubahan setelah item kadaluarsa
+CACHE_TTL_PER_PROSES = int(os.getenv("CACHE_TTL_PER_PROSES", "60"))
+
+
+class TTLCache:
+    """Cache in-process yang thread-safe dengan TTL per item dan batas jumlah item (LRU)"""
+
+    def __init__(self, maxsize=1024, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (kadaluarsa, value)
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            if item[0] <= time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return item[1]
+
+    def set(self, key, value, ttl=None):
+        kadaluarsa = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (kadaluarsa, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            item = self._data.pop(key, None)
+            return default if item is None else item[1]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+
+class SQLiteCache:
+    """Cache bersama antar proses di satu file SQLite (WAL), interface sama dengan TTLCache"""
+
+    BERSIHKAN_SETIAP = 1000  # hapus item kadaluarsa setiap n kali set
+
+    def __init__(self, path, namespace, ttl=300):
+        self.path = path
+        self.namespace = namespace
+        self.ttl = ttl
+        self._local = threading.local()
+        self._jumlah_set = 0
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=1, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, kadaluarsa REAL NOT NULL, value BLOB)")
+            self._local.conn = conn
+        return conn
+
+    def _key(self, key):
+        return f"{self.namespace}:{key!r}"
+
+    def get(self, key, default=None):
+        try:
+            row = self._conn().execute(
+                "SELECT kadaluarsa, value FROM cache WHERE key = ?", (self._key(key),)
+            ).fetchone()
+        except sqlite3.Error as e:
+            print(f"[WARN cache] {e}")
+            return default
+        if row is None or row[0] <= time.time():
+            return default
+        return pickle.loads(row[1])
+
+    def set(self, key, value, ttl=None):
+        kadaluarsa = time.time() + (self.ttl if ttl is None else ttl)
+        try:
+            conn = self._conn()
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (key, kadaluarsa, value) VALUES (?, ?, ?)",
+                (self._key(key), kadaluarsa, pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+            )
+            self._jumlah_set += 1
+            if self._jumlah_set % self.BERSIHKAN_SETIAP == 0:
+                conn.execute("DELETE FROM cache WHERE kadaluarsa <= ?", (time.time(),))
+        except sqlite3.Error as e:
+            print(f"[WARN cache] {e}")
+
+    def pop(self, key, default=None):
+        value = self.get(key, default)
+        try:
+            self._conn().execute("DELETE FROM cache WHERE key = ?", (self._key(key),))
+        except sqlite3.Error as e:
+            print(f"[WARN cache] {e}")
+        return value
+
+    def clear(self):
+        try:
+            self._conn().execute("DELETE FROM cache WHERE key LIKE ?", (f"{self.namespace}:%",))
+        except sqlite3.Error as e:
+            print(f"[WARN cache] {e}")
+
+    def __len__(self):
+        try:
+            return self._conn().execute(
+                "SELECT COUNT(*) FROM cache WHERE key LIKE ? AND kadaluarsa > ?", (f"{self.namespace}:%", time.time())
+            ).fetchone()[0]
+        except sqlite3.Error:
+            return 0
+
+
+def ttl_generasi(ttl):
+    """TTL item cache ber-key generasi: penuh di backend bersama, dibatasi CACHE_TTL_PER_PROSES jika per proses"""
+    if CACHE_BACKEND == "sqlite":
+        return ttl
+    return min(ttl, CACHE_TTL_PER_PROSES)
+
+def _cek_milik_sendiri(path):
+    info = os.stat(path)
+    if info.st_uid != os.getuid() or info.st_mode & 0o022:
+        raise PermissionError(f"{path} bukan milik user ini atau bisa ditulis user lain, cache sqlite ditolak")
+
+def _siapkan_sqlite_path(path):
+    """Buat direktori cache privat (0700) jika belum ada, tolak direktori/file milik user lain"""
+    direktori = os.path.dirname(os.path.abspath(path))
+    os.makedirs(direktori, mode=0o700, exist_ok=True)
+    _cek_milik_sendiri(direktori)
+    for file in (path, f"{path}-wal", f"{path}-shm"):
+        if os.path.lexists(file):
+            if os.path.islink(file):
+                raise PermissionError(f"{file} adalah symlink, cache sqlite ditolak")
+            _cek_milik_sendiri(file)
+    return path
+
+def buat_cache(namespace, maxsize, ttl):
+    """Cache sesuai CACHE_BACKEND. namespace memisahkan item antar cache di backend bersama"""
+    if CACHE_BACKEND == "sqlite":
+        return SQLiteCache(_siapkan_sqlite_path(CACHE_SQLITE_PATH), namespace, ttl=ttl)
+    return TTLCache(maxsize=maxsize, ttl=ttl)
+
+
+# Profil absensi per id_karyawan, di-invalidate saat data karyawan diubah
+profil_cache = buat_cache("profil", maxsize=2048, ttl=PROFIL_CACHE_TTL)
+
+# Hasil check-in/check-out per Idempotency-Key, retry dari client langsung dijawab tanpa verifikasi wajah ulang
+idempotensi_cache = buat_cache("idempotensi", maxsize=4096, ttl=IDEMPOTENCY_TTL)
+
+# Presensi aktif per (id_karyawan, tanggal), False = belum ada presensi (hanya PRESENSI_KOSONG_TTL).
+# Diperbarui/di-invalidate oleh fungsi tulis absensi (q_absensi, q_izin_sakit) di proses yang menulis,
+# dengan CACHE_BACKEND=memory worker lain bisa basi -> TTL dibatasi (ttl_generasi) dan penolakan check-out dicek ulang ke DB
+presensi_cache = buat_cache("presensi", maxsize=8192, ttl=ttl_generasi(PRESENSI_CACHE_TTL))
+
+def key_presensi(id_karyawan, tanggal):
+    return (int(id_karyawan), str(tanggal))
+
+def invalidate_presensi(id_karyawan, tanggal):
+    presensi_cache.pop(key_presensi(id_karyawan, tanggal))
+
+
+# Generasi data per nama (mis. 'absensi:2025-06'). Cache turunan menyimpan item dengan key (..., generasi),
+# menaikkan generasi membuat item lama tidak terpakai lagi. Nilai dari time_ns agar generasi yang
+# kadaluarsa lalu dibuat ulang tidak pernah sama dengan generasi lama
+generasi_cache = buat_cache("generasi", maxsize=4096, ttl=7 * 86400)
+
+def get_generasi(nama):
+    generasi = generasi_cache.get(nama)
+    if generasi is None:
+        generasi = time.time_ns()
+        generasi_cache.set(nama, generasi)
+    return generasi
+
+def naikkan_generasi(nama):
+    generasi_cache.set(nama, time.time_ns())
+
+
+# Blok absensi per bulan (semua karyawan, array per hari) dengan key (bulan, generasi), lihat q_absensi_bulanan.
+# Hanya dibagi antar worker dengan CACHE_BACKEND=sqlite, selain itu TTL dibatasi (ttl_generasi)
+bulan_absensi_cache = buat_cache("bulan_absensi", maxsize=48, ttl=ttl_generasi(BULAN_ABSENSI_TTL))
+
+def nama_bulan_absensi(tanggal):
+    """'absensi:YYYY-MM' untuk date atau string 'YYYY-MM-DD'"""
+    return f"absensi:{str(tanggal)[:7]}"
+
+def _bulan_di(start_date, end_date):
+    """'YYYY-MM' untuk setiap bulan di [start_date, end_date] (date atau string 'YYYY-MM-DD')"""
+    tahun, bulan = map(int, str(start_date)[:7].split('-'))
+    akhir = str(end_date)[:7]
+    while f"{tahun:04d}-{bulan:02d}" <= akhir:
+        yield f"{tahun:04d}-{bulan:02d}"
+        tahun, bulan = (tahun + 1, 1) if bulan == 12 else (tahun, bulan + 1)
+
+def invalidate_bulan_absensi(start_date, end_date=None):
+    """Naikkan generasi blok absensi bulanan untuk bulan-bulan di [start_date, end_date]. Panggil setelah commit"""
+    for bulan in _bulan_di(start_date, end_date or start_date):
+        naikkan_generasi(nama_bulan_absensi(bulan))
+
+
+# Respons endpoint laporan per (endpoint, periode, id_karyawan, generasi sumber), lihat decorator.cache_periode.
+# Sumber 'absensi' per bulan (dinaikkan fungsi tulis absensi), sumber lain global:
+# 'karyawan' (q_pegawai, q_jenis_pegawai, q_tipe_pegawai), 'izin', 'lembur', 'hutang'
+respons_cache = buat_cache("respons", maxsize=1024, ttl=RESPONS_CACHE_TTL)
+
+def generasi_sumber(sumber, start_date, end_date):
+    hasil = []
+    for nama in sumber:
+        if nama == 'absensi':
+            hasil.extend(get_generasi(nama_bulan_absensi(bulan)) for bulan in _bulan_di(start_date, end_date))
+        else:
+            hasil.append(get_generasi(nama))
+    return tuple(hasil)
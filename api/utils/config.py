@@ -1,8 +1,18 @@
+import json
+import logging
 import os
+import time
 import pytz
+from contextvars import ContextVar
 from datetime import datetime
+from functools import wraps
 from dotenv import load_dotenv
-from sqlalchemy import create_engine
+from flask import g, has_request_context
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+from .metrics import DB_CONNECTION_AGE, DB_POOL_CONNECTIONS, DB_POOL_TIMEOUTS, DB_POOL_WAIT
 
 
 # load .env
@@ -17,18 +27,171 @@ password = os.getenv("DB_PASS")
 
 DATABASE_URL = f'postgresql+psycopg2://{username}:{password}@{host}:{port}/{dbname}'
 
+# === Konfigurasi Pool Koneksi === #
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "5"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))  # detik menunggu koneksi kosong
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # detik, -1 = tidak pernah
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1") == "1"
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))  # 0 = tanpa batas
+DB_POOL_WAIT_WARN_MS = float(os.getenv("DB_POOL_WAIT_WARN_MS", "1000"))  # warning jika menunggu koneksi lebih lama
+
+db_logger = logging.getLogger("api.db")
+if not db_logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s %(message)s"))
+    db_logger.addHandler(_handler)
+
+class TimedQueuePool(QueuePool):
+    """QueuePool yang mencatat lama menunggu koneksi (checkout) ke metrics"""
+
+    def _do_get(self):
+        mulai = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            DB_POOL_TIMEOUTS.inc()
+            raise
+        finally:
+            tunggu = time.perf_counter() - mulai
+            DB_POOL_WAIT.observe(tunggu)
+            if tunggu * 1000 >= DB_POOL_WAIT_WARN_MS:
+                db_logger.warning("pool wait %.0f ms (%s)", tunggu * 1000, self.status())
+
+# === Monitoring Query === #
+DB_SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS", "500"))  # query lebih lama dari ini di-log beserta SQL & parameter
+DB_QUERY_LOG = os.getenv("DB_QUERY_LOG", "0") == "1"  # log ringkasan jumlah query & waktu DB per request
+
+db_logger.setLevel(logging.INFO if DB_QUERY_LOG else logging.WARNING)
+
+def _catat_koneksi_baru(dbapi_connection, connection_record):
+    connection_record.info['dibuat'] = time.time()
+
+def _catat_umur_koneksi(dbapi_connection, connection_record, connection_proxy):
+    dibuat = connection_record.info.get('dibuat')
+    if dibuat is not None:
+        DB_CONNECTION_AGE.observe(time.time() - dibuat)
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_mulai', []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    durasi_ms = (time.perf_counter() - conn.info['query_mulai'].pop()) * 1000
+
+    if has_request_context():
+        g.db_query_count = g.get('db_query_count', 0) + 1
+        g.db_time_ms = g.get('db_time_ms', 0.0) + durasi_ms
+
+    if durasi_ms >= DB_SLOW_QUERY_MS:
+        db_logger.warning("slow query %.1f ms: %s | params=%.500r", durasi_ms, " ".join(statement.split()), parameters)
+
+def _handle_error(exception_context):
+    # Query gagal tidak melewati after_cursor_execute, buang waktu mulainya
+    conn = exception_context.connection
+    if conn is not None and conn.info.get('query_mulai'):
+        conn.info['query_mulai'].pop()
+
+def _buat_engine(url, pool_size):
+    engine = create_engine(
+        url,
+        poolclass=TimedQueuePool,
+        pool_size=pool_size,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING,
+        connect_args={'options': f'-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}'} if DB_STATEMENT_TIMEOUT_MS > 0 else {}
+    )
+    event.listen(engine, "connect", _catat_koneksi_baru)
+    event.listen(engine, "checkout", _catat_umur_koneksi)
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+    return engine
+
 # ⛽️ Engine dibuat sekali dan dipakai ulang (pool aman)
-engine = create_engine(
-    DATABASE_URL,
-    pool_size=10,
-    max_overflow=5,
-    pool_timeout=30,
-    pool_recycle=1800,
-    pool_pre_ping=True  # opsional tapi direkomendasikan
-)
+engine = _buat_engine(DATABASE_URL, DB_POOL_SIZE)
+
+# === Konfigurasi Read Replica === #
+# Kosong = semua query ke primary. Kredensial & nama DB default sama dengan primary
+replica_host = os.getenv("DB_REPLICA_HOST", "")
+replica_port = os.getenv("DB_REPLICA_PORT", port)
+replica_dbname = os.getenv("DB_REPLICA_NAME", dbname)
+replica_username = os.getenv("DB_REPLICA_USER", username)
+replica_password = os.getenv("DB_REPLICA_PASS", password)
+DB_REPLICA_POOL_SIZE = int(os.getenv("DB_REPLICA_POOL_SIZE", str(DB_POOL_SIZE)))
+# detik, perkiraan lag replica maksimum: hasil yang di-cache dihitung di primary selama ini setelah tulis
+DB_REPLICA_MAX_LAG = float(os.getenv("DB_REPLICA_MAX_LAG", "30"))
+
+replica_engine = None
+if replica_host:
+    replica_engine = _buat_engine(
+        f'postgresql+psycopg2://{replica_username}:{replica_password}@{replica_host}:{replica_port}/{replica_dbname}',
+        DB_REPLICA_POOL_SIZE
+    )
+
+_pakai_replika = ContextVar("pakai_replika", default=False)
+_paksa_primer = ContextVar("paksa_primer", default=False)
 
 def get_connection():
-    return engine  # engine ini global, tidak dibuat ulang
+    # engine ini global, tidak dibuat ulang. Di dalam fungsi @baca_replika -> replica (jika ada),
+    # kecuali di dalam @baca_primer
+    if replica_engine is not None and _pakai_replika.get() and not _paksa_primer.get():
+        return replica_engine
+    return engine
+
+def baca_replika(fungsi):
+    """Decorator untuk query laporan read-only: jalankan di read replica, fallback ke primary"""
+    @wraps(fungsi)
+    def wrapper(*args, **kwargs):
+        token = _pakai_replika.set(True)
+        try:
+            return fungsi(*args, **kwargs)
+        finally:
+            _pakai_replika.reset(token)
+    return wrapper
+
+def baca_primer(fungsi):
+    """
+    Decorator untuk bacaan yang hasilnya di-cache dengan key generasi: selalu di primary, juga jika dipanggil
+    dari @baca_replika. Replica yang tertinggal bisa mengembalikan data sebelum tulis yang menaikkan generasi
+    """
+    @wraps(fungsi)
+    def wrapper(*args, **kwargs):
+        token = _paksa_primer.set(True)
+        try:
+            return fungsi(*args, **kwargs)
+        finally:
+            _paksa_primer.reset(token)
+    return wrapper
+
+def _statistik_pool():
+    hasil = {}
+    for nama, eng in (('primary', engine), ('replica', replica_engine)):
+        if eng is None:
+            continue
+        pool = eng.pool
+        hasil.update({
+            (nama, 'size'): pool.size(),
+            (nama, 'checked_out'): pool.checkedout(),
+            (nama, 'checked_in'): pool.checkedin(),
+            (nama, 'overflow'): max(pool.overflow(), 0),
+        })
+    return hasil
+
+DB_POOL_CONNECTIONS.fungsi = _statistik_pool
+
+def get_db_stats():
+    """(jumlah query, total waktu DB ms) pada request yang sedang berjalan"""
+    return g.get('db_query_count', 0), g.get('db_time_ms', 0.0)
+
+def log_db_request(method, path, status):
+    if DB_QUERY_LOG:
+        query_count, db_time_ms = get_db_stats()
+        db_logger.info(json.dumps({
+            'method': method, 'path': path, 'status': status,
+            'db_query_count': query_count, 'db_time_ms': round(db_time_ms, 1),
+        }))
 
 # === Mencari Timestamp WITA === #
 def get_wita():
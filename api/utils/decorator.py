@@ -1,6 +1,15 @@
+import hashlib
+import threading
+import time
 from functools import wraps
 from flask_jwt_extended import verify_jwt_in_request, get_jwt
-from flask import jsonify
+from flask import jsonify, request
+
+from .cache import (
+    IDEMPOTENCY_WAIT, RESPONS_CACHE_TTL, RESPONS_CACHE_TTL_LAMA,
+    generasi_sumber, idempotensi_cache, respons_cache, ttl_generasi
+)
+from .config import DB_REPLICA_MAX_LAG, baca_primer, get_timezone
 
 def role_required(expected_role):
     def wrapper(fn):
@@ -14,3 +23,108 @@ def role_required(expected_role):
             return fn(*args, **kwargs)
         return decorator
     return wrapper
+
+
+# Request dengan Idempotency-Key yang sedang diproses: key -> Event
+_diproses = {}
+_diproses_lock = threading.Lock()
+
+def _sidik_request():
+    """Hash isi request (field form + isi file, atau body mentah) untuk membandingkan retry dengan request awal"""
+    h = hashlib.sha256()
+    if request.mimetype in ('multipart/form-data', 'application/x-www-form-urlencoded'):
+        # Boundary multipart berbeda tiap kirim, jadi yang di-hash isi field-nya
+        for nama, nilai in sorted(request.form.items(multi=True)):
+            h.update(f"{nama}={nilai}\n".encode())
+        for nama, berkas in sorted(request.files.items(multi=True), key=lambda item: item[0]):
+            h.update(f"{nama}:{berkas.filename}\n".encode())
+            for potongan in iter(lambda: berkas.stream.read(65536), b""):
+                h.update(potongan)
+            berkas.stream.seek(0)
+    else:
+        h.update(request.get_data(cache=True))
+    return h.hexdigest()
+
+def idempotent(fn):
+    """
+    Simpan hasil (status < 500) per header Idempotency-Key, retry dengan key & isi yang sama
+    mendapat hasil awal tanpa menjalankan ulang handler. Key yang sama dengan isi berbeda -> 422.
+    Pasang di bawah role_required.
+    """
+    @wraps(fn)
+    def decorator(*args, **kwargs):
+        kunci = request.headers.get('Idempotency-Key')
+        if not kunci:
+            return fn(*args, **kwargs)
+
+        key = (request.method, request.path, get_jwt().get('sub'), kunci[:128])
+        sidik = _sidik_request()
+        batas = time.monotonic() + IDEMPOTENCY_WAIT
+        while True:
+            with _diproses_lock:
+                hasil = idempotensi_cache.get(key)
+                event = _diproses.get(key)
+                pemilik = hasil is None and event is None
+                if pemilik:
+                    event = _diproses[key] = threading.Event()
+            if hasil is not None or pemilik:
+                break
+
+            # Retry datang saat request awal masih berjalan (mis. verifikasi wajah). Request awal gagal (>= 500,
+            # tidak disimpan) -> dicek ulang dan retry ini menjalankan handler sendiri
+            if not event.wait(max(batas - time.monotonic(), 0)):
+                return {'status': 'error', 'message': 'Request yang sama masih diproses, silakan coba lagi.'}, 409, {'Retry-After': '2'}
+
+        if hasil is not None:
+            body, status, headers, sidik_awal = hasil
+            if sidik_awal != sidik:
+                return {'status': 'error', 'message': 'Idempotency-Key sudah dipakai untuk request dengan data berbeda.'}, 422
+            return body, status, {**headers, 'Idempotent-Replayed': 'true'}
+
+        try:
+            response = fn(*args, **kwargs)
+            if isinstance(response, tuple) and len(response) >= 2 and response[1] < 500:
+                headers = response[2] if len(response) > 2 else {}
+                idempotensi_cache.set(key, (response[0], response[1], dict(headers), sidik))
+            return response
+        finally:
+            with _diproses_lock:
+                _diproses.pop(key, None)
+            event.set()
+    return decorator
+
+
+def cache_periode(endpoint, sumber, data='data'):
+    """
+    Cache respons laporan per (endpoint, start_date, end_date, id_karyawan) + generasi `sumber`.
+    Fungsi yang dibungkus: (start_date, end_date, id_karyawan=None) -> (body, status), dipanggil resource
+    setelah parameter dinormalisasi. Disimpan hanya status 200 dengan body[data] tidak kosong
+    (query laporan mengembalikan [] saat error). Periode yang sudah lewat TTL panjang (dibatasi jika cache
+    per proses, lihat ttl_generasi), periode berjalan TTL pendek dan key memuat tanggal hari ini.
+    Generasi yang naik < DB_REPLICA_MAX_LAG detik lalu -> dihitung di primary agar tidak menyimpan data replica lama
+    """
+    def wrapper(fn):
+        @wraps(fn)
+        def decorator(start_date, end_date, id_karyawan=None):
+            today, _ = get_timezone()
+            lewat = end_date < today
+            generasi = generasi_sumber(sumber, start_date, end_date)
+            key = (
+                endpoint, str(start_date), str(end_date),
+                int(id_karyawan) if id_karyawan else None,
+                None if lewat else str(today),
+                generasi
+            )
+            hasil = respons_cache.get(key)
+            if hasil is not None:
+                return hasil
+
+            # Generasi bernilai time_ns saat dinaikkan
+            baru_ditulis = generasi and time.time_ns() - max(generasi) < DB_REPLICA_MAX_LAG * 1e9
+            hasil = (baca_primer(fn) if baru_ditulis else fn)(start_date, end_date, id_karyawan)
+            if hasil[1] == 200 and hasil[0].get(data):
+                ttl = ttl_generasi(RESPONS_CACHE_TTL_LAMA if lewat else RESPONS_CACHE_TTL)
+                respons_cache.set(key, hasil, ttl=ttl)
+            return hasil
+        return decorator
+    return wrapper
@@ -0,0 +1,37 @@
+import hashlib
+from datetime import datetime
+import pytz
+from flask import request
+from werkzeug.http import http_date
+
+
+# Versi resource dari query ringan (mis. COUNT(*), MAX(updated_at) untuk filter yang sama dengan data).
+# Jika versi sama, payload sama -> If-None-Match dijawab 304 sebelum query data & serialisasi
+WITA = pytz.timezone("Asia/Makassar")
+
+
+def _etag(versi, kunci):
+    isi = repr((kunci, tuple(versi))).encode()
+    return hashlib.sha1(isi).hexdigest()[:24]
+
+def _last_modified(versi):
+    # Kolom updated_at disimpan sebagai WITA tanpa timezone
+    waktu = [nilai for nilai in versi if isinstance(nilai, datetime)]
+    if not waktu:
+        return None
+    return http_date(WITA.localize(max(waktu)).astimezone(pytz.utc))
+
+def header_versi(versi, *kunci):
+    """
+    Header ETag/Last-Modified untuk baris versi + True jika If-None-Match request cocok (jawab 304).
+    kunci: parameter filter yang ikut menentukan payload. versi None (query versi gagal) -> ({}, False)
+    """
+    if versi is None:
+        return {}, False
+
+    etag = _etag(versi, kunci)
+    headers = {'ETag': f'W/"{etag}"', 'Cache-Control': 'private, no-cache'}
+    last_modified = _last_modified(versi)
+    if last_modified:
+        headers['Last-Modified'] = last_modified
+    return headers, request.if_none_match.contains_weak(etag)
@@ -0,0 +1,87 @@
+import base64
+import http.client
+import json
+import os
+import socket
+import threading
+from urllib.parse import urlparse
+
+
+# === Konfigurasi Client Face Service === #
+# Kosong = verifikasi di process pool lokal. Contoh: http://127.0.0.1:8765 atau unix:///run/face.sock
+FACE_SERVICE_URL = os.getenv("FACE_SERVICE_URL", "")
+
+# Satu koneksi keep-alive per thread request
+_local = threading.local()
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path, timeout=None):
+        super().__init__("localhost", timeout=timeout)
+        self.unix_path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.unix_path)
+
+
+def _buat_koneksi(timeout):
+    url = urlparse(FACE_SERVICE_URL)
+    if url.scheme == "unix":
+        return _UnixHTTPConnection(url.path, timeout=timeout)
+    return http.client.HTTPConnection(url.hostname, url.port or 80, timeout=timeout)
+
+def _koneksi(timeout):
+    conn = getattr(_local, 'conn', None)
+    if conn is None:
+        conn = _local.conn = _buat_koneksi(timeout)
+    conn.timeout = timeout
+    if conn.sock is not None:
+        conn.sock.settimeout(timeout)
+    return conn
+
+def _tutup_koneksi():
+    conn = getattr(_local, 'conn', None)
+    if conn is not None:
+        conn.close()
+    _local.conn = None
+
+def _post(path, payload, timeout):
+    body = json.dumps(payload).encode()
+    headers = {'Content-Type': 'application/json', 'Connection': 'keep-alive'}
+
+    # Koneksi keep-alive bisa sudah ditutup server, coba sekali lagi dengan koneksi baru
+    for percobaan in range(2):
+        conn = _koneksi(timeout)
+        try:
+            conn.request("POST", path, body=body, headers=headers)
+            resp = conn.getresponse()
+            return resp.status, json.loads(resp.read() or b'{}')
+        except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+            _tutup_koneksi()
+            if percobaan:
+                raise
+        except Exception:
+            _tutup_koneksi()
+            raise
+
+def verifikasi_via_service(id_karyawan, image_bytes, timeout, lokasi_wajah=None):
+    """Return sama seperti submit_verifikasi: bool / "not_detected" / "error" / "busy" / "timeout" """
+    payload = {'id_karyawan': id_karyawan, 'image': base64.b64encode(image_bytes).decode(), 'timeout': timeout}
+    if lokasi_wajah:
+        payload['lokasi_wajah'] = list(lokasi_wajah)
+    try:
+        status, data = _post("/verify", payload, timeout + 1)
+    except socket.timeout:
+        return "timeout"
+    except Exception as e:
+        print(f"[ERROR verifikasi_via_service] {e}")
+        return "error"
+
+    if status == 503:
+        return "busy"
+    if status != 200:
+        print(f"[ERROR verifikasi_via_service] status {status}: {data}")
+        return "error"
+    return data.get('hasil', "error")
@@ -1,26 +1,133 @@
-import face_recognition
+import os
+import numpy as np
+from PIL import Image, ImageOps
 
+from .face_store import daftar_id_referensi, get_encoding_referensi
 
-def verifikasi_wajah(id_karyawan, image):
+
+# === Konfigurasi Preprocessing Foto Wajah === #
+FACE_MAX_SIDE = int(os.getenv("FACE_MAX_SIDE", "640"))  # sisi terpanjang setelah resize, 0 = resolusi asli
+FACE_UPSAMPLE = int(os.getenv("FACE_UPSAMPLE", "1"))  # number_of_times_to_upsample untuk deteksi HOG
+FACE_UPSAMPLE_RETRY = int(os.getenv("FACE_UPSAMPLE_RETRY", "1"))  # upsample tambahan jika wajah tidak ketemu di foto yang diperkecil
+FACE_TOLERANCE = float(os.getenv("FACE_TOLERANCE", "0.6"))
+FACE_WARMUP = os.getenv("FACE_WARMUP", "0") == "1"
+FACE_HINT_MIN_SIDE = int(os.getenv("FACE_HINT_MIN_SIDE", "20"))  # bounding box dari client lebih kecil dari ini diabaikan
+
+_EXIF_ORIENTATION = 0x0112
+
+
+def _face_recognition():
+    # Import face_recognition memuat model dlib (~100MB RSS), jadi ditunda sampai verifikasi pertama
+    import face_recognition
+    return face_recognition
+
+def warmup(preload_referensi=False):
+    """Load model dlib (dan opsional semua encoding referensi) sebelum request pertama"""
+    _face_recognition()
+    if preload_referensi:
+        for id_karyawan in daftar_id_referensi():
+            try:
+                get_encoding_referensi(id_karyawan)
+            except Exception as e:
+                print(f"[ERROR warmup] {id_karyawan}: {e}")
+
+
+def muat_gambar(image, max_side=None):
+    """
+    Decode foto dengan skala kecil (JPEG draft), koreksi orientasi EXIF, lalu resize ke max_side.
+    Return (array RGB, skala terhadap foto asli setelah koreksi orientasi).
+    """
+    max_side = FACE_MAX_SIDE if max_side is None else max_side
+
+    img = Image.open(image)
+    lebar_asli, tinggi_asli = img.size
+    if img.getexif().get(_EXIF_ORIENTATION, 1) in (5, 6, 7, 8):
+        lebar_asli, tinggi_asli = tinggi_asli, lebar_asli  # rotasi 90/270 -> sisi tertukar
+    if max_side and img.format == 'JPEG':
+        # Decoder JPEG langsung skala 1/2, 1/4, 1/8 -> jauh lebih murah dari decode penuh
+        img.draft('RGB', (max_side, max_side))
+    img = ImageOps.exif_transpose(img).convert('RGB')
+
+    if max_side and max(img.size) > max_side:
+        img.thumbnail((max_side, max_side), Image.LANCZOS)
+
+    return np.asarray(img), img.size[0] / lebar_asli
+
+def skala_lokasi_wajah(lokasi_wajah, skala, shape):
+    """
+    Bounding box (top, right, bottom, left) pixel foto asli -> koordinat array yang sudah diperkecil.
+    None jika box tidak valid / terlalu kecil, sehingga dipakai deteksi penuh.
+    """
     try:
-        file_path = f"./cropped_faces/{id_karyawan}.jpg"
+        top, right, bottom, left = (int(round(float(v) * skala)) for v in lokasi_wajah)
+    except (TypeError, ValueError):
+        return None
+    tinggi, lebar = shape[:2]
+    top, bottom = max(top, 0), min(bottom, tinggi)
+    left, right = max(left, 0), min(right, lebar)
+    if bottom - top < FACE_HINT_MIN_SIDE * skala or right - left < FACE_HINT_MIN_SIDE * skala:
+        return None
+    return top, right, bottom, left
+
+def encode_wajah(image_array, upsample=None, lokasi=None):
+    """Deteksi wajah pertama lalu encode, None jika tidak ada wajah. Jika lokasi diberikan, deteksi HOG dilewati"""
+    face_recognition = _face_recognition()
+    if lokasi is not None:
+        return face_recognition.face_encodings(image_array, known_face_locations=[lokasi])[0]
+
+    upsample = FACE_UPSAMPLE if upsample is None else upsample
+    lokasi = face_recognition.face_locations(image_array, number_of_times_to_upsample=upsample)
+    if not lokasi:
+        return None
+    return face_recognition.face_encodings(image_array, known_face_locations=lokasi[:1])[0]
 
-        known_image = face_recognition.load_image_file(file_path)
-        unknown_image = face_recognition.load_image_file(image)
+def cocokkan_wajah(known_encodings, unknown_encoding, tolerance=None):
+    """
+    Bandingkan encoding foto upload dengan semua encoding referensi (N x 128) sekaligus.
+    Return (cocok, jarak terbaik, confidence 0..1; 0.5 tepat di batas tolerance).
+    """
+    tolerance = FACE_TOLERANCE if tolerance is None else tolerance
+    jarak = float(np.min(np.linalg.norm(known_encodings - unknown_encoding, axis=1)))
+    confidence = min(max(1.0 - jarak / (2 * tolerance), 0.0), 1.0)
+    return jarak <= tolerance, jarak, confidence
 
-        known_encodings = face_recognition.face_encodings(known_image)
-        unknown_encodings = face_recognition.face_encodings(unknown_image)
+def _hasil_verifikasi(cocok, jarak, confidence, detail):
+    if detail:
+        return {'cocok': cocok, 'jarak': round(jarak, 4), 'confidence': round(confidence, 4)}
+    return cocok
 
-        if len(known_encodings) == 0 or len(unknown_encodings) == 0:
+def verifikasi_wajah(id_karyawan, image, max_side=None, upsample=None, tolerance=None, detail=False, lokasi_wajah=None):
+    """
+    lokasi_wajah: bounding box opsional (top, right, bottom, left) dari client dalam pixel foto asli.
+    Jika box tidak valid atau wajah di dalamnya tidak cocok, kembali ke deteksi penuh.
+    """
+    try:
+        # Encoding foto referensi diambil dari cache/store, hanya foto upload yang di-encode
+        known_encodings = get_encoding_referensi(id_karyawan)
+        if known_encodings is None:
             return "not_detected"
 
-        known_encoding = known_encodings[0]
-        unknown_encoding = unknown_encodings[0]
+        unknown_image, skala = muat_gambar(image, max_side)
+
+        lokasi = skala_lokasi_wajah(lokasi_wajah, skala, unknown_image.shape) if lokasi_wajah else None
+        if lokasi is not None:
+            # Crop dari client murah (tanpa HOG), tapi box yang meleset menghasilkan encoding yang salah
+            cocok, jarak, confidence = cocokkan_wajah(known_encodings, encode_wajah(unknown_image, lokasi=lokasi), tolerance)
+            if cocok:
+                return _hasil_verifikasi(cocok, jarak, confidence, detail)
+
+        upsample = FACE_UPSAMPLE if upsample is None else upsample
+        unknown_encoding = encode_wajah(unknown_image, upsample)
+
+        # Wajah kecil bisa hilang setelah downscale, coba lagi dengan upsample lebih tinggi
+        if unknown_encoding is None and skala < 1 and FACE_UPSAMPLE_RETRY > 0:
+            unknown_encoding = encode_wajah(unknown_image, upsample + FACE_UPSAMPLE_RETRY)
+
+        if unknown_encoding is None:
+            return "not_detected"
 
-        results = face_recognition.compare_faces([known_encoding], unknown_encoding)
+        return _hasil_verifikasi(*cocokkan_wajah(known_encodings, unknown_encoding, tolerance), detail)
 
-        return results[0]
-    
     except Exception as e:
         print(f"[ERROR verifikasi_wajah] {e}")
         return "error"
@@ -0,0 +1,164 @@
+import io
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from .face_detection import FACE_WARMUP, verifikasi_wajah, warmup
+from .face_client import FACE_SERVICE_URL, verifikasi_via_service
+from .metrics import FACE_VERIFICATION
+
+
+# === Konfigurasi Pool Verifikasi Wajah === #
+# Setiap worker gunicorn punya pool sendiri dan dlib CPU-bound: total proses = worker x FACE_WORKERS, sebaiknya
+# <= jumlah core. Default core / WEB_CONCURRENCY (jumlah worker gunicorn), minimal 1. Dengan face_service
+# (FACE_SERVICE_URL) hanya service yang butuh pool: jalankan dengan FACE_WORKERS = jumlah core. 0 = jalan di thread request
+WEB_CONCURRENCY = max(int(os.getenv("WEB_CONCURRENCY", "1")), 1)
+FACE_WORKERS = int(os.getenv("FACE_WORKERS", str(max((os.cpu_count() or 1) // WEB_CONCURRENCY, 1))))
+FACE_QUEUE_SIZE = int(os.getenv("FACE_QUEUE_SIZE", str(max(FACE_WORKERS, 1) * 2)))
+FACE_TIMEOUT = float(os.getenv("FACE_TIMEOUT", "10"))  # detik
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+# Slot = job yang sedang dikerjakan + job yang antri, lebih dari itu ditolak (503)
+_slot = threading.BoundedSemaphore(max(FACE_WORKERS, 1) + FACE_QUEUE_SIZE)
+
+
+def _init_worker():
+    if FACE_WARMUP:
+        warmup(preload_referensi=True)
+
+def _get_executor():
+    global _executor, _executor_pid
+    with _executor_lock:
+        # Pool milik proses lain (mis. gunicorn --preload lalu fork) tidak bisa dipakai
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ProcessPoolExecutor(max_workers=FACE_WORKERS, initializer=_init_worker)
+            _executor_pid = os.getpid()
+        return _executor
+
+def _reset_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+def warmup_pool():
+    """Hook warm-up: jalankan semua proses pool (beserta model dlib) sebelum request pertama"""
+    if FACE_WORKERS <= 0:
+        warmup(preload_referensi=True)
+        return
+    executor = _get_executor()
+    for _ in range(FACE_WORKERS):
+        executor.submit(os.getpid)
+
+def _verifikasi_job(id_karyawan, image_bytes, deadline, lokasi_wajah=None):
+    # Job yang keburu kadaluarsa di antrian tidak perlu dikerjakan
+    if time.time() > deadline:
+        return "timeout"
+    return verifikasi_wajah(id_karyawan, io.BytesIO(image_bytes), lokasi_wajah=lokasi_wajah)
+
+def _verifikasi_batch_job(jobs, deadline):
+    return [_verifikasi_job(id_karyawan, image_bytes, deadline, *lokasi) for id_karyawan, image_bytes, *lokasi in jobs]
+
+def verifikasi_batch(jobs, timeout=None):
+    """
+    Verifikasi banyak (id_karyawan, bytes foto[, lokasi_wajah]) sekaligus. Job dibagi rata ke worker,
+    satu submit (IPC) per worker. Return list hasil dengan urutan sama seperti jobs.
+    """
+    timeout = timeout or FACE_TIMEOUT
+    deadline = time.time() + timeout
+    if not jobs:
+        return []
+    if FACE_WORKERS <= 0:
+        return _verifikasi_batch_job(jobs, deadline)
+
+    n = min(FACE_WORKERS, len(jobs))
+    hasil = [None] * len(jobs)
+    futures = []
+    for i in range(n):
+        indeks = range(i, len(jobs), n)
+        if not _slot.acquire(blocking=False):
+            for j in indeks:
+                hasil[j] = "busy"
+            continue
+        try:
+            future = _get_executor().submit(_verifikasi_batch_job, jobs[i::n], deadline)
+        except (BrokenProcessPool, RuntimeError) as e:
+            _slot.release()
+            print(f"[ERROR verifikasi_batch] {e}")
+            _reset_executor()
+            for j in indeks:
+                hasil[j] = "error"
+            continue
+        future.add_done_callback(lambda _: _slot.release())
+        futures.append((indeks, future))
+
+    for indeks, future in futures:
+        try:
+            for j, r in zip(indeks, future.result(timeout=max(deadline - time.time(), 0))):
+                hasil[j] = r
+        except FutureTimeoutError:
+            future.cancel()
+            for j in indeks:
+                hasil[j] = "timeout"
+        except Exception as e:
+            print(f"[ERROR verifikasi_batch] {e}")
+            if isinstance(e, BrokenProcessPool):
+                _reset_executor()
+            for j in indeks:
+                hasil[j] = "error"
+    return hasil
+
+def _submit_verifikasi(id_karyawan, image, timeout=None, lokasi_wajah=None):
+    timeout = timeout or FACE_TIMEOUT
+    image_bytes = image.read()
+
+    # Face service terpisah (python -m api.utils.face_service) -> CPU wajah tidak di proses API
+    if FACE_SERVICE_URL:
+        return verifikasi_via_service(id_karyawan, image_bytes, timeout, lokasi_wajah)
+
+    if FACE_WORKERS <= 0:
+        return verifikasi_wajah(id_karyawan, io.BytesIO(image_bytes), lokasi_wajah=lokasi_wajah)
+
+    if not _slot.acquire(blocking=False):
+        return "busy"
+
+    try:
+        future = _get_executor().submit(_verifikasi_job, id_karyawan, image_bytes, time.time() + timeout, lokasi_wajah)
+    except (BrokenProcessPool, RuntimeError) as e:
+        _slot.release()
+        print(f"[ERROR submit_verifikasi] {e}")
+        _reset_executor()
+        return "error"
+
+    # Slot baru dilepas saat job benar-benar selesai, bukan saat request menyerah
+    future.add_done_callback(lambda _: _slot.release())
+
+    try:
+        return future.result(timeout=timeout)
+    except FutureTimeoutError:
+        future.cancel()
+        return "timeout"
+    except BrokenProcessPool as e:
+        print(f"[ERROR submit_verifikasi] {e}")
+        _reset_executor()
+        return "error"
+    except Exception as e:
+        print(f"[ERROR submit_verifikasi] {e}")
+        return "error"
+
+def submit_verifikasi(id_karyawan, image, timeout=None, lokasi_wajah=None):
+    """
+    Verifikasi wajah lewat process pool. Return sama seperti verifikasi_wajah,
+    ditambah "busy" jika antrian penuh dan "timeout" jika melewati batas waktu.
+    lokasi_wajah: bounding box opsional (top, right, bottom, left) dari client.
+    """
+    mulai = time.perf_counter()
+    hasil = _submit_verifikasi(id_karyawan, image, timeout, lokasi_wajah)
+    label = hasil if isinstance(hasil, str) else ("cocok" if hasil else "tidak_cocok")
+    FACE_VERIFICATION.observe(time.perf_counter() - mulai, hasil=label)
+    return hasil
@@ -0,0 +1,180 @@
+"""
+Face verification service lokal, terpisah dari proses API.
+
+Model dlib & encoding referensi tetap resident di worker pool. Request /verify yang datang
+bersamaan dikumpulkan selama FACE_BATCH_WAIT_MS lalu dikirim ke pool sebagai satu batch.
+API memakai service ini jika FACE_SERVICE_URL di-set (lihat face_client).
+
+Contoh:
+    python -m api.utils.face_service --host 127.0.0.1 --port 8765
+    python -m api.utils.face_service --unix /run/face.sock
+"""
+import argparse
+import base64
+import binascii
+import json
+import os
+import queue
+import socket
+import socketserver
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .face_executor import FACE_QUEUE_SIZE, FACE_TIMEOUT, FACE_WORKERS, verifikasi_batch, warmup_pool
+
+
+# === Konfigurasi Face Service === #
+FACE_SERVICE_HOST = os.getenv("FACE_SERVICE_HOST", "127.0.0.1")
+FACE_SERVICE_PORT = int(os.getenv("FACE_SERVICE_PORT", "8765"))
+FACE_BATCH_SIZE = int(os.getenv("FACE_BATCH_SIZE", str(max(FACE_WORKERS, 1) * 4)))
+FACE_BATCH_WAIT_MS = float(os.getenv("FACE_BATCH_WAIT_MS", "5"))
+FACE_BATCH_SLOTS = int(os.getenv("FACE_BATCH_SLOTS", "2"))  # batch yang boleh berjalan bersamaan
+
+# Antrian /verify yang menunggu dibatch, penuh -> 503
+_antrian = queue.Queue(maxsize=FACE_BATCH_SIZE + FACE_QUEUE_SIZE)
+_dispatcher = ThreadPoolExecutor(max_workers=FACE_BATCH_SLOTS, thread_name_prefix="face-batch")
+# Slot batch (batcher & /verify-batch). Batcher menunggu slot sebelum mengambil job, jadi saat semua slot
+# terpakai job menumpuk di _antrian (terbatas) dan /verify ditolak, antrian internal _dispatcher tidak tumbuh
+_slot_batch = threading.BoundedSemaphore(FACE_BATCH_SLOTS)
+
+
+class _Job:
+    __slots__ = ('id_karyawan', 'image_bytes', 'lokasi_wajah', 'deadline', 'hasil', 'selesai')
+
+    def __init__(self, id_karyawan, image_bytes, lokasi_wajah, timeout):
+        self.id_karyawan = id_karyawan
+        self.image_bytes = image_bytes
+        self.lokasi_wajah = lokasi_wajah
+        self.deadline = time.time() + timeout
+        self.hasil = "timeout"
+        self.selesai = threading.Event()
+
+
+def _jalankan_batch(batch):
+    try:
+        timeout = max(min(job.deadline for job in batch) - time.time(), 0.001)
+        hasil = verifikasi_batch([(job.id_karyawan, job.image_bytes, job.lokasi_wajah) for job in batch], timeout)
+    except Exception as e:
+        print(f"[ERROR face_service] {e}")
+        hasil = ["error"] * len(batch)
+    finally:
+        _slot_batch.release()
+    for job, r in zip(batch, hasil):
+        job.hasil = r
+        job.selesai.set()
+
+def _batcher():
+    while True:
+        _slot_batch.acquire()
+        batch = [_antrian.get()]
+        batas = time.monotonic() + FACE_BATCH_WAIT_MS / 1000
+        while len(batch) < FACE_BATCH_SIZE:
+            sisa = batas - time.monotonic()
+            if sisa <= 0:
+                break
+            try:
+                batch.append(_antrian.get(timeout=sisa))
+            except queue.Empty:
+                break
+        _dispatcher.submit(_jalankan_batch, batch)
+
+
+def _decode_job(item):
+    lokasi_wajah = item.get('lokasi_wajah')
+    if lokasi_wajah is not None and len(lokasi_wajah) != 4:
+        raise ValueError("lokasi_wajah harus [top, right, bottom, left]")
+    return str(item['id_karyawan']), base64.b64decode(item['image'], validate=True), lokasi_wajah
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive untuk client
+
+    def log_message(self, format, *args):
+        pass
+
+    def _kirim(self, status, data):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path != "/health":
+            return self._kirim(404, {'status': 'Not found'})
+        self._kirim(200, {'status': 'ok', 'workers': FACE_WORKERS, 'antrian': _antrian.qsize()})
+
+    def do_POST(self):
+        try:
+            payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+            timeout = float(payload.get('timeout') or FACE_TIMEOUT)
+            if self.path == "/verify":
+                return self._verify(_decode_job(payload), timeout)
+            if self.path == "/verify-batch":
+                jobs = [_decode_job(item) for item in payload['jobs']]
+                return self._verify_batch(jobs, timeout)
+            self._kirim(404, {'status': 'Not found'})
+        except (ValueError, KeyError, TypeError, binascii.Error) as e:
+            self._kirim(400, {'status': f'Payload tidak valid: {e}'})
+
+    def _verify(self, job, timeout):
+        job = _Job(*job, timeout)
+        try:
+            _antrian.put_nowait(job)
+        except queue.Full:
+            return self._kirim(503, {'hasil': "busy"})
+        job.selesai.wait(timeout)
+        self._kirim(200, {'hasil': job.hasil})
+
+    def _verify_batch(self, jobs, timeout):
+        # Batas slot yang sama dengan batch dari /verify
+        if not _slot_batch.acquire(blocking=False):
+            return self._kirim(503, {'hasil': ["busy"] * len(jobs)})
+        try:
+            hasil = verifikasi_batch(jobs, timeout)
+        finally:
+            _slot_batch.release()
+        self._kirim(200, {'hasil': hasil})
+
+
+class _UnixHTTPServer(ThreadingHTTPServer):
+    address_family = socket.AF_UNIX
+
+    def server_bind(self):
+        socketserver.TCPServer.server_bind(self)
+        self.server_name, self.server_port = "localhost", 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Face verification service")
+    parser.add_argument('--host', default=FACE_SERVICE_HOST)
+    parser.add_argument('--port', type=int, default=FACE_SERVICE_PORT)
+    parser.add_argument('--unix', help='Path Unix socket (menggantikan host/port)')
+    args = parser.parse_args()
+
+    warmup_pool()
+    threading.Thread(target=_batcher, name="face-batcher", daemon=True).start()
+
+    if args.unix:
+        if os.path.exists(args.unix):
+            os.remove(args.unix)
+        server = _UnixHTTPServer(args.unix, _Handler)
+        print(f"Face service listening on unix:{args.unix}")
+    else:
+        server = ThreadingHTTPServer((args.host, args.port), _Handler)
+        print(f"Face service listening on http://{args.host}:{args.port}")
+
+    server.daemon_threads = True
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+import glob
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+import numpy as np
+
+
+# === Konfigurasi Store Encoding Wajah === #
+# Foto referensi per karyawan: {id}.jpg (utama) + {id}_*.jpg (foto tambahan, mis. pencahayaan lain)
+REFERENSI_DIR = os.getenv("FACE_REFERENCE_DIR", "./cropped_faces")
+ENCODING_DIR = os.getenv("FACE_ENCODING_DIR", "./face_encodings")
+CACHE_SIZE = int(os.getenv("FACE_CACHE_SIZE", "128"))
+ENCODING_DIM = 128
+
+# LRU per worker: id_karyawan -> (signature foto referensi, matriks encoding N x 128)
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+_cache_stats = {'hit': 0, 'miss': 0, 'evict': 0}
+
+
+def _sumber_referensi(id_karyawan):
+    utama = os.path.join(REFERENSI_DIR, f"{id_karyawan}.jpg")
+    tambahan = sorted(glob.glob(os.path.join(REFERENSI_DIR, f"{glob.escape(str(id_karyawan))}_*.jpg")))
+    return ([utama] if os.path.exists(utama) else []) + tambahan
+
+def _signature(paths):
+    if not paths:
+        raise FileNotFoundError("Foto referensi tidak ditemukan")
+    return tuple((os.path.basename(p), os.stat(p).st_mtime_ns) for p in paths)
+
+def _path_encoding(id_karyawan):
+    return os.path.join(ENCODING_DIR, f"{id_karyawan}.npz")
+
+def _hash_file(path):
+    sha1 = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b''):
+            sha1.update(chunk)
+    return sha1.hexdigest()
+
+def _encode_referensi(path):
+    import face_recognition  # lazy: dlib hanya di-load saat benar-benar dibutuhkan
+
+    image = face_recognition.load_image_file(path)
+    encodings = face_recognition.face_encodings(image)
+    return encodings[0] if encodings else None
+
+def _simpan_encoding(id_karyawan, encodings, sumber, mtime, sha1, valid):
+    os.makedirs(ENCODING_DIR, exist_ok=True)
+    # File sementara unik per penulis: beberapa proses pool bisa meng-encode karyawan yang sama bersamaan
+    fd, tmp_path = tempfile.mkstemp(dir=ENCODING_DIR, prefix=f".{id_karyawan}.", suffix=".npz")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(
+                f,
+                encodings=np.ascontiguousarray(encodings, dtype=np.float64),
+                sumber=np.array(sumber), mtime=np.array(mtime, dtype=np.int64),
+                sha1=np.array(sha1), valid=np.array(valid, dtype=bool)
+            )
+        os.replace(tmp_path, _path_encoding(id_karyawan))  # atomic, aman dibaca worker lain
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def _baca_store(id_karyawan):
+    """Isi store lama sebagai {nama file: (mtime, sha1, encoding atau None)}"""
+    try:
+        with np.load(_path_encoding(id_karyawan)) as data:
+            encodings = iter(data['encodings'])
+            return {
+                str(nama): (int(mtime), str(sha1), next(encodings) if valid else None)
+                for nama, mtime, sha1, valid in zip(data['sumber'], data['mtime'], data['sha1'], data['valid'])
+            }
+    except (OSError, KeyError, ValueError, StopIteration):
+        return {}  # store belum ada / format lama / rusak -> bangun ulang
+
+def muat_encoding(id_karyawan, signature=None, cek_isi=False):
+    """
+    Matriks encoding (N x 128) semua foto referensi karyawan dari store.
+    Hanya foto yang berubah (mtime & sha1) yang di-encode ulang. None jika tidak ada wajah terdeteksi.
+    cek_isi=True: sha1 selalu dibandingkan walau nama & mtime sama dengan store
+    """
+    paths = _sumber_referensi(id_karyawan)
+    signature = signature or _signature(paths)
+    lama = _baca_store(id_karyawan)
+
+    if not cek_isi and lama and [(nama, mtime) for nama, (mtime, _, _) in lama.items()] == list(signature):
+        encodings = [enc for _, _, enc in lama.values() if enc is not None]
+        return np.vstack(encodings) if encodings else None
+
+    sumber, mtimes, sha1s, valid, encodings = [], [], [], [], []
+    for path, (nama, mtime) in zip(paths, signature):
+        sha1 = _hash_file(path)
+        if nama in lama and lama[nama][1] == sha1:
+            encoding = lama[nama][2]  # isi sama, hanya mtime berubah
+        else:
+            encoding = _encode_referensi(path)
+
+        sumber.append(nama)
+        mtimes.append(mtime)
+        sha1s.append(sha1)
+        valid.append(encoding is not None)
+        if encoding is not None:
+            encodings.append(encoding)
+
+    matriks = np.vstack(encodings) if encodings else np.empty((0, ENCODING_DIM))
+    _simpan_encoding(id_karyawan, matriks, sumber, mtimes, sha1s, valid)
+    return matriks if len(matriks) else None
+
+def get_encoding_referensi(id_karyawan):
+    """Matriks encoding referensi dari LRU in-process, fallback ke store di disk jika miss"""
+    key = str(id_karyawan)
+    signature = _signature(_sumber_referensi(key))
+
+    with _cache_lock:
+        item = _cache.get(key)
+        if item is not None:
+            if item[0] == signature:
+                _cache.move_to_end(key)
+                _cache_stats['hit'] += 1
+                return item[1]
+            # Foto referensi diganti / ditambah -> buang encoding lama
+            del _cache[key]
+            _cache_stats['evict'] += 1
+        _cache_stats['miss'] += 1
+
+    encodings = muat_encoding(key, signature)
+    if encodings is None:
+        return None
+
+    with _cache_lock:
+        _cache[key] = (signature, encodings)
+        _cache.move_to_end(key)
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+            _cache_stats['evict'] += 1
+    return encodings
+
+def cache_stats():
+    with _cache_lock:
+        return {**_cache_stats, 'size': len(_cache), 'maxsize': CACHE_SIZE}
+
+def clear_cache():
+    with _cache_lock:
+        _cache.clear()
+
+def daftar_id_referensi():
+    ids = {os.path.basename(p)[:-len(".jpg")].split("_")[0] for p in glob.glob(os.path.join(REFERENSI_DIR, "*.jpg"))}
+    return sorted(ids)
+
+def _store_sesuai(id_karyawan, paths):
+    """True jika store memuat tepat foto referensi saat ini (nama & sha1), tidak bergantung mtime"""
+    lama = _baca_store(id_karyawan)
+    if list(lama) != [os.path.basename(p) for p in paths]:
+        return False
+    return all(lama[os.path.basename(p)][1] == _hash_file(p) for p in paths)
+
+def _hapus_store_yatim(ids):
+    """Hapus store encoding karyawan yang foto referensinya sudah tidak ada. Return jumlah yang dihapus"""
+    dihapus = 0
+    for path in glob.glob(os.path.join(ENCODING_DIR, "*.npz")):
+        nama = os.path.basename(path)[:-len(".npz")]
+        if not nama.startswith(".") and nama not in ids:
+            os.remove(path)
+            dihapus += 1
+    return dihapus
+
+def build_store(force=False):
+    """Bangun encoding untuk semua foto referensi, dipanggil dari CLI `flask build-face-encodings`"""
+    hasil = {'dibuat': 0, 'dilewati': 0, 'dihapus': 0, 'gagal': []}
+    ids = daftar_id_referensi()
+    hasil['dihapus'] = _hapus_store_yatim(set(ids))
+
+    for id_karyawan in ids:
+        store = _path_encoding(id_karyawan)
+        paths = _sumber_referensi(id_karyawan)
+
+        if force and os.path.exists(store):
+            os.remove(store)
+        elif not force and _store_sesuai(id_karyawan, paths):
+            hasil['dilewati'] += 1
+            continue
+
+        try:
+            if muat_encoding(id_karyawan, cek_isi=True) is None:
+                hasil['gagal'].append(id_karyawan)
+            else:
+                hasil['dibuat'] += 1
+        except Exception as e:
+            print(f"[ERROR build_store] {id_karyawan}: {e}")
+            hasil['gagal'].append(id_karyawan)
+
+    return hasil
@@ -1,6 +1,19 @@
+import os
+import threading
+import time
 from math import radians, sin, cos, sqrt, atan2
+import numpy as np
 
-# Daftar lokasi kantor dengan radius masing-masing
+from ..query.q_lokasi import get_grup_lokasi_karyawan, get_lokasi_absensi_aktif
+
+
+# === Konfigurasi Geofence === #
+GEOFENCE_TTL = int(os.getenv("GEOFENCE_TTL", "300"))  # detik, index lokasi dimuat ulang dari DB
+GEOFENCE_GRID_DEG = float(os.getenv("GEOFENCE_GRID_DEG", "0.01"))  # ukuran sel grid (~1.1 km)
+GEOFENCE_GRUP_DEFAULT = os.getenv("GEOFENCE_GRUP_DEFAULT", "lapangan")
+
+# Daftar lokasi kantor dengan radius masing-masing.
+# Sumber utama sekarang tabel lokasi_absensi (sql/001_lokasi_absensi.sql), ini fallback jika DB tidak tersedia
 OFFICE_LOCATIONS = [
     {"name": "Kantor Perampuan", "lat": -8.639211414577346, "lon": 116.08763439302037, "radius": 50},
     {"name": "Gudang GM", "lat": -8.674594, "lon": 116.086204, "radius": 15},
@@ -28,18 +41,156 @@ def calculate_distance(lat1, lon1, lat2, lon2):
     R = 6371000  # Radius bumi dalam meter
     return R * c
 
-def get_valid_office_name(user_lat, user_lon, id_karyawan):
-    if id_karyawan not in (4, 5, 11, 40, 9, 21):  # selain 4 mirfat, 5 wiwin, 11 muliyadi, dan 40 nauval, 9 abdul, 21 nizar
-        for office in FIELD_LOCATIONS:
-            distance = calculate_distance(user_lat, user_lon, office["lat"], office["lon"])
-            allowed_radius = office.get("radius", 50)  # fallback default radius 50
-            if distance <= allowed_radius:
-                return office["name"]
-        return None  # Tidak ada lokasi yang cocok
+R_BUMI = 6371000  # meter
+M_PER_DERAJAT = 111320.0
+KARYAWAN_KANTOR = (4, 5, 11, 40, 9, 21)  # 4 mirfat, 5 wiwin, 11 muliyadi, 40 nauval, 9 abdul, 21 nizar
+_CHUNK = 4096  # baris per pass saat menghitung jarak ke semua lokasi
+
+_index = None
+_index_waktu = 0.0
+_index_lock = threading.Lock()
+
+
+def siapkan_lokasi(locations):
+    """Precompute radian, cos(lat) & radius semua lokasi ke array NumPy, plus grid spatial index"""
+    lat_deg = np.array([o["lat"] for o in locations], dtype=np.float64)
+    lon_deg = np.array([o["lon"] for o in locations], dtype=np.float64)
+    lokasi = {
+        'nama': [o["name"] for o in locations],
+        'lat': np.radians(lat_deg),
+        'lon': np.radians(lon_deg),
+        'cos_lat': np.cos(np.radians(lat_deg)),
+        'radius': np.array([o.get("radius", 50) for o in locations], dtype=np.float64),  # fallback default radius 50
+    }
+
+    # Setiap lokasi didaftarkan ke semua sel grid yang tersentuh radiusnya,
+    # sehingga satu titik cukup dicek ke lokasi di selnya sendiri
+    grid = {}
+    dlat = lokasi['radius'] / M_PER_DERAJAT
+    dlon = dlat / np.maximum(lokasi['cos_lat'], 1e-6)
+    for idx in range(len(locations)):
+        for i in range(_sel(lat_deg[idx] - dlat[idx]), _sel(lat_deg[idx] + dlat[idx]) + 1):
+            for j in range(_sel(lon_deg[idx] - dlon[idx]), _sel(lon_deg[idx] + dlon[idx]) + 1):
+                grid.setdefault((i, j), []).append(idx)
+    lokasi['grid'] = {sel: np.array(idx, dtype=np.intp) for sel, idx in grid.items()}
+    return lokasi
+
+def _sel(derajat):
+    return int(np.floor(derajat / GEOFENCE_GRID_DEG))
+
+def _bangun_index(locations, karyawan_grup):
+    grup = {}
+    for o in locations:
+        for nama_grup in o['grup']:
+            grup.setdefault(nama_grup, []).append(o)
+    return {
+        'semua': siapkan_lokasi(locations),
+        'grup': {nama_grup: siapkan_lokasi(items) for nama_grup, items in grup.items()},
+        'karyawan': karyawan_grup,
+    }
+
+def _index_konstanta():
+    kantor = {o["name"] for o in OFFICE_LOCATIONS}
+    lapangan = {o["name"] for o in FIELD_LOCATIONS}
+    locations = [
+        {**o, 'grup': [g for g, nama in (('kantor', kantor), ('lapangan', lapangan)) if o["name"] in nama]}
+        for o in OFFICE_LOCATIONS + [o for o in FIELD_LOCATIONS if o["name"] not in kantor]
+    ]
+    return _bangun_index(locations, {id_karyawan: 'kantor' for id_karyawan in KARYAWAN_KANTOR})
+
+def _muat_index():
+    locations = get_lokasi_absensi_aktif()
+    karyawan_grup = get_grup_lokasi_karyawan()
+    if not locations or karyawan_grup is None:
+        return None
+    return _bangun_index(locations, karyawan_grup)
+
+def _get_index():
+    global _index, _index_waktu
+    if _index is not None and time.monotonic() - _index_waktu < GEOFENCE_TTL:
+        return _index
+
+    # Hanya satu thread yang memuat ulang, thread lain tetap memakai index lama
+    if not _index_lock.acquire(blocking=_index is None):
+        return _index
+    try:
+        if _index is None or time.monotonic() - _index_waktu >= GEOFENCE_TTL:
+            index = _muat_index()
+            if index is None:
+                print("[WARN geofence] lokasi dari DB tidak tersedia, memakai lokasi bawaan")
+                index = _index or _index_konstanta()
+            _index, _index_waktu = index, time.monotonic()
+        return _index
+    finally:
+        _index_lock.release()
+
+def invalidate_geofence():
+    """Paksa muat ulang lokasi dari DB pada pengecekan berikutnya"""
+    global _index_waktu
+    _index_waktu = float('-inf')
+
+def get_lokasi_karyawan(id_karyawan):
+    index = _get_index()
+    grup = index['karyawan'].get(id_karyawan, GEOFENCE_GRUP_DEFAULT)
+    return index['grup'].get(grup) or siapkan_lokasi([])
+
+def jarak_ke_lokasi(lokasi, latitudes, longitudes, kandidat=None):
+    """Haversine M titik ke N lokasi (atau subset kandidat) dalam satu pass -> matriks jarak M x N (meter)"""
+    lat = np.radians(np.asarray(latitudes, dtype=np.float64)).reshape(-1, 1)
+    lon = np.radians(np.asarray(longitudes, dtype=np.float64)).reshape(-1, 1)
+    site_lat, site_lon, cos_lat = lokasi['lat'], lokasi['lon'], lokasi['cos_lat']
+    if kandidat is not None:
+        site_lat, site_lon, cos_lat = site_lat[kandidat], site_lon[kandidat], cos_lat[kandidat]
+    a = np.sin((site_lat - lat) / 2) ** 2 + np.cos(lat) * cos_lat * np.sin((site_lon - lon) / 2) ** 2
+    return 2 * R_BUMI * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+def cek_lokasi_batch(latitudes, longitudes, lokasi=None):
+    """
+    Cek banyak titik sekaligus (mis. validasi ulang data lokasi lama). lokasi default = semua lokasi aktif.
+    Return list (nama lokasi pertama sesuai urutan daftar yang radiusnya memuat titik, jarak meter) seperti
+    loop lama, walau radius lokasi bertumpuk; jika tidak ada yang cocok: (None, jarak ke lokasi terdekat).
+    """
+    lokasi = _get_index()['semua'] if lokasi is None else lokasi
+    lat = np.asarray(latitudes, dtype=np.float64).reshape(-1)
+    lon = np.asarray(longitudes, dtype=np.float64).reshape(-1)
+    nama = [None] * len(lat)
+    jarak = np.full(len(lat), np.nan)
+    if not lokasi['nama'] or not len(lat):
+        return [(None, None)] * len(lat)
+
+    # Kelompokkan titik per sel grid, lalu hitung hanya ke lokasi kandidat di sel tersebut
+    sel = np.stack([np.floor(lat / GEOFENCE_GRID_DEG), np.floor(lon / GEOFENCE_GRID_DEG)], axis=1).astype(np.int64)
+    if len(lat) == 1:
+        kelompok = [(sel[0], np.zeros(1, dtype=np.intp))]  # jalur check-in: satu titik
     else:
-        for office in OFFICE_LOCATIONS:
-            distance = calculate_distance(user_lat, user_lon, office["lat"], office["lon"])
-            allowed_radius = office.get("radius", 50)  # fallback default radius 50
-            if distance <= allowed_radius:
-                return office["name"]
-        return None  # Tidak ada lokasi yang cocok
+        sel_unik, inverse, jumlah = np.unique(sel, axis=0, return_inverse=True, return_counts=True)
+        urutan = np.argsort(inverse.reshape(-1), kind='stable')
+        kelompok = zip(sel_unik, np.split(urutan, np.cumsum(jumlah)[:-1]))
+    for (i, j), baris in kelompok:
+        kandidat = lokasi['grid'].get((int(i), int(j)))
+        if kandidat is None:
+            continue
+        d = jarak_ke_lokasi(lokasi, lat[baris], lon[baris], kandidat)
+        di_dalam = d <= lokasi['radius'][kandidat]
+        # kandidat urut indeks lokasi -> True pertama = lokasi pertama di daftar
+        pertama = di_dalam.argmax(axis=1)
+        semua_baris = np.arange(len(baris))
+        for b, k, d_k, cocok in zip(baris, pertama, d[semua_baris, pertama], di_dalam[semua_baris, pertama]):
+            if cocok:
+                nama[b], jarak[b] = lokasi['nama'][kandidat[k]], d_k
+
+    # Titik di luar semua radius: jarak ke lokasi terdekat (full pass, per chunk)
+    luar = np.nonzero(np.isnan(jarak))[0]
+    for mulai in range(0, len(luar), _CHUNK):
+        baris = luar[mulai:mulai + _CHUNK]
+        jarak[baris] = jarak_ke_lokasi(lokasi, lat[baris], lon[baris]).min(axis=1)
+
+    return [(n, float(d)) for n, d in zip(nama, jarak)]
+
+def cek_lokasi(user_lat, user_lon, id_karyawan):
+    """(nama lokasi, jarak meter) untuk satu titik sesuai grup lokasi karyawan"""
+    return cek_lokasi_batch([user_lat], [user_lon], get_lokasi_karyawan(id_karyawan))[0]
+
+def get_valid_office_name(user_lat, user_lon, id_karyawan):
+    nama, _ = cek_lokasi(user_lat, user_lon, id_karyawan)
+    return nama  # None jika tidak ada lokasi yang cocok
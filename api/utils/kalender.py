@@ -0,0 +1,129 @@
+import os
+import threading
+import time
+from calendar import monthrange
+from datetime import date, datetime, timedelta
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+from .cache import get_generasi, naikkan_generasi, ttl_generasi
+from .config import get_connection
+
+
+# === Konfigurasi Kalender === #
+# detik, libur nasional per tahun dimuat ulang dari DB (dibatasi CACHE_TTL_PER_PROSES jika cache per proses)
+KALENDER_TTL = ttl_generasi(int(os.getenv("KALENDER_TTL", "3600")))
+KALENDER_RETRY = int(os.getenv("KALENDER_RETRY", "30"))  # detik, hasil cadangan saat DB error sebelum dicoba lagi
+
+# tahun -> {'libur_nasional': set tanggal, 'libur': bitmap hari libur (minggu + nasional),
+#           'prefix': prefix sum hari kerja, 'kadaluarsa': waktu dimuat ulang, 'generasi': generasi 'libur'}
+_tahun = {}
+_lock = threading.Lock()
+
+
+def _ambil_libur_nasional(tahun):
+    engine = get_connection()
+    with engine.connect() as connection:
+        result = connection.execute(text("""
+            SELECT tanggal FROM liburnasional
+            WHERE status = 1 AND tanggal BETWEEN :start AND :end
+        """), {'start': date(tahun, 1, 1), 'end': date(tahun, 12, 31)}).fetchall()
+        return {row[0] for row in result}
+
+def _bangun_tahun(tahun, libur_nasional):
+    awal = date(tahun, 1, 1)
+    jumlah_hari = (date(tahun + 1, 1, 1) - awal).days
+
+    # Bitmap libur: index = hari ke-n dalam tahun (0 = 1 Januari)
+    libur = np.zeros(jumlah_hari, dtype=bool)
+    libur[(6 - awal.weekday()) % 7::7] = True  # semua hari Minggu
+    for tanggal in libur_nasional:
+        libur[(tanggal - awal).days] = True
+
+    # prefix[i] = jumlah hari kerja pada [1 Jan, hari ke-i)
+    prefix = np.zeros(jumlah_hari + 1, dtype=np.int32)
+    np.cumsum(~libur, out=prefix[1:])
+    return {'libur_nasional': frozenset(libur_nasional), 'libur': libur, 'prefix': prefix}
+
+def _masih_berlaku(data, generasi):
+    return data is not None and data['generasi'] == generasi and time.monotonic() < data['kadaluarsa']
+
+def _get_tahun(tahun):
+    # Generasi dibaca sebelum memuat: invalidate di tengah jalan -> dimuat ulang di pemanggilan berikutnya
+    generasi = get_generasi('libur')
+    data = _tahun.get(tahun)
+    if _masih_berlaku(data, generasi):
+        return data
+
+    with _lock:
+        data = _tahun.get(tahun)
+        if _masih_berlaku(data, generasi):
+            return data
+        try:
+            data = {**_bangun_tahun(tahun, _ambil_libur_nasional(tahun)), 'kadaluarsa': time.monotonic() + KALENDER_TTL}
+        except SQLAlchemyError as e:
+            print(f"Error occurred: {str(e)}")
+            # Pakai data lama (atau hanya hari Minggu), DB dicoba lagi setelah KALENDER_RETRY
+            data = {**(data or _bangun_tahun(tahun, set())), 'kadaluarsa': time.monotonic() + KALENDER_RETRY}
+        data['generasi'] = generasi
+        _tahun[tahun] = data
+        return data
+
+def _ke_date(tanggal):
+    if isinstance(tanggal, datetime):
+        return tanggal.date()
+    if isinstance(tanggal, str):
+        return datetime.strptime(tanggal, "%Y-%m-%d").date()
+    return tanggal
+
+def invalidate_kalender():
+    """
+    Panggil setelah tabel liburnasional berubah. Proses lain memuat ulang saat generasi 'libur' naik
+    (CACHE_BACKEND=sqlite) atau setelah KALENDER_TTL
+    """
+    with _lock:
+        _tahun.clear()
+    naikkan_generasi('libur')
+
+def is_hari_libur(tanggal):
+    """True jika hari Minggu atau libur nasional (status = 1)"""
+    tanggal = _ke_date(tanggal)
+    return bool(_get_tahun(tanggal.year)['libur'][tanggal.timetuple().tm_yday - 1])
+
+def is_libur_nasional(tanggal):
+    tanggal = _ke_date(tanggal)
+    return tanggal in _get_tahun(tanggal.year)['libur_nasional']
+
+def get_libur_nasional(start_date, end_date):
+    """Set tanggal libur nasional (status = 1) pada rentang [start_date, end_date]"""
+    start_date, end_date = _ke_date(start_date), _ke_date(end_date)
+    hasil = set()
+    for tahun in range(start_date.year, end_date.year + 1):
+        hasil.update(t for t in _get_tahun(tahun)['libur_nasional'] if start_date <= t <= end_date)
+    return hasil
+
+def hitung_hari_kerja(start_date, end_date):
+    """Jumlah hari kerja (bukan Minggu & bukan libur nasional) pada [start_date, end_date], 0 jika start > end"""
+    start_date, end_date = _ke_date(start_date), _ke_date(end_date)
+    if start_date > end_date:
+        return 0
+
+    total = 0
+    for tahun in range(start_date.year, end_date.year + 1):
+        prefix = _get_tahun(tahun)['prefix']
+        awal = start_date.timetuple().tm_yday - 1 if tahun == start_date.year else 0
+        akhir = end_date.timetuple().tm_yday if tahun == end_date.year else len(prefix) - 1
+        total += int(prefix[akhir] - prefix[awal])
+    return total
+
+def hitung_hari_minggu(start_date, end_date):
+    """Jumlah hari Minggu pada [start_date, end_date]"""
+    start_date, end_date = _ke_date(start_date), _ke_date(end_date)
+    minggu_pertama = start_date + timedelta(days=(6 - start_date.weekday()) % 7)
+    if minggu_pertama > end_date:
+        return 0
+    return (end_date - minggu_pertama).days // 7 + 1
+
+def get_hari_kerja_bulan(bulan, tahun):
+    return hitung_hari_kerja(date(tahun, bulan, 1), date(tahun, bulan, monthrange(tahun, bulan)[1]))
@@ -0,0 +1,151 @@
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+
+# === Konfigurasi Metrics === #
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")  # kosong = /metrics tanpa autentikasi
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Metrics disimpan per proses (per worker gunicorn), format teks Prometheus
+_registry = []
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(labelnames, values, extra=()):
+    pasangan = list(zip(labelnames, values)) + list(extra)
+    if not pasangan:
+        return ""
+    return "{" + ",".join(f'{nama}="{_escape(nilai)}"' for nama, nilai in pasangan) + "}"
+
+def _format_angka(value):
+    if value == float('inf'):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    tipe = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels):
+        return tuple(str(labels.get(nama, "")) for nama in self.labelnames)
+
+    def _samples(self):
+        with self._lock:
+            return [(self.name, key, (), value) for key, value in self._values.items()]
+
+    def render(self):
+        baris = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.tipe}"]
+        for nama, key, extra, value in self._samples():
+            baris.append(f"{nama}{_format_labels(self.labelnames, key, extra)} {_format_angka(value)}")
+        return "\n".join(baris)
+
+
+class Counter(_Metric):
+    tipe = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    tipe = "gauge"
+
+    def __init__(self, name, documentation, labelnames=(), fungsi=None):
+        # fungsi: callable -> {tuple label: nilai}, dibaca saat /metrics di-scrape
+        super().__init__(name, documentation, labelnames)
+        self.fungsi = fungsi
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def _samples(self):
+        if self.fungsi is None:
+            return super()._samples()
+        return [(self.name, tuple(map(str, key)), (), value) for key, value in self.fungsi().items()]
+
+
+class Histogram(_Metric):
+    tipe = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            data = self._values.get(key)
+            if data is None:
+                data = self._values[key] = {'bucket': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            data['bucket'][bisect_left(self.buckets, value)] += 1
+            data['sum'] += value
+            data['count'] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        mulai = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - mulai, **labels)
+
+    def _samples(self):
+        samples = []
+        with self._lock:
+            for key, data in self._values.items():
+                kumulatif = 0
+                for batas, jumlah in zip(self.buckets, data['bucket']):
+                    kumulatif += jumlah
+                    samples.append((f"{self.name}_bucket", key, (('le', _format_angka(batas)),), kumulatif))
+                samples.append((f"{self.name}_sum", key, (), data['sum']))
+                samples.append((f"{self.name}_count", key, (), data['count']))
+        return samples
+
+
+def render_metrics():
+    return "\n".join(metric.render() for metric in _registry) + "\n"
+
+
+# === Metrics Aplikasi === #
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "Latency request HTTP",
+    ("method", "namespace", "route", "status")
+)
+REQUEST_IN_FLIGHT = Gauge("http_requests_in_flight", "Request yang sedang diproses")
+DB_POOL_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds", "Waktu menunggu koneksi dari pool DB",
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0)
+)
+DB_POOL_TIMEOUTS = Counter("db_pool_timeouts_total", "Checkout koneksi yang gagal karena pool_timeout")
+DB_POOL_CONNECTIONS = Gauge("db_pool_connections", "Jumlah koneksi pool DB per state", ("engine", "state"))
+DB_CONNECTION_AGE = Histogram(
+    "db_connection_age_seconds", "Umur koneksi DB saat di-checkout dari pool",
+    buckets=(1, 10, 60, 300, 600, 1200, 1800, 3600)
+)
+FACE_VERIFICATION = Histogram(
+    "face_verification_duration_seconds", "Durasi verifikasi wajah (termasuk antrian)", ("hasil",)
+)
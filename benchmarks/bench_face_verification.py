@@ -0,0 +1,146 @@
+"""
+Benchmark latency & akurasi verifikasi_wajah terhadap foto di cropped_faces/.
+
+Setiap foto referensi dibuat beberapa varian sintetis (resize, rotasi, kompresi ulang)
+lalu diverifikasi ke pemiliknya (genuine) dan ke karyawan lain (impostor) untuk setiap
+kombinasi max_side x tolerance. Tiap setting dijalankan di proses terpisah agar peak RSS
+tidak tercampur.
+
+Contoh:
+    python benchmarks/bench_face_verification.py
+    python benchmarks/bench_face_verification.py --max-side 0 640 --tolerance 0.5 0.6 --limit 10 --json hasil.json
+"""
+import argparse
+import glob
+import io
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import time
+
+import numpy as np
+from PIL import Image
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("FACE_REFERENCE_DIR", os.path.join(ROOT, "cropped_faces"))
+os.environ.setdefault("FACE_ENCODING_DIR", os.path.join(ROOT, "face_encodings"))
+
+
+def _jpeg(img, quality=90, exif=None):
+    buf = io.BytesIO()
+    if exif is not None:
+        img.save(buf, format='JPEG', quality=quality, exif=exif)
+    else:
+        img.save(buf, format='JPEG', quality=quality)
+    return buf.getvalue()
+
+def buat_varian(path):
+    """Varian sintetis dari satu foto referensi, hasil berupa bytes JPEG"""
+    with open(path, 'rb') as f:
+        asli = f.read()
+    img = Image.open(io.BytesIO(asli)).convert('RGB')
+    w, h = img.size
+
+    # Foto HP: resolusi besar & orientasi disimpan di EXIF (bukan di pixel)
+    exif = Image.Exif()
+    exif[0x0112] = 6  # Orientation: rotate 90 CW saat ditampilkan
+    rotasi_exif = _jpeg(img.rotate(90, expand=True), exif=exif.tobytes())
+
+    return {
+        'asli': asli,
+        'besar_x4': _jpeg(img.resize((w * 4, h * 4), Image.LANCZOS)),
+        'kecil_x0.5': _jpeg(img.resize((max(w // 2, 1), max(h // 2, 1)), Image.LANCZOS)),
+        'rotasi_exif_90': rotasi_exif,
+        'miring_10': _jpeg(img.rotate(10, resample=Image.BICUBIC, expand=True)),
+        'jpeg_q30': _jpeg(img, quality=30),
+    }
+
+def _jalankan_setting(ids, varian, max_side, tolerance, queue):
+    from api.utils.face_detection import verifikasi_wajah
+    from api.utils.face_store import get_encoding_referensi
+
+    # Warm-up: load model dlib & encoding referensi di luar pengukuran
+    for id_karyawan in ids:
+        get_encoding_referensi(id_karyawan)
+    verifikasi_wajah(ids[0], io.BytesIO(varian[ids[0]]['asli']), max_side=max_side, tolerance=tolerance)
+
+    hasil = {}
+    for i, id_karyawan in enumerate(ids):
+        id_lain = ids[(i + 1) % len(ids)]
+        for nama, data in varian[id_karyawan].items():
+            stat = hasil.setdefault(nama, {'latency': [], 'genuine': [], 'impostor': [], 'not_detected': 0, 'error': 0})
+            for target, jenis in ((id_karyawan, 'genuine'), (id_lain, 'impostor')):
+                if jenis == 'impostor' and id_lain == id_karyawan:
+                    continue
+                mulai = time.perf_counter()
+                r = verifikasi_wajah(target, io.BytesIO(data), max_side=max_side, tolerance=tolerance)
+                stat['latency'].append((time.perf_counter() - mulai) * 1000)
+                if r == "not_detected":
+                    stat['not_detected'] += 1
+                elif r == "error":
+                    stat['error'] += 1
+                stat[jenis].append(not isinstance(r, str) and bool(r))
+
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # Linux: KB
+    queue.put((hasil, peak_rss_mb))
+
+def ringkas(hasil):
+    baris = []
+    for nama, stat in hasil.items():
+        lat = np.array(stat['latency'])
+        baris.append({
+            'varian': nama,
+            'n': len(lat),
+            'p50_ms': round(float(np.percentile(lat, 50)), 1),
+            'p95_ms': round(float(np.percentile(lat, 95)), 1),
+            'p99_ms': round(float(np.percentile(lat, 99)), 1),
+            'true_match_rate': round(float(np.mean(stat['genuine'])), 3) if stat['genuine'] else None,
+            'false_match_rate': round(float(np.mean(stat['impostor'])), 3) if stat['impostor'] else None,
+            'not_detected': stat['not_detected'],
+            'error': stat['error'],
+        })
+    return baris
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark verifikasi wajah")
+    parser.add_argument('--max-side', type=int, nargs='+', default=[0, 480, 640, 960], help='0 = tanpa downscale')
+    parser.add_argument('--tolerance', type=float, nargs='+', default=[0.5, 0.6])
+    parser.add_argument('--limit', type=int, default=0, help='Batasi jumlah foto referensi')
+    parser.add_argument('--json', help='Simpan hasil lengkap ke file JSON')
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(os.path.join(os.environ["FACE_REFERENCE_DIR"], "*.jpg")))
+    if args.limit:
+        paths = paths[:args.limit]
+    ids = [os.path.splitext(os.path.basename(p))[0] for p in paths]
+    if len(ids) < 2:
+        sys.exit("Minimal butuh 2 foto referensi")
+    varian = {id_karyawan: buat_varian(p) for id_karyawan, p in zip(ids, paths)}
+
+    ctx = multiprocessing.get_context('spawn')
+    laporan = []
+    for max_side in args.max_side:
+        for tolerance in args.tolerance:
+            queue = ctx.Queue()
+            proc = ctx.Process(target=_jalankan_setting, args=(ids, varian, max_side, tolerance, queue))
+            proc.start()
+            hasil, peak_rss_mb = queue.get()
+            proc.join()
+
+            print(f"\n== max_side={max_side or 'asli'} tolerance={tolerance} peak_rss={peak_rss_mb:.0f} MB ==")
+            print(f"{'varian':<16}{'n':>5}{'p50':>9}{'p95':>9}{'p99':>9}{'TMR':>8}{'FMR':>8}{'no_face':>9}{'error':>7}")
+            for b in ringkas(hasil):
+                print(f"{b['varian']:<16}{b['n']:>5}{b['p50_ms']:>9}{b['p95_ms']:>9}{b['p99_ms']:>9}"
+                      f"{str(b['true_match_rate']):>8}{str(b['false_match_rate']):>8}{b['not_detected']:>9}{b['error']:>7}")
+                laporan.append({'max_side': max_side, 'tolerance': tolerance, 'peak_rss_mb': round(peak_rss_mb, 1), **b})
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(laporan, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Laporan waktu start & memori worker API (cold start `import api`).
+
+Mengukur waktu import app, peak RSS, apakah dlib/face_recognition ikut ter-load,
+biaya load model wajah yang sekarang ditunda ke verifikasi pertama, dan modul
+paling lambat dari `python -X importtime`.
+
+Contoh:
+    python benchmarks/bench_startup.py --runs 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_PROBE = """
+import json, resource, sys, time
+mulai = time.perf_counter()
+import api
+hasil = {
+    'import_s': time.perf_counter() - mulai,
+    'rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    'face_loaded': 'face_recognition' in sys.modules or 'dlib' in sys.modules,
+}
+if %(load_face)s:
+    mulai = time.perf_counter()
+    try:
+        from api.utils.face_detection import warmup
+        warmup()
+        hasil['face_load_s'] = time.perf_counter() - mulai
+        hasil['rss_face_mb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    except ImportError as e:
+        hasil['face_error'] = str(e)
+print(json.dumps(hasil))
+"""
+
+
+def _probe(load_face, extra_env=None):
+    env = {**os.environ, **(extra_env or {})}
+    out = subprocess.run(
+        [sys.executable, "-c", _PROBE % {'load_face': load_face}],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def _importtime_teratas(n=10):
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import api"],
+        cwd=ROOT, capture_output=True, text=True
+    )
+    baris = []
+    for line in out.stderr.splitlines():
+        # format: "import time: self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, modul = line.split("|")
+        baris.append((int(cumulative.strip()), modul.rstrip()))
+    return sorted(baris, reverse=True)[:n]
+
+def main():
+    parser = argparse.ArgumentParser(description="Laporan cold start API")
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    runs = [_probe(False) for _ in range(args.runs)]
+    print("== Cold start `import api` ==")
+    print(f"waktu import (median {args.runs}x) : {statistics.median(r['import_s'] for r in runs) * 1000:.0f} ms")
+    print(f"peak RSS                    : {max(r['rss_mb'] for r in runs):.0f} MB")
+    print(f"face_recognition/dlib loaded: {any(r['face_loaded'] for r in runs)}")
+
+    face = _probe(True)
+    print("\n== Biaya load model wajah (ditunda ke verifikasi pertama / FACE_WARMUP=1) ==")
+    if 'face_error' in face:
+        print(f"face_recognition tidak tersedia: {face['face_error']}")
+    else:
+        print(f"waktu load model : {face['face_load_s'] * 1000:.0f} ms")
+        print(f"peak RSS + model : {face['rss_face_mb']:.0f} MB (+{face['rss_face_mb'] - face['rss_mb']:.0f} MB)")
+
+    print("\n== 10 import paling lambat (kumulatif) ==")
+    for cumulative, modul in _importtime_teratas():
+        print(f"{cumulative / 1000:>9.1f} ms  {modul}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+-- Lokasi geofence absensi & pembagian grup lokasi per karyawan
+-- (sebelumnya hardcode di api/utils/filter_radius.py)
+
+CREATE TABLE IF NOT EXISTS lokasi_absensi (
+    id_lokasi SERIAL PRIMARY KEY,
+    nama VARCHAR(100) NOT NULL,
+    latitude DOUBLE PRECISION NOT NULL,
+    longitude DOUBLE PRECISION NOT NULL,
+    radius INTEGER NOT NULL DEFAULT 50,  -- meter
+    status SMALLINT NOT NULL DEFAULT 1,
+    created_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    updated_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+-- Satu lokasi bisa masuk beberapa grup (mis. 'kantor' & 'lapangan')
+CREATE TABLE IF NOT EXISTS lokasi_grup (
+    grup VARCHAR(50) NOT NULL,
+    id_lokasi INTEGER NOT NULL REFERENCES lokasi_absensi (id_lokasi) ON DELETE CASCADE,
+    PRIMARY KEY (grup, id_lokasi)
+);
+
+-- Karyawan tanpa baris di sini memakai grup default (GEOFENCE_GRUP_DEFAULT, 'lapangan')
+CREATE TABLE IF NOT EXISTS karyawan_lokasi (
+    id_karyawan INTEGER PRIMARY KEY REFERENCES karyawan (id_karyawan) ON DELETE CASCADE,
+    grup VARCHAR(50) NOT NULL,
+    updated_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+-- === Seed dari konstanta lama === --
+INSERT INTO lokasi_absensi (nama, latitude, longitude, radius)
+SELECT v.nama, v.latitude, v.longitude, v.radius
+FROM (VALUES
+    ('Kantor Perampuan', -8.639211414577346, 116.08763439302037, 50),
+    ('Gudang GM', -8.674594, 116.086204, 15),
+    ('PLTG Jeranjang', -8.659610, 116.074014, 100),
+    ('UPK Ampenan', -8.599413, 116.074805, 100),
+    ('Lombok Peaker', -8.589523, 116.075144, 100)
+) AS v (nama, latitude, longitude, radius)
+WHERE NOT EXISTS (SELECT 1 FROM lokasi_absensi l WHERE l.nama = v.nama);
+
+INSERT INTO lokasi_grup (grup, id_lokasi)
+SELECT 'kantor', id_lokasi FROM lokasi_absensi
+WHERE nama IN ('Kantor Perampuan', 'Gudang GM', 'PLTG Jeranjang', 'UPK Ampenan', 'Lombok Peaker')
+ON CONFLICT DO NOTHING;
+
+INSERT INTO lokasi_grup (grup, id_lokasi)
+SELECT 'lapangan', id_lokasi FROM lokasi_absensi
+WHERE nama IN ('Gudang GM', 'PLTG Jeranjang', 'UPK Ampenan', 'Lombok Peaker')
+ON CONFLICT DO NOTHING;
+
+INSERT INTO karyawan_lokasi (id_karyawan, grup)
+SELECT k.id_karyawan, 'kantor' FROM karyawan k
+WHERE k.id_karyawan IN (4, 5, 11, 40, 9, 21)
+ON CONFLICT (id_karyawan) DO NOTHING;
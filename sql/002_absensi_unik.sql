@@ -0,0 +1,21 @@
+-- Satu baris absensi aktif (status = 1) per karyawan per tanggal.
+-- Retry check-in dari aplikasi mobile sebelumnya bisa membuat baris duplikat;
+-- dengan index ini INSERT ... ON CONFLICT di add_checkin menjadi idempoten.
+
+-- === Bersihkan duplikat lama === --
+-- Simpan baris paling awal (id_absensi terkecil), sisanya di-soft delete seperti remove_absensi
+UPDATE absensi a
+SET status = 0, updated_at = NOW()
+WHERE a.status = 1
+  AND EXISTS (
+      SELECT 1 FROM absensi b
+      WHERE b.id_karyawan = a.id_karyawan
+        AND b.tanggal = a.tanggal
+        AND b.status = 1
+        AND b.id_absensi < a.id_absensi
+  );
+
+-- === Unique index === --
+CREATE UNIQUE INDEX IF NOT EXISTS absensi_karyawan_tanggal_aktif_uq
+    ON absensi (id_karyawan, tanggal)
+    WHERE status = 1;
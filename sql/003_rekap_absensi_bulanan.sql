@@ -0,0 +1,33 @@
+-- Ringkasan absensi per karyawan per bulan untuk endpoint rekap & gaji.
+-- Aturan hitung sama dengan rekap lama: hanya absensi status = 1, bukan hari Minggu,
+-- bukan libur nasional (status = 1). Dipelihara oleh fungsi tulis absensi/izin
+-- (lihat api/query/q_rekap_bulanan.py), dibangun ulang dengan `flask backfill-rekap`.
+
+CREATE TABLE IF NOT EXISTS rekap_absensi_bulanan (
+    id_karyawan INTEGER NOT NULL REFERENCES karyawan (id_karyawan) ON DELETE CASCADE,
+    bulan DATE NOT NULL,  -- tanggal 1 pada bulan tsb
+    jumlah_hadir INTEGER NOT NULL DEFAULT 0,
+    jumlah_alpha INTEGER NOT NULL DEFAULT 0,
+    jumlah_setengah_hari INTEGER NOT NULL DEFAULT 0,
+    jumlah_izin INTEGER NOT NULL DEFAULT 0,
+    jumlah_izin_cuti INTEGER NOT NULL DEFAULT 0,
+    jumlah_sakit INTEGER NOT NULL DEFAULT 0,
+    dinas_luar INTEGER NOT NULL DEFAULT 0,
+    -- NULL jika semua baris NULL (sama dengan SUM di rekap lama)
+    total_jam_terlambat INTEGER,
+    total_jam_kurang INTEGER,
+    total_jam_kerja INTEGER,
+    tanggal_terakhir DATE NOT NULL,  -- tanggal absensi terakhir yang ikut dihitung
+    updated_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (id_karyawan, bulan)
+);
+
+CREATE INDEX IF NOT EXISTS rekap_absensi_bulanan_bulan_idx ON rekap_absensi_bulanan (bulan);
+
+-- Ringkasan valid untuk semua bulan >= mulai (di-set oleh backfill).
+-- Sebelum backfill pertama, rekap tetap dihitung dari tabel absensi.
+CREATE TABLE IF NOT EXISTS rekap_absensi_status (
+    id SMALLINT PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+    mulai DATE NOT NULL,
+    dibangun_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
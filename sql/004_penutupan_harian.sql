@@ -0,0 +1,14 @@
+-- Penutupan harian: setelah hari kerja selesai, karyawan aktif tanpa absensi dicatat
+-- sebagai baris absensi 'Tidak Hadir' (lihat `flask tutup-hari`). Tanggal yang sudah
+-- ditutup dibaca langsung dari absensi tanpa anti-join ke tabel karyawan.
+
+CREATE TABLE IF NOT EXISTS penutupan_harian (
+    tanggal DATE PRIMARY KEY,
+    jumlah_tidak_hadir INTEGER NOT NULL DEFAULT 0,
+    ditutup_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+-- Baca absensi per tanggal + status (daftar tidak hadir / izin per hari)
+CREATE INDEX IF NOT EXISTS absensi_tanggal_status_idx
+    ON absensi (tanggal, id_status)
+    WHERE status = 1;
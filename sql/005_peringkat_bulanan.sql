@@ -0,0 +1,13 @@
+-- Peringkat (leaderboard) month-to-date yang sudah dihitung, satu baris per jenis & bulan.
+-- Diisi oleh `flask refresh-peringkat` (jadwalkan tiap beberapa menit) dan dihitung ulang
+-- saat dibaca jika absensi bulan tsb / data karyawan berubah (versi) atau umurnya > PERINGKAT_MAX_UMUR.
+
+CREATE TABLE IF NOT EXISTS peringkat_bulanan (
+    jenis VARCHAR(32) NOT NULL,          -- 'kerajinan' | 'kurang_disiplin'
+    bulan DATE NOT NULL,                 -- tanggal 1
+    sampai DATE NOT NULL,                -- akhir periode yang dihitung (hari ini untuk bulan berjalan)
+    versi TEXT,                          -- versi absensi bulan & karyawan dari DB saat dihitung (q_peringkat._versi_bulan)
+    data JSON NOT NULL,                  -- urutan peringkat, format sama dengan respons /peringkat
+    as_of TIMESTAMP NOT NULL,            -- WITA
+    PRIMARY KEY (jenis, bulan)
+);
@@ -0,0 +1,6 @@
+import os
+import sys
+
+# Sama seperti benchmarks/: package `api` diimpor dari root repo
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
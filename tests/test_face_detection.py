@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from api.utils.face_detection import cocokkan_wajah
+
+
+def _referensi():
+    rng = np.random.default_rng(7)
+    return rng.normal(size=(3, 128)) * 0.1
+
+def test_jarak_terbaik_dari_semua_referensi():
+    known = _referensi()
+    unknown = known[2] + 0.001
+
+    cocok, jarak, _ = cocokkan_wajah(known, unknown, tolerance=0.5)
+
+    assert cocok
+    assert jarak == pytest.approx(np.linalg.norm(known - unknown, axis=1).min())
+    assert jarak == pytest.approx(np.linalg.norm(known[2] - unknown))
+
+def test_di_luar_tolerance_tidak_cocok():
+    known = np.zeros((2, 128))
+    unknown = np.full(128, 0.2)  # jarak ~2.26 > 2 * tolerance
+
+    cocok, jarak, confidence = cocokkan_wajah(known, unknown, tolerance=0.6)
+
+    assert not cocok
+    assert jarak == pytest.approx(np.sqrt(128) * 0.2)
+    assert confidence == 0.0
+
+def test_confidence_setengah_tepat_di_batas():
+    known = np.zeros((1, 128))
+    unknown = np.zeros(128)
+    unknown[0] = 0.4
+
+    cocok, jarak, confidence = cocokkan_wajah(known, unknown, tolerance=0.4)
+
+    assert cocok  # batas inklusif
+    assert confidence == pytest.approx(0.5)
+
+def test_wajah_identik_confidence_penuh():
+    known = _referensi()
+
+    cocok, jarak, confidence = cocokkan_wajah(known, known[0].copy(), tolerance=0.6)
+
+    assert cocok
+    assert jarak == 0.0
+    assert confidence == 1.0
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from api.utils.filter_radius import OFFICE_LOCATIONS, calculate_distance, cek_lokasi_batch, siapkan_lokasi
+
+
+def _cek_loop(lat, lon, locations):
+    """Perilaku loop lama: lokasi pertama di daftar yang radiusnya memuat titik"""
+    jarak = [calculate_distance(lat, lon, o["lat"], o["lon"]) for o in locations]
+    for o, d in zip(locations, jarak):
+        if d <= o["radius"]:
+            return o["name"], d
+    return None, min(jarak)
+
+def test_radius_bertumpuk_lokasi_pertama_menang():
+    locations = [
+        {"name": "A", "lat": 0.0, "lon": 0.0, "radius": 100},
+        {"name": "B", "lat": 0.0, "lon": 0.0005, "radius": 100},
+    ]
+
+    (nama, jarak), = cek_lokasi_batch([0.0], [0.0004], siapkan_lokasi(locations))
+
+    assert nama == "A"  # B lebih dekat, tapi A lebih dulu di daftar
+    assert jarak == pytest.approx(calculate_distance(0.0, 0.0004, 0.0, 0.0))
+
+def test_di_luar_radius_jarak_ke_lokasi_terdekat():
+    locations = [
+        {"name": "A", "lat": 0.0, "lon": 0.0, "radius": 10},
+        {"name": "B", "lat": 0.0, "lon": 0.01, "radius": 10},
+    ]
+
+    (nama, jarak), = cek_lokasi_batch([0.0], [0.008], siapkan_lokasi(locations))
+
+    assert nama is None
+    assert jarak == pytest.approx(calculate_distance(0.0, 0.008, 0.0, 0.01))
+
+def test_batch_sama_dengan_loop_dan_titik_tunggal():
+    lokasi = siapkan_lokasi(OFFICE_LOCATIONS)
+    rng = np.random.default_rng(10)
+    pusat = rng.integers(len(OFFICE_LOCATIONS), size=2000)
+    lat = np.array([OFFICE_LOCATIONS[i]["lat"] for i in pusat]) + rng.normal(scale=0.001, size=len(pusat))
+    lon = np.array([OFFICE_LOCATIONS[i]["lon"] for i in pusat]) + rng.normal(scale=0.001, size=len(pusat))
+
+    hasil = cek_lokasi_batch(lat, lon, lokasi)
+
+    assert any(nama is not None for nama, _ in hasil) and any(nama is None for nama, _ in hasil)
+    for i, (nama, jarak) in enumerate(hasil):
+        nama_loop, jarak_loop = _cek_loop(lat[i], lon[i], OFFICE_LOCATIONS)
+        assert nama == nama_loop
+        assert jarak == pytest.approx(jarak_loop, abs=1e-6)
+    for i in range(0, len(pusat), 97):
+        assert cek_lokasi_batch([lat[i]], [lon[i]], lokasi)[0] == hasil[i]
+
+def test_tanpa_lokasi_atau_titik():
+    assert cek_lokasi_batch([1.0, 2.0], [1.0, 2.0], siapkan_lokasi([])) == [(None, None), (None, None)]
+    assert cek_lokasi_batch([], [], siapkan_lokasi(OFFICE_LOCATIONS)) == []
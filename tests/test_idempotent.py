@@ -0,0 +1,99 @@
+import io
+import threading
+import time
+
+import pytest
+from flask import Flask
+
+from api.utils import decorator
+from api.utils.cache import idempotensi_cache
+
+
+@pytest.fixture
+def app(monkeypatch):
+    monkeypatch.setattr(decorator, "get_jwt", lambda: {'sub': '7'})
+    idempotensi_cache.clear()
+    app = Flask(__name__)
+    app.dipanggil = []
+
+    @app.post('/check-in')
+    @decorator.idempotent
+    def check_in():
+        app.dipanggil.append(1)
+        return {'status': 'success', 'ke': len(app.dipanggil)}, 200
+
+    yield app
+    idempotensi_cache.clear()
+
+def _kirim(client, kunci, foto=b"jpeg", lat="-8.6", content_type=None):
+    data = {'latitude': lat, 'file': (io.BytesIO(foto), 'selfie.jpg')}
+    return client.post('/check-in', data=data, headers={'Idempotency-Key': kunci}, content_type=content_type)
+
+def test_retry_mendapat_hasil_awal(app):
+    client = app.test_client()
+
+    pertama = _kirim(client, "abc")
+    kedua = _kirim(client, "abc")
+
+    assert pertama.json == kedua.json == {'status': 'success', 'ke': 1}
+    assert kedua.headers['Idempotent-Replayed'] == 'true'
+    assert len(app.dipanggil) == 1
+
+def test_sidik_tidak_bergantung_boundary_multipart(app):
+    client = app.test_client()
+
+    _kirim(client, "abc", content_type="multipart/form-data; boundary=aaaa")
+    kedua = _kirim(client, "abc", content_type="multipart/form-data; boundary=bbbb")
+
+    assert kedua.status_code == 200
+    assert kedua.headers['Idempotent-Replayed'] == 'true'
+
+@pytest.mark.parametrize("ubah", [{'foto': b"jpeg lain"}, {'lat': "-8.7"}])
+def test_key_sama_isi_berbeda_422(app, ubah):
+    client = app.test_client()
+
+    _kirim(client, "abc")
+    kedua = _kirim(client, "abc", **ubah)
+
+    assert kedua.status_code == 422
+    assert len(app.dipanggil) == 1
+
+def test_tanpa_key_atau_key_berbeda_dijalankan_ulang(app):
+    client = app.test_client()
+
+    client.post('/check-in', data={'latitude': "-8.6"})
+    client.post('/check-in', data={'latitude': "-8.6"})
+    _kirim(client, "abc")
+    _kirim(client, "def")
+
+    assert len(app.dipanggil) == 4
+
+def test_request_awal_gagal_retry_yang_menunggu_menjalankan_handler(monkeypatch):
+    monkeypatch.setattr(decorator, "get_jwt", lambda: {'sub': '7'})
+    idempotensi_cache.clear()
+    app = Flask(__name__)
+    mulai, lanjut = threading.Event(), threading.Event()
+    status = iter([500, 200])
+
+    @app.post('/check-in')
+    @decorator.idempotent
+    def check_in():
+        kode = next(status)
+        if kode == 500:
+            mulai.set()
+            lanjut.wait(5)
+        return {'kode': kode}, kode
+
+    hasil = {}
+    awal = threading.Thread(target=lambda: hasil.setdefault('awal', _kirim(app.test_client(), "abc").status_code))
+    awal.start()
+    assert mulai.wait(5)
+    retry = threading.Thread(target=lambda: hasil.setdefault('retry', _kirim(app.test_client(), "abc").status_code))
+    retry.start()
+    time.sleep(0.2)  # retry sempat menunggu event request awal
+    lanjut.set()
+    awal.join(5)
+    retry.join(5)
+
+    assert hasil == {'awal': 500, 'retry': 200}
+    idempotensi_cache.clear()
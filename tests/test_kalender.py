@@ -0,0 +1,87 @@
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from api.utils import kalender
+
+
+# 17 Agustus 2025 jatuh di hari Minggu: tidak boleh dihitung dua kali
+LIBUR = {date(2025, 1, 1), date(2025, 3, 31), date(2025, 8, 17), date(2025, 12, 25), date(2026, 1, 1), date(2026, 8, 17)}
+
+
+@pytest.fixture(autouse=True)
+def libur_nasional(monkeypatch):
+    dimuat = []
+
+    def ambil(tahun):
+        dimuat.append(tahun)
+        return {t for t in LIBUR if t.year == tahun}
+
+    monkeypatch.setattr(kalender, "_tahun", {})
+    monkeypatch.setattr(kalender, "_ambil_libur_nasional", ambil)
+    return dimuat
+
+def _hari_kerja_loop(start_date, end_date):
+    total, tanggal = 0, start_date
+    while tanggal <= end_date:
+        total += tanggal.weekday() != 6 and tanggal not in LIBUR
+        tanggal += timedelta(days=1)
+    return total
+
+@pytest.mark.parametrize("start_date, end_date", [
+    (date(2025, 1, 1), date(2025, 1, 1)),
+    (date(2025, 1, 5), date(2025, 1, 5)),        # Minggu
+    (date(2025, 3, 1), date(2025, 3, 31)),
+    (date(2025, 8, 10), date(2025, 8, 23)),
+    (date(2025, 12, 20), date(2026, 1, 10)),     # lintas tahun
+    (date(2025, 1, 1), date(2026, 12, 31)),
+    (date(2025, 6, 2), date(2025, 6, 1)),        # start > end
+])
+def test_hitung_hari_kerja_sama_dengan_loop(start_date, end_date):
+    assert kalender.hitung_hari_kerja(start_date, end_date) == _hari_kerja_loop(start_date, end_date)
+
+def test_semua_rentang_di_bulan():
+    awal = date(2025, 8, 1)
+    for i in range(31):
+        for j in range(i, 31):
+            start_date, end_date = awal + timedelta(days=i), awal + timedelta(days=j)
+            assert kalender.hitung_hari_kerja(start_date, end_date) == _hari_kerja_loop(start_date, end_date)
+
+def test_hari_libur_dan_string():
+    assert kalender.is_hari_libur(date(2025, 3, 31))
+    assert kalender.is_hari_libur("2025-08-24")  # Minggu
+    assert not kalender.is_hari_libur("2025-08-18")
+    assert kalender.is_libur_nasional(date(2026, 1, 1))
+    assert kalender.get_hari_kerja_bulan(8, 2025) == _hari_kerja_loop(date(2025, 8, 1), date(2025, 8, 31))
+    assert kalender.get_libur_nasional("2025-08-01", "2026-01-31") == {date(2025, 8, 17), date(2025, 12, 25), date(2026, 1, 1)}
+
+def test_hitung_hari_minggu():
+    for i in range(14):
+        start_date = date(2025, 8, 1) + timedelta(days=i)
+        end_date = start_date + timedelta(days=40)
+        loop = sum((start_date + timedelta(days=n)).weekday() == 6 for n in range((end_date - start_date).days + 1))
+        assert kalender.hitung_hari_minggu(start_date, end_date) == loop
+
+def test_invalidate_memuat_ulang(libur_nasional):
+    kalender.is_hari_libur(date(2025, 3, 31))
+    kalender.is_hari_libur(date(2025, 8, 18))
+    assert libur_nasional == [2025]
+
+    kalender.invalidate_kalender()
+    kalender.is_hari_libur(date(2025, 3, 31))
+    assert libur_nasional == [2025, 2025]
+
+def test_db_error_cadangan_dicoba_lagi(monkeypatch, libur_nasional):
+    def gagal(tahun):
+        libur_nasional.append(tahun)
+        raise OperationalError("SELECT", {}, Exception("db down"))
+
+    monkeypatch.setattr(kalender, "_ambil_libur_nasional", gagal)
+    assert not kalender.is_hari_libur(date(2025, 3, 31))  # cadangan: hanya hari Minggu
+    assert kalender.is_hari_libur(date(2025, 8, 24))
+    assert libur_nasional == [2025]  # cadangan dipakai selama KALENDER_RETRY
+
+    monkeypatch.setattr(kalender, "_ambil_libur_nasional", lambda tahun: {t for t in LIBUR if t.year == tahun})
+    monkeypatch.setitem(kalender._tahun[2025], "kadaluarsa", 0)  # KALENDER_RETRY lewat
+    assert kalender.is_hari_libur(date(2025, 3, 31))
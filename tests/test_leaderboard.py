@@ -0,0 +1,162 @@
+from collections import namedtuple
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal, ROUND_HALF_UP
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from api.query import q_absensi_bulanan, q_leaderboard
+from api.utils.cache import TTLCache
+
+
+STATUS = {1: 'Hadir', 3: 'Izin', 4: 'Sakit', 5: 'Tidak Hadir'}
+Karyawan = namedtuple('Karyawan', 'id_karyawan nama jenis')
+KARYAWAN = [Karyawan(3, 'Ani', 'Tetap'), Karyawan(8, 'Budi', 'Kontrak'), Karyawan(12, 'Citra', None)]
+START, END = date(2025, 7, 21), date(2025, 8, 8)
+
+
+class _Connection:
+    def __init__(self, absensi):
+        self.absensi = absensi
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=None):
+        if 'statuspresensi' in str(query):
+            rows = [SimpleNamespace(id_status=k, nama_status=v) for k, v in STATUS.items()]
+        else:
+            rows = [
+                SimpleNamespace(hari=row['tanggal'].day, **{k: v for k, v in row.items() if k not in ('tanggal', 'status')})
+                for row in self.absensi
+                if params['awal'] <= row['tanggal'] <= params['akhir'] and row['status'] == 1
+            ]
+        return SimpleNamespace(fetchall=lambda: rows)
+
+def _absensi_acak():
+    rng = np.random.default_rng(22)
+    absensi = []
+    tanggal = START - timedelta(days=5)
+    while tanggal <= END + timedelta(days=5):
+        for id_karyawan in (3, 8, 99):  # 12 tanpa absensi, 99 tidak aktif
+            if rng.random() < 0.2:
+                continue
+            id_status = int(rng.choice([1, 1, 1, 3, 4, 5]))
+            masuk = datetime.combine(tanggal, time(6, 30)) + timedelta(seconds=int(rng.integers(0, 3 * 3600)))
+            absensi.append({
+                'id_karyawan': id_karyawan, 'tanggal': tanggal, 'id_status': id_status,
+                'status': int(rng.random() > 0.05),  # sebagian di-soft delete
+                'jam_masuk': masuk.time() if id_status in (1, 5) else None,
+                'jam_keluar': time(16, 0) if id_status == 1 else None,
+                'jam_terlambat': int(rng.integers(0, 300)) if id_status in (1, 5) and rng.random() < 0.6 else None,
+                'jam_kurang': int(rng.integers(0, 60)) if id_status == 1 and rng.random() < 0.3 else None,
+                'total_jam_kerja': int(rng.integers(300, 600)) if id_status in (1, 5) else None,
+                'lokasi_masuk': 'Kantor', 'lokasi_keluar': None,
+            })
+        tanggal += timedelta(days=1)
+    return absensi
+
+@pytest.fixture
+def absensi(monkeypatch):
+    absensi = _absensi_acak()
+    engine = SimpleNamespace(connect=lambda: _Connection(absensi))
+    monkeypatch.setattr(q_absensi_bulanan, 'get_connection', lambda: engine)
+    monkeypatch.setattr(q_absensi_bulanan, 'bulan_absensi_cache', TTLCache(maxsize=8, ttl=60))
+    monkeypatch.setattr(q_leaderboard, '_get_karyawan_aktif', lambda: KARYAWAN)
+    return absensi
+
+
+def _per_karyawan(absensi, id_karyawan, start_date, end_date):
+    """Baris aktif karyawan di rentang, 'Tidak Hadir' dihitung seperti tidak ada absensi"""
+    return [
+        row for row in absensi
+        if row['id_karyawan'] == id_karyawan and start_date <= row['tanggal'] <= end_date
+        and row['status'] == 1 and row['id_status'] != 5
+    ]
+
+def _round(nilai, digit):
+    return Decimal(nilai).quantize(Decimal(1).scaleb(-digit), rounding=ROUND_HALF_UP)
+
+def _trunc(a, b):
+    return int(a / b)
+
+def _kerajinan_referensi(absensi, start_date, end_date):
+    hasil = []
+    for k in KARYAWAN:
+        rows = _per_karyawan(absensi, k.id_karyawan, start_date, end_date)
+        hadir = [row for row in rows if row['id_status'] == 1]
+        waktu_lebih = 0
+        for row in hadir:
+            masuk = datetime.combine(START, row['jam_masuk'])
+            batas = datetime.combine(START, time(7, 45))
+            if masuk < batas:
+                waktu_lebih += int((batas - masuk).total_seconds()) // 60 % 60  # EXTRACT(MINUTE FROM interval)
+        rata_menit = _round(Decimal(waktu_lebih) / len(hadir), 0) if hadir else 0
+        hasil.append({
+            'id_karyawan': k.id_karyawan, 'nama': k.nama, 'jenis': k.jenis,
+            'jumlah_hadir': len(hadir),
+            'jumlah_izin': sum(row['id_status'] == 3 for row in rows),
+            'jumlah_sakit': sum(row['id_status'] == 4 for row in rows),
+            'jumlah_alpha': (end_date - start_date).days + 1 - len(rows),
+            'jam_kerja_normal': 208,
+            'total_jam_kerja': sum(_trunc(row['total_jam_kerja'] or 0, 60) for row in rows),
+            'jam_terlambat': sum(row['jam_terlambat'] or 0 for row in rows),
+            'jam_kurang': sum(row['jam_kurang'] or 0 for row in rows),
+            'waktu_lebih': float(waktu_lebih),
+            'poin': float(_round(Decimal(waktu_lebih) / 26, 2)) if hadir else 0.0,
+            'rata_rata_checkin': (datetime.combine(date.min, time(7, 45)) - timedelta(minutes=int(rata_menit))).strftime('%H:%M:%S'),
+        })
+    return sorted(hasil, key=lambda item: item['poin'], reverse=True)
+
+def _kurang_disiplin_referensi(absensi, start_date, end_date):
+    hasil = []
+    for k in KARYAWAN:
+        rows = _per_karyawan(absensi, k.id_karyawan, start_date, end_date)
+        hadir = [row for row in rows if row['id_status'] == 1]
+        terlambat = sum(
+            row['jam_terlambat'] for row in hadir
+            if row['jam_terlambat'] is not None and row['jam_terlambat'] < 240
+        )
+        hasil.append({
+            'id_karyawan': k.id_karyawan, 'nama': k.nama, 'jenis': k.jenis,
+            'jumlah_hadir': len(hadir),
+            'jumlah_izin': sum(row['id_status'] == 3 for row in rows),
+            'jumlah_sakit': sum(row['id_status'] == 4 for row in rows),
+            'jumlah_alpha': (end_date - start_date).days + 1 - len(rows),
+            'total_jam_kerja': sum(_trunc(row['total_jam_kerja'] or 0, 60) for row in rows),
+            'total_jam_terlambat': terlambat,
+            'rata_rata_terlambat': float(_trunc(terlambat, len(hadir))) if hadir else 0.0,
+        })
+    return sorted(hasil, key=lambda item: item['total_jam_terlambat'], reverse=True)
+
+
+@pytest.mark.parametrize("start_date, end_date", [(START, END), (date(2025, 8, 1), date(2025, 8, 1)), (END, END)])
+def test_kerajinan_sama_dengan_referensi(absensi, start_date, end_date):
+    assert q_leaderboard.hitung_kerajinan(start_date, end_date) == _kerajinan_referensi(absensi, start_date, end_date)
+
+@pytest.mark.parametrize("start_date, end_date", [(START, END), (date(2025, 8, 1), date(2025, 8, 1)), (END, END)])
+def test_kurang_disiplin_sama_dengan_referensi(absensi, start_date, end_date):
+    assert q_leaderboard.hitung_kurang_disiplin(start_date, end_date) == _kurang_disiplin_referensi(absensi, start_date, end_date)
+
+def test_tidak_hadir_dihitung_alpha_tanpa_menit(absensi):
+    absensi[:] = [{
+        'id_karyawan': 8, 'tanggal': date(2025, 8, 4), 'id_status': 5, 'status': 1,
+        'jam_masuk': time(7, 0), 'jam_keluar': None, 'jam_terlambat': 30, 'jam_kurang': 10,
+        'total_jam_kerja': 480, 'lokasi_masuk': None, 'lokasi_keluar': None,
+    }]
+
+    budi, = [item for item in q_leaderboard.hitung_kerajinan(date(2025, 8, 4), date(2025, 8, 4)) if item['id_karyawan'] == 8]
+    telat, = [item for item in q_leaderboard.hitung_kurang_disiplin(date(2025, 8, 4), date(2025, 8, 4)) if item['id_karyawan'] == 8]
+
+    assert budi['jumlah_alpha'] == 1 and budi['jumlah_hadir'] == 0
+    assert budi['total_jam_kerja'] == budi['jam_terlambat'] == budi['jam_kurang'] == 0
+    assert budi['waktu_lebih'] == 0.0
+    assert telat['total_jam_kerja'] == telat['total_jam_terlambat'] == 0
+
+def test_rentang_terbalik_kosong(absensi):
+    assert q_leaderboard.hitung_kerajinan(END, START) == []
+    assert q_leaderboard.hitung_kurang_disiplin(END, START) == []